@@ -11,6 +11,8 @@ from past.builtins import basestring
 
 from onadata.apps.api import tools
 from onadata.libs.utils.email import send_generic_email
+from onadata.libs.utils.json_index_tools import (create_json_index,
+                                                 drop_json_index)
 from onadata.apps.logger.models.xform import XForm
 from onadata.celery import app
 
@@ -98,3 +100,19 @@ def send_verification_email(email, message_txt, subject):
 @app.task()
 def send_account_lockout_email(email, message_txt, subject):
     send_generic_email(email, message_txt, subject)
+
+
+@app.task()
+def create_json_index_async(xform_id, field):
+    """
+    Creates the index of an indexed field of an XForm.
+    """
+    create_json_index(xform_id, field)
+
+
+@app.task()
+def drop_json_index_async(xform_id, field):
+    """
+    Drops the index of a field of an XForm that is no longer indexed.
+    """
+    drop_json_index(xform_id, field)
@@ -523,6 +523,51 @@ class TestDataViewSet(TestBase):
             **self.extra)
         response = view(request, pk=formid)
 
+    def test_data_cursor_pagination(self):
+        """
+        Test that the data endpoint paginates on the submission id when the
+        cursor query param is used
+        """
+        self._make_submissions()
+        view = DataViewSet.as_view({'get': 'list'})
+        formid = self.xform.pk
+        expected_ids = list(self.xform.instances.filter(
+            deleted_at__isnull=True).order_by('id').values_list(
+                'id', flat=True))
+
+        request = self.factory.get(
+            '/', data={"cursor": "", "page_size": 3}, **self.extra)
+        response = view(request, pk=formid)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [i['_id'] for i in response.data], expected_ids[:3])
+        self.assertIn('Link', response)
+        self.assertIn('rel="next"', response['Link'])
+        next_url = response['Link'].split(';')[0].strip('<>')
+        self.assertIn('cursor=', next_url)
+
+        cursor = next_url.split('cursor=')[1].split('&')[0]
+        request = self.factory.get(
+            '/', data={"cursor": cursor, "page_size": 3}, **self.extra)
+        response = view(request, pk=formid)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [i['_id'] for i in response.data], expected_ids[3:])
+        self.assertNotIn('rel="next"', response['Link'])
+        self.assertIn('rel="prev"', response['Link'])
+
+        # invalid cursors return a 404
+        request = self.factory.get(
+            '/', data={"cursor": "invalid"}, **self.extra)
+        response = view(request, pk=formid)
+        self.assertEqual(response.status_code, 404)
+
+        # cursor pagination can not be combined with sort
+        request = self.factory.get(
+            '/', data={"cursor": "", "sort": '{"_id": -1}'}, **self.extra)
+        response = view(request, pk=formid)
+        self.assertEqual(response.status_code, 400)
+
     def test_sort_query_param_with_invalid_values(self):
         self._make_submissions()
         view = DataViewSet.as_view({'get': 'list'})
@@ -2319,6 +2364,59 @@ class TestDataViewSet(TestBase):
         response = _data_response()
         self.assertEqual(etag_data, response['Etag'])
 
+    def test_data_endpoint_not_modified(self):
+        """Test a 304 is returned when the If-None-Match etag is current"""
+        self._make_submissions()
+        view = DataViewSet.as_view({'get': 'list'})
+        request = self.factory.get('/', **self.extra)
+        response = view(request, pk=self.xform.pk)
+        self.assertEqual(response.status_code, 200)
+        etag_data = response['Etag']
+
+        request = self.factory.get(
+            '/', HTTP_IF_NONE_MATCH='"{}"'.format(etag_data), **self.extra)
+        response = view(request, pk=self.xform.pk)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['Etag'], etag_data)
+        self.assertIsNone(response.data)
+
+        # the etag changes when a submission is deleted
+        instance = self.xform.instances.first()
+        instance.set_deleted()
+        response = view(request, pk=self.xform.pk)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(etag_data, response['Etag'])
+
+        # other users are still denied access
+        self._create_user_and_login('alice', 'alice')
+        extra = {'HTTP_AUTHORIZATION': 'Token %s' % self.user.auth_token}
+        request = self.factory.get(
+            '/', HTTP_IF_NONE_MATCH=response['Etag'], **extra)
+        response = view(request, pk=self.xform.pk)
+        self.assertEqual(response.status_code, 404)
+
+    def test_data_endpoint_modified_after_role_change(self):
+        """Test the etag of the data listing changes with the user's role"""
+        self._make_submissions()
+        view = DataViewSet.as_view({'get': 'list'})
+        self._create_user_and_login('alice', 'alice')
+        extra = {'HTTP_AUTHORIZATION': 'Token %s' % self.user.auth_token}
+        ReadOnlyRole.add(self.user, self.xform)
+        request = self.factory.get('/', **extra)
+        response = view(request, pk=self.xform.pk)
+        self.assertEqual(response.status_code, 200)
+        etag_data = response['Etag']
+
+        request = self.factory.get(
+            '/', HTTP_IF_NONE_MATCH=etag_data, **extra)
+        response = view(request, pk=self.xform.pk)
+        self.assertEqual(response.status_code, 304)
+
+        EditorRole.add(self.user, self.xform)
+        response = view(request, pk=self.xform.pk)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(etag_data, response['Etag'])
+
     def test_submission_edit_w_blank_field(self):
         """Test submission json includes has_history key"""
         # create form
@@ -5,6 +5,8 @@ OpenData tests.
 import os
 import json
 
+from mock import patch
+
 from django.test import RequestFactory
 from django.utils.dateparse import parse_datetime
 from django.contrib.auth.models import User
@@ -177,6 +179,32 @@ class TestOpenDataViewSet(TestBase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.data, {'count': 4})
 
+    def test_get_data_in_chunks(self):
+        """
+        Test all the submissions are streamed when they are read in chunks.
+        """
+        self.view = OpenDataViewSet.as_view({
+            'get': 'data'
+        })
+        _open_data = self.get_open_data_object()
+        uuid = _open_data.uuid
+
+        request = self.factory.get('/', **self.extra)
+        response = self.view(request, uuid=uuid)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(streaming_data(response), [])
+
+        self._make_submissions()
+        with patch.object(OpenDataViewSet, 'MAX_INSTANCES_PER_REQUEST', 3):
+            request = self.factory.get('/', **self.extra)
+            response = self.view(request, uuid=uuid)
+            self.assertEqual(response.status_code, 200)
+            row_data = streaming_data(response)
+        self.assertEqual(
+            [row['_id'] for row in row_data],
+            list(Instance.objects.filter(xform=self.xform).order_by(
+                'pk').values_list('pk', flat=True)))
+
     def test_get_data_using_uuid_and_greater_than_query_param(self):
         self._make_submissions()
         self.view = OpenDataViewSet.as_view({
@@ -611,6 +611,65 @@ class TestXFormViewSet(TestAbstractViewSet):
 
             self.assertEqual(response.data, self.form_data)
 
+    def test_form_get_not_modified(self):
+        """Test a 304 is returned when the If-None-Match etag is current"""
+        with HTTMock(enketo_urls_mock):
+            view = XFormViewSet.as_view({
+                'get': 'retrieve'
+            })
+            self._publish_xls_form_to_project()
+            formid = self.xform.pk
+            # the enketo urls are saved on the first request
+            request = self.factory.get('/', **self.extra)
+            response = view(request, pk=formid)
+            self.assertEqual(response.status_code, 200)
+
+            response = view(request, pk=formid)
+            self.assertEqual(response.status_code, 200)
+            etag_value = response.get('Etag')
+            self.assertIsNotNone(etag_value)
+
+            request = self.factory.get(
+                '/', HTTP_IF_NONE_MATCH=etag_value, **self.extra)
+            response = view(request, pk=formid)
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(response.get('Etag'), etag_value)
+
+            # the etag changes when the form is modified
+            self.xform.save()
+            response = view(request, pk=formid)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotEqual(response.get('Etag'), etag_value)
+
+    def test_form_get_modified_after_share(self):
+        """Test the etag of a form changes when the form is shared"""
+        with HTTMock(enketo_urls_mock):
+            view = XFormViewSet.as_view({
+                'get': 'retrieve'
+            })
+            share_view = XFormViewSet.as_view({
+                'post': 'share'
+            })
+            self._publish_xls_form_to_project()
+            alice_data = {'username': 'alice', 'email': 'alice@localhost.com'}
+            self._create_user_profile(alice_data)
+            formid = self.xform.pk
+            request = self.factory.get('/', **self.extra)
+            view(request, pk=formid)
+            response = view(request, pk=formid)
+            etag_value = response.get('Etag')
+
+            data = {'username': 'alice', 'role': ReadOnlyRole.name}
+            request = self.factory.post('/', data=data, **self.extra)
+            response = share_view(request, pk=formid)
+            self.assertEqual(response.status_code, 204)
+
+            request = self.factory.get(
+                '/', HTTP_IF_NONE_MATCH=etag_value, **self.extra)
+            response = view(request, pk=formid)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotEqual(response.get('Etag'), etag_value)
+
     def test_form_format(self):
         with HTTMock(enketo_mock):
             self._publish_xls_form_to_project()
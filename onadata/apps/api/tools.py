@@ -793,4 +793,4 @@ def replace_attachment_name_with_url(data):
                     record.json[question_key] = site_url + attachment_path
                 except ValueError:
                     pass
-    return data
+        yield record
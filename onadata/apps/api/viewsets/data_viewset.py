@@ -31,10 +31,14 @@ from onadata.apps.logger.models.attachment import Attachment
 from onadata.apps.logger.models.instance import (
     Instance,
     FormInactiveError)
-from onadata.apps.logger.models.xform import XForm
+from onadata.apps.logger.models.xform import (XForm,
+                                             XFormGroupObjectPermission,
+                                             XFormUserObjectPermission)
 from onadata.apps.messaging.constants import XFORM, SUBMISSION_DELETED
 from onadata.apps.messaging.serializers import send_message
-from onadata.apps.viewer.models.parsed_instance import get_etag_hash_from_query
+from onadata.apps.viewer.models.parsed_instance import ParsedInstance
+from onadata.apps.viewer.models.parsed_instance import (
+    get_etag_hash_from_data_version, get_etag_hash_from_query)
 from onadata.apps.viewer.models.parsed_instance import get_sql_with_params
 from onadata.apps.viewer.models.parsed_instance import get_where_clause
 from onadata.apps.viewer.models.parsed_instance import query_data
@@ -49,6 +53,7 @@ from onadata.libs.mixins.authenticate_header_mixin import \
 from onadata.libs.mixins.cache_control_mixin import CacheControlMixin
 from onadata.libs.mixins.etags_mixin import ETagsMixin
 from onadata.libs.pagination import CountOverridablePageNumberPagination
+from onadata.libs.pagination import IdCursorPagination
 from onadata.libs.permissions import CAN_DELETE_SUBMISSION, \
     filter_queryset_xform_meta_perms, filter_queryset_xform_meta_perms_sql
 from onadata.libs.renderers import renderers
@@ -60,7 +65,9 @@ from onadata.libs.serializers.data_serializer import JsonDataSerializer
 from onadata.libs.serializers.data_serializer import OSMSerializer
 from onadata.libs.serializers.geojson_serializer import GeoJsonSerializer
 from onadata.libs.utils.api_export_tools import custom_response_handler
+from onadata.libs.utils.cache_tools import reset_xform_data_version
 from onadata.libs.utils.common_tools import json_stream
+from onadata.libs.utils.json_index_tools import record_query_fields
 from onadata.libs.utils.viewer_tools import get_form_url, get_enketo_urls
 
 SAFE_METHODS = ['GET', 'HEAD', 'OPTIONS']
@@ -108,6 +115,8 @@ class DataViewSet(AnonymousUserPublicFormsMixin,
         renderers.CSVRenderer,
         renderers.CSVZIPRenderer,
         renderers.SAVZIPRenderer,
+        renderers.ParquetZIPRenderer,
+        renderers.ArrowZIPRenderer,
         renderers.InstanceXMLRenderer,
         renderers.SurveyRenderer,
         renderers.GeoJsonRenderer,
@@ -127,6 +136,7 @@ class DataViewSet(AnonymousUserPublicFormsMixin,
     data_count = None
     public_data_endpoint = 'public'
     pagination_class = CountOverridablePageNumberPagination
+    cursor_pagination_class = IdCursorPagination
 
     queryset = XForm.objects.filter(deleted_at__isnull=True)
 
@@ -181,6 +191,37 @@ class DataViewSet(AnonymousUserPublicFormsMixin,
 
         return obj
 
+    def get_etag_version(self, request, *args, **kwargs):
+        """
+        Returns the etag of a form's data listing, the same etag
+        set_object_list() adds to the response.
+        """
+        lookup = self.kwargs.get(self.lookup_field)
+        export_type = kwargs.get('format', request.GET.get('format'))
+        if self.action != 'list' or lookup is None or \
+                lookup == self.public_data_endpoint or \
+                export_type not in [None, 'json', 'jsonp', 'debug', 'xml']:
+            return None
+
+        xform = self.get_etag_object(
+            self.get_queryset(), 'id', 'date_modified', 'is_merged_dataset')
+
+        return self._get_data_etag_hash(xform)
+
+    def _get_data_etag_hash(self, xform):
+        """
+        Returns the etag of a form's data listing from the data version,
+        date_modified and permissions of the form, the path and the user.
+        The rows a user sees change with the role of the user and with the
+        shared_data and meta permissions of the form, which are saved with
+        the form.
+        """
+        return get_etag_hash_from_data_version(
+            xform, xform.date_modified, self.request.get_full_path(),
+            self.request.user.pk, *self.get_etag_permissions(
+                xform, XFormUserObjectPermission,
+                XFormGroupObjectPermission))
+
     def _get_public_forms_queryset(self):
         return XForm.objects.filter(Q(shared=True) | Q(shared_data=True),
                                     deleted_at__isnull=True)
@@ -331,6 +372,7 @@ class DataViewSet(AnonymousUserPublicFormsMixin,
                         date_modified=timezone.now(),
                         deleted_by=request.user)
 
+                reset_xform_data_version(self.object.pk)
                 # updates the num_of_submissions for the form.
                 after_count = self.object.submission_count(force_update=True)
                 number_of_records_deleted = initial_count - after_count
@@ -418,7 +460,7 @@ class DataViewSet(AnonymousUserPublicFormsMixin,
 
         url = self.request.build_absolute_uri()
         base_url = url.split('?')[0]
-        num_of_records = xform.num_of_submissions
+        num_of_records = xform.submission_count()
         next_page_url = None
         prev_page_url = None
         first_page_url = None
@@ -573,12 +615,10 @@ class DataViewSet(AnonymousUserPublicFormsMixin,
     def set_object_list(
             self, query, fields, sort, start, limit, is_public_request):
         try:
-            enable_etag = True
             if not is_public_request:
                 xform = self.get_object()
-                self.data_count = xform.num_of_submissions
-                enable_etag = self.data_count <\
-                    SUBMISSION_RETRIEVAL_THRESHOLD
+                self.data_count = xform.submission_count()
+                record_query_fields(xform, query)
 
             where, where_params = get_where_clause(query)
             if where:
@@ -600,13 +640,16 @@ class DataViewSet(AnonymousUserPublicFormsMixin,
                     self.object_list = query_data(
                         xform, query=query, sort=sort, start_index=start,
                         limit=limit, fields=fields,
-                        json_only=not self.kwargs.get('format') == 'xml')
+                        json_only=not self.kwargs.get('format') == 'xml',
+                        chunk_size=ParsedInstance.DEFAULT_BATCHSIZE
+                        if getattr(settings, 'STREAM_DATA', False) else None)
                 except NoRecordsPermission:
                     self.object_list = []
 
-            # ETags are Disabled for XForms with Submissions that surpass
-            # the configured SUBMISSION_RETRIEVAL_THRESHOLD setting
-            if enable_etag:
+            if not is_public_request:
+                # the data version of the form changes with its submissions
+                self.etag_hash = self._get_data_etag_hash(xform)
+            else:
                 if isinstance(self.object_list, QuerySet):
                     self.etag_hash = get_etag_hash_from_query(self.object_list)
                 else:
@@ -629,7 +672,31 @@ class DataViewSet(AnonymousUserPublicFormsMixin,
                                                 view=self,
                                                 count=self.data_count)
 
+    def _paginate_by_cursor(self, page_size):
+        """
+        Paginates self.object_list on the submission id using the opaque
+        cursor query param and sets the Link header to the next page.
+        """
+        paginator = self.cursor_pagination_class()
+        paginator.page_size = page_size
+        self.object_list = paginator.paginate_queryset(
+            self.object_list, self.request, view=self)
+
+        if not hasattr(self, 'headers'):
+            self.headers = {}
+        self.headers.update(paginator.generate_link_header())
+
     def _get_data(self, query, fields, sort, start, limit, is_public_request):
+        query_param_keys = self.request.query_params
+        use_cursor = self.cursor_pagination_class.cursor_query_param in \
+            query_param_keys
+
+        if use_cursor and (
+                sort or fields or start or limit or is_public_request):
+            raise ParseError(_(
+                u"Cursor pagination does not support the sort, fields, "
+                u"start and limit parameters."))
+
         self.set_object_list(
             query, fields, sort, start, limit, is_public_request)
 
@@ -637,10 +704,12 @@ class DataViewSet(AnonymousUserPublicFormsMixin,
             settings, "SUBMISSION_RETRIEVAL_THRESHOLD", 10000)
         pagination_keys = [self.paginator.page_query_param,
                            self.paginator.page_size_query_param]
-        query_param_keys = self.request.query_params
         should_paginate = any([k in query_param_keys for k in pagination_keys])
 
-        if not should_paginate and not is_public_request:
+        if use_cursor:
+            self._paginate_by_cursor(retrieval_threshold)
+            should_paginate = False
+        elif not should_paginate and not is_public_request:
             # Paginate requests that try to retrieve data that surpasses
             # the submission retrieval threshold
             xform = self.get_object()
@@ -685,6 +754,11 @@ class DataViewSet(AnonymousUserPublicFormsMixin,
             return json.dumps(
                 item.json if isinstance(item, Instance) else item)
 
+        if isinstance(self.object_list, QuerySet):
+            # avoid caching the whole result set on the queryset
+            self.object_list = self.object_list.iterator(
+                chunk_size=ParsedInstance.DEFAULT_BATCHSIZE)
+
         if self.kwargs.get('format') == 'xml':
             response = StreamingHttpResponse(
                 renderers.InstanceXMLRenderer().stream_data(
@@ -16,6 +16,8 @@ from onadata.apps.api.permissions import DataViewViewsetPermissions
 from onadata.apps.api.tools import get_baseviewset_class
 from onadata.apps.logger.models.data_view import DataView
 from onadata.apps.viewer.models.export import Export
+from onadata.apps.viewer.models.parsed_instance import \
+    get_etag_hash_from_data_version
 from onadata.libs.mixins.authenticate_header_mixin import \
     AuthenticateHeaderMixin
 from onadata.libs.mixins.cache_control_mixin import CacheControlMixin
@@ -62,6 +64,8 @@ class DataViewViewSet(AuthenticateHeaderMixin,
         renderers.CSVRenderer,
         renderers.CSVZIPRenderer,
         renderers.SAVZIPRenderer,
+        renderers.ParquetZIPRenderer,
+        renderers.ArrowZIPRenderer,
         renderers.ZipRenderer,
     ]
 
@@ -91,6 +95,10 @@ class DataViewViewSet(AuthenticateHeaderMixin,
             if 'error' in data:
                 raise ParseError(data.get('error'))
 
+            # the data version of the form changes with its submissions
+            self.etag_hash = get_etag_hash_from_data_version(
+                self.object.xform, self.object.date_modified,
+                request.get_full_path(), request.user.pk)
             serializer = self.get_serializer(data, many=True)
 
             return Response(serializer.data)
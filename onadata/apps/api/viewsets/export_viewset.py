@@ -23,6 +23,8 @@ class ExportViewSet(DestroyModelMixin, ReadOnlyModelViewSet):
         renderers.KMLRenderer,
         renderers.OSMExportRenderer,
         renderers.SAVZIPRenderer,
+        renderers.ParquetZIPRenderer,
+        renderers.ArrowZIPRenderer,
         renderers.XLSRenderer,
         renderers.XLSXRenderer,
         renderers.ZipRenderer
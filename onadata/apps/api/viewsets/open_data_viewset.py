@@ -27,6 +27,7 @@ from onadata.libs.pagination import StandardPageNumberPagination
 from onadata.libs.serializers.data_serializer import TableauDataSerializer
 from onadata.libs.serializers.open_data_serializer import OpenDataSerializer
 from onadata.libs.utils.common_tools import json_stream
+from onadata.libs.utils.model_tools import queryset_keyset_iterator
 from onadata.libs.utils.common_tags import (
     ATTACHMENTS,
     NOTES,
@@ -54,6 +55,8 @@ def process_tableau_data(data, xform):
     Streamlines the row header fields
     with the column header fields for the same form.
     Handles Flattenning repeat data for tableau
+
+    Rows are flattened and yielded one at a time as data is iterated.
     """
 
     def get_xpath(key, nested_key):
@@ -103,7 +106,7 @@ def process_tableau_data(data, xform):
                 # abbreviated xpath "children/details/immunization/polio_1",
                 # generate ["children", index, "immunization/polio_1"]
                 for (nested_key, nested_val) in item_list.items():
-                    qstn_type = xform.get_element(nested_key).type
+                    qstn_type = xform.get_element_type(nested_key)
                     xpaths = get_xpath(key, nested_key)
                     if qstn_type == MULTIPLE_SELECT_TYPE:
                         data = get_updated_data_dict(
@@ -115,43 +118,41 @@ def process_tableau_data(data, xform):
                         data[xpaths] = nested_val
         return data
 
-    result = []
-    if data:
-        headers = xform.get_headers()
-        tableau_headers = remove_metadata_fields(headers)
-        for row in data:
-            diff = set(tableau_headers).difference(set(row))
-            flat_dict = dict.fromkeys(diff, None)
-            for (key, value) in row.items():
-                if isinstance(value, list) and key not in [
-                        ATTACHMENTS, NOTES, GEOLOCATION]:
-                    for index, item in enumerate(value, start=1):
-                        # order repeat according to xform order
-                        item = get_ordered_repeat_value(key, item, index)
-                        flat_dict.update(item)
-                else:
-                    try:
-                        qstn_type = xform.get_element(key).type
-                        if qstn_type == MULTIPLE_SELECT_TYPE:
-                            flat_dict = get_updated_data_dict(
-                                key, value, flat_dict)
-                        if qstn_type == 'geopoint':
-                            parts = value.split(' ')
-                            gps_xpaths = \
-                                DataDictionary.get_additional_geopoint_xpaths(
-                                    key)
-                            gps_parts = dict(
-                                [(xpath, None) for xpath in gps_xpaths])
-                            if len(parts) == 4:
-                                gps_parts = dict(zip(gps_xpaths, parts))
-                                flat_dict.update(gps_parts)
-                        else:
-                            flat_dict[key] = value
-                    except AttributeError:
+    tableau_headers = None
+    for row in data:
+        if tableau_headers is None:
+            tableau_headers = set(remove_metadata_fields(xform.get_headers()))
+        diff = tableau_headers.difference(row)
+        flat_dict = dict.fromkeys(diff, None)
+        for (key, value) in row.items():
+            if isinstance(value, list) and key not in [
+                    ATTACHMENTS, NOTES, GEOLOCATION]:
+                for index, item in enumerate(value, start=1):
+                    # order repeat according to xform order
+                    item = get_ordered_repeat_value(key, item, index)
+                    flat_dict.update(item)
+            else:
+                try:
+                    qstn_type = xform.get_element_type(key)
+                    if qstn_type == MULTIPLE_SELECT_TYPE:
+                        flat_dict = get_updated_data_dict(
+                            key, value, flat_dict)
+                    if qstn_type == 'geopoint':
+                        parts = value.split(' ')
+                        gps_xpaths = \
+                            DataDictionary.get_additional_geopoint_xpaths(
+                                key)
+                        gps_parts = dict(
+                            [(xpath, None) for xpath in gps_xpaths])
+                        if len(parts) == 4:
+                            gps_parts = dict(zip(gps_xpaths, parts))
+                            flat_dict.update(gps_parts)
+                    else:
                         flat_dict[key] = value
+                except AttributeError:
+                    flat_dict[key] = value
 
-            result.append(flat_dict)
-    return result
+        yield flat_dict
 
 
 class OpenDataViewSet(ETagsMixin, CacheControlMixin,
@@ -263,16 +264,34 @@ class OpenDataViewSet(ETagsMixin, CacheControlMixin,
             if count:
                 return Response({'count': instances.count()})
 
-            if should_paginate:
-                instances = self.paginate_queryset(instances)
-
+            instances = self.get_tableau_instances(instances, should_paginate)
             data = process_tableau_data(
-                TableauDataSerializer(instances, many=True).data, xform)
+                self.get_tableau_data(instances), xform)
 
             return self.get_streaming_response(data)
 
         return Response(data)
 
+    def get_tableau_instances(self, instances, should_paginate):
+        """
+        Returns the requested page of instances or an iterator that reads
+        all the instances MAX_INSTANCES_PER_REQUEST at a time.
+        """
+        instances = instances.defer('xml')
+        if should_paginate:
+            return self.paginate_queryset(instances)
+
+        return queryset_keyset_iterator(
+            instances, self.MAX_INSTANCES_PER_REQUEST)
+
+    def get_tableau_data(self, instances):
+        """
+        Yields the submission data of each instance as instances are read.
+        """
+        serializer = TableauDataSerializer()
+        for instance in instances:
+            yield serializer.to_representation(instance)
+
     def get_streaming_response(self, data):
         """Get a StreamingHttpResponse response object"""
 
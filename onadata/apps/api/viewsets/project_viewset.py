@@ -1,8 +1,10 @@
 from distutils.util import strtobool
+from hashlib import md5
 
 from django.core.mail import send_mail
 from django.shortcuts import get_object_or_404
 from django.core.cache import cache
+from django.db.models import Count, Max, Sum
 
 from rest_framework import status
 from rest_framework.decorators import action
@@ -13,6 +15,8 @@ from onadata.apps.api import tools as utils
 from onadata.apps.api.permissions import ProjectPermissions
 from onadata.apps.api.tools import get_baseviewset_class
 from onadata.apps.logger.models import Project, XForm
+from onadata.apps.logger.models.project import (ProjectGroupObjectPermission,
+                                                ProjectUserObjectPermission)
 from onadata.apps.main.models import UserProfile
 from onadata.apps.main.models.meta_data import MetaData
 from onadata.libs.filters import (AnonUserProjectFilter, ProjectOwnerFilter,
@@ -81,6 +85,32 @@ class ProjectViewSet(AuthenticateHeaderMixin,
         cache.set(f'{PROJ_OWNER_CACHE}{project_id}', response.data)
         return response
 
+    def get_etag_version(self, request, *args, **kwargs):
+        """
+        Returns the etag of a project from its date_modified, permissions and
+        the date_modified and submissions of its forms.
+        """
+        if self.action != 'retrieve':
+            return None
+
+        project = self.get_etag_object(
+            Project.objects.filter(
+                deleted_at__isnull=True, organization__is_active=True),
+            'id', 'date_modified')
+        forms = XForm.objects.filter(
+            project_id=project.pk, deleted_at__isnull=True).aggregate(
+                count=Count('pk'), date_modified=Max('date_modified'),
+                last_submission_time=Max('last_submission_time'),
+                num_of_submissions=Sum('num_of_submissions'))
+        etag_value = [project.date_modified, request.get_full_path(),
+                      request.user.pk] + [forms[key] for key in sorted(forms)]
+        etag_value += self.get_etag_permissions(
+            project, ProjectUserObjectPermission,
+            ProjectGroupObjectPermission)
+
+        return md5(':'.join(
+            str(value) for value in etag_value).encode('utf-8')).hexdigest()
+
     def retrieve(self, request, *args, **kwargs):
         """ Retrieve single project """
         project_id = kwargs.get('pk')
@@ -14,7 +14,6 @@ from onadata.apps.logger.models.xform import XForm
 from onadata.apps.api.tools import replace_attachment_name_with_url
 from onadata.apps.api.viewsets.open_data_viewset import (
     OpenDataViewSet)
-from onadata.libs.serializers.data_serializer import TableauDataSerializer
 from onadata.libs.utils.common_tags import (
     ID, MULTIPLE_SELECT_TYPE, REPEAT_SELECT_TYPE, PARENT_TABLE, PARENT_ID)
 
@@ -28,7 +27,10 @@ def process_tableau_data(
         parent_table: str = None,
         parent_id: int = None,
         current_table: str = DEFAULT_TABLE_NAME):
-    result = []
+    """
+    Flattens the repeats, select multiples and geopoints of each row of
+    data, rows are yielded one at a time as data is iterated.
+    """
     if data:
         for idx, row in enumerate(data, start=1):
             flat_dict = defaultdict(list)
@@ -79,8 +81,7 @@ def process_tableau_data(
                         if prefix:
                             qstn_name = f"{prefix}_{qstn_name}"
                         flat_dict[qstn_name] = value
-            result.append(dict(flat_dict))
-    return result
+            yield dict(flat_dict)
 
 
 def unpack_select_multiple_data(picked_choices, list_name,
@@ -180,13 +181,11 @@ class TableauViewSet(OpenDataViewSet):
             if count:
                 return Response({'count': instances.count()})
 
-            if should_paginate:
-                instances = self.paginate_queryset(instances)
+            instances = self.get_tableau_instances(instances, should_paginate)
             # Switch out media file names for url links in queryset
-            data = replace_attachment_name_with_url(instances)
-
+            instances = replace_attachment_name_with_url(instances)
             data = process_tableau_data(
-                TableauDataSerializer(data, many=True).data, xform)
+                self.get_tableau_data(instances), xform)
 
             return self.get_streaming_response(data)
 
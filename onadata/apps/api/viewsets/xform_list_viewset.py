@@ -1,3 +1,5 @@
+from hashlib import md5
+
 from django.conf import settings
 from django.http import Http404
 from django.shortcuts import get_object_or_404
@@ -114,6 +116,22 @@ class XFormListViewSet(ETagsMixin, BaseViewset,
 
         return queryset
 
+    def get_etag_version(self, request, *args, **kwargs):
+        """
+        Returns the etag of the form list from the date_modified of the forms.
+        """
+        if self.action != 'list':
+            return None
+
+        forms = self.filter_queryset(self.get_queryset()).order_by(
+            'pk').values_list('pk', 'date_modified')
+        etag_value = [request.get_full_path(), request.user.pk] + [
+            '{}-{}'.format(pk, date_modified)
+            for pk, date_modified in forms]
+
+        return md5(':'.join(
+            str(value) for value in etag_value).encode('utf-8')).hexdigest()
+
     @never_cache
     def list(self, request, *args, **kwargs):
         self.object_list = self.filter_queryset(self.get_queryset())
@@ -41,10 +41,14 @@ from onadata.apps.api import tools as utils
 from onadata.apps.api import tasks
 from onadata.apps.api.permissions import XFormPermissions
 from onadata.apps.api.tools import get_baseviewset_class
-from onadata.apps.logger.models.xform import XForm, XFormUserObjectPermission
+from onadata.apps.logger.models.xform import (XForm,
+                                             XFormGroupObjectPermission,
+                                             XFormUserObjectPermission)
 from onadata.apps.logger.models.xform_version import XFormVersion
 from onadata.apps.logger.xform_instance_parser import XLSFormError
 from onadata.apps.viewer.models.export import Export
+from onadata.apps.viewer.models.parsed_instance import \
+    get_etag_hash_from_data_version
 from onadata.libs import authentication, filters
 from onadata.libs.mixins.anonymous_user_public_forms_mixin import \
     AnonymousUserPublicFormsMixin
@@ -256,6 +260,8 @@ class XFormViewSet(AnonymousUserPublicFormsMixin,
         renderers.CSVRenderer,
         renderers.CSVZIPRenderer,
         renderers.SAVZIPRenderer,
+        renderers.ParquetZIPRenderer,
+        renderers.ArrowZIPRenderer,
         renderers.SurveyRenderer,
         renderers.OSMExportRenderer,
         renderers.ZipRenderer,
@@ -490,6 +496,28 @@ class XFormViewSet(AnonymousUserPublicFormsMixin,
 
             return Response(result, status=200)
 
+    def get_etag_version(self, request, *args, **kwargs):
+        """
+        Returns the etag of a form from its date_modified, data version and
+        permissions.
+        """
+        lookup = self.kwargs.get(self.lookup_field)
+        export_type = kwargs.get('format') or \
+            request.query_params.get('format')
+        if self.action != 'retrieve' or \
+                lookup == self.public_forms_endpoint or \
+                export_type not in [None, 'json', 'debug']:
+            return None
+
+        xform = self.get_etag_object(
+            self.get_queryset(), 'id', 'date_modified', 'is_merged_dataset')
+
+        return get_etag_hash_from_data_version(
+            xform, xform.date_modified, request.get_full_path(),
+            request.user.pk, *self.get_etag_permissions(
+                xform, XFormUserObjectPermission,
+                XFormGroupObjectPermission))
+
     def retrieve(self, request, *args, **kwargs):
         lookup_field = self.lookup_field
         lookup = self.kwargs.get(lookup_field)
@@ -790,7 +818,8 @@ class XFormViewSet(AnonymousUserPublicFormsMixin,
         if query:
             options.update({'query': query})
 
-        if request.query_params.get('format') in ['csvzip', 'savzip']:
+        if request.query_params.get('format') in ['csvzip', 'savzip',
+                                                   'parquetzip', 'arrowzip']:
             # Overide renderer and mediatype because all response are
             # suppose to be in json
             # TODO: Avoid overiding the format query param for export type
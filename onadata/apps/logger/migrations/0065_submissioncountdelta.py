@@ -0,0 +1,21 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logger', '0064_auto_20210304_0314'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SubmissionCountDelta',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('delta', models.IntegerField(default=1)),
+                ('last_submission_time', models.DateTimeField(blank=True, null=True)),
+                ('xform', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='submission_count_deltas', to='logger.XForm')),
+            ],
+        ),
+    ]
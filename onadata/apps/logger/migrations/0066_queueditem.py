@@ -0,0 +1,25 @@
+import django.contrib.postgres.fields.jsonb
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logger', '0065_submissioncountdelta'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QueuedItem',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('queue', models.CharField(max_length=64)),
+                ('object_id', models.PositiveIntegerField()),
+                ('data', django.contrib.postgres.fields.jsonb.JSONField(blank=True, default=dict)),
+                ('date_created', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'index_together': {('queue', 'id')},
+            },
+        ),
+    ]
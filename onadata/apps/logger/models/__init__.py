@@ -10,5 +10,7 @@ from onadata.apps.logger.models.survey_type import SurveyType # noqa
 from onadata.apps.logger.models.widget import Widget # noqa
 from onadata.apps.logger.models.xform import XForm # noqa
 from onadata.apps.logger.models.submission_review import SubmissionReview # noqa
+from onadata.apps.logger.models.submission_count import SubmissionCountDelta # noqa
+from onadata.apps.logger.models.queued_item import QueuedItem # noqa
 from onadata.apps.logger.xform_instance_parser import InstanceParseError # noqa
 from onadata.apps.logger.models.xform_version import XFormVersion # noqa
@@ -60,7 +60,11 @@ class Attachment(models.Model):
         app_label = 'logger'
         ordering = ("pk", )
 
-    def save(self, *args, **kwargs):
+    def set_file_details(self):
+        """
+        Sets the mimetype, when it is not known, and the size of the media
+        file.
+        """
         if self.media_file and self.mimetype == '':
             # guess mimetype
             mimetype, encoding = mimetypes.guess_type(self.media_file.name)
@@ -77,6 +81,8 @@ class Attachment(models.Model):
         except (OSError, AttributeError):
             pass
 
+    def save(self, *args, **kwargs):
+        self.set_file_details()
         super(Attachment, self).save(*args, **kwargs)
 
     @property
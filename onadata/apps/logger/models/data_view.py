@@ -25,6 +25,7 @@ from onadata.libs.utils.cache_tools import (DATAVIEW_COUNT,
 from onadata.libs.utils.common_tags import (ATTACHMENTS, EDITED, GEOLOCATION,
                                             ID, LAST_EDITED, MONGO_STRFTIME,
                                             NOTES, SUBMISSION_TIME)
+from onadata.libs.utils.json_index_tools import record_query_fields
 
 SUPPORTED_FILTERS = ['=', '>', '<', '>=', '<=', '<>', '!=']
 ATTACHMENT_TYPES = ['photo', 'audio', 'video']
@@ -353,6 +354,10 @@ class DataView(models.Model):
                    last_submission_time=False, all_data=False, sort=None,
                    filter_query=None):
 
+        record_query_fields(
+            data_view.xform,
+            [{qu.get('column'): qu.get('value')} for qu in data_view.query] +
+            ([filter_query] if filter_query else []))
         (sql, columns, params) = cls.generate_query_string(
             data_view, start_index, limit, last_submission_time,
             all_data, sort, filter_query)
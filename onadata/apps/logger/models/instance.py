@@ -2,8 +2,10 @@
 """
 Instance model class
 """
+import json
 import math
 import pytz
+from collections import defaultdict
 from datetime import datetime
 from deprecated import deprecated
 
@@ -19,10 +21,15 @@ from django.db.models.signals import post_delete, post_save
 from django.urls import reverse
 from django.utils import timezone
 from django.utils.translation import ugettext as _
-from future.utils import python_2_unicode_compatible
+from future.utils import listvalues, python_2_unicode_compatible
 from past.builtins import basestring  # pylint: disable=W0622
 from taggit.managers import TaggableManager
 
+from onadata.apps.logger.models.queued_item import (process_queue,
+                                                    queue_items,
+                                                    register_queue)
+from onadata.apps.logger.models.submission_count import (
+    SubmissionCountDelta, submission_count_deltas_enabled)
 from onadata.apps.logger.models.submission_review import SubmissionReview
 from onadata.apps.logger.models.survey_type import SurveyType
 from onadata.apps.logger.models.xform import XFORM_TITLE_LENGTH, XForm
@@ -34,7 +41,8 @@ from onadata.libs.data.query import get_numeric_fields
 from onadata.libs.utils.cache_tools import (
     DATAVIEW_COUNT, IS_ORG, PROJ_NUM_DATASET_CACHE, PROJ_SUB_DATE_CACHE,
     XFORM_COUNT, XFORM_DATA_VERSIONS, XFORM_SUBMISSION_COUNT_FOR_DAY,
-    XFORM_SUBMISSION_COUNT_FOR_DAY_DATE, safe_delete)
+    XFORM_SUBMISSION_COUNT_FOR_DAY_DATE, reset_xform_data_version,
+    safe_delete)
 from onadata.libs.utils.common_tags import (
     ATTACHMENTS, BAMBOO_DATASET_ID, DATE_MODIFIED,
     DELETEDAT, DURATION, EDITED, END, GEOLOCATION, ID, LAST_EDITED,
@@ -48,6 +56,8 @@ from onadata.libs.utils.timing import calculate_duration
 
 ASYNC_POST_SUBMISSION_PROCESSING_ENABLED = \
     getattr(settings, 'ASYNC_POST_SUBMISSION_PROCESSING_ENABLED', False)
+# queue of the submissions processed by process_post_submission_batch
+POST_SUBMISSION_QUEUE = 'post-submission'
 
 
 def get_attachment_url(attachment, suffix=None):
@@ -64,7 +74,10 @@ def get_attachment_url(attachment, suffix=None):
 
 def _get_attachments_from_instance(instance):
     attachments = []
-    for a in instance.attachments.filter(deleted_at__isnull=True):
+    # all() so that prefetched attachments are not queried again
+    for a in instance.attachments.all():
+        if a.deleted_at is not None:
+            continue
         attachment = dict()
         attachment['download_url'] = get_attachment_url(a)
         attachment['small_download_url'] = get_attachment_url(a, 'small')
@@ -72,7 +85,7 @@ def _get_attachments_from_instance(instance):
         attachment['mimetype'] = a.mimetype
         attachment['filename'] = a.media_file.name
         attachment['name'] = a.name
-        attachment['instance'] = a.instance.pk
+        attachment['instance'] = a.instance_id
         attachment['xform'] = instance.xform.id
         attachment['id'] = a.id
         attachments.append(attachment)
@@ -183,24 +196,30 @@ def update_xform_submission_count(instance_id, created):
             except Instance.DoesNotExist:
                 pass
             else:
-                # update xform.num_of_submissions
-                cursor = connection.cursor()
-                sql = (
-                    'UPDATE logger_xform SET '
-                    'num_of_submissions = num_of_submissions + 1, '
-                    'last_submission_time = %s '
-                    'WHERE id = %s'
-                )
-                params = [instance.date_created, instance.xform_id]
-
-                # update user profile.num_of_submissions
-                cursor.execute(sql, params)
-                sql = (
-                    'UPDATE main_userprofile SET '
-                    'num_of_submissions = num_of_submissions + 1 '
-                    'WHERE user_id = %s'
-                )
-                cursor.execute(sql, [instance.xform.user_id])
+                if submission_count_deltas_enabled():
+                    # the counts are updated by flush_submission_count_deltas
+                    SubmissionCountDelta.objects.create(
+                        xform_id=instance.xform_id,
+                        last_submission_time=instance.date_created)
+                else:
+                    # update xform.num_of_submissions
+                    cursor = connection.cursor()
+                    sql = (
+                        'UPDATE logger_xform SET '
+                        'num_of_submissions = num_of_submissions + 1, '
+                        'last_submission_time = %s '
+                        'WHERE id = %s'
+                    )
+                    params = [instance.date_created, instance.xform_id]
+
+                    # update user profile.num_of_submissions
+                    cursor.execute(sql, params)
+                    sql = (
+                        'UPDATE main_userprofile SET '
+                        'num_of_submissions = num_of_submissions + 1 '
+                        'WHERE user_id = %s'
+                    )
+                    cursor.execute(sql, [instance.xform.user_id])
 
                 # Track submissions made today
                 _update_submission_count_for_today(instance.xform_id)
@@ -216,26 +235,34 @@ def update_xform_submission_count(instance_id, created):
 
 
 def update_xform_submission_count_delete(sender, instance, **kwargs):
+    reset_xform_data_version(instance.xform_id)
     try:
-        xform = XForm.objects.select_for_update().get(pk=instance.xform.pk)
+        if submission_count_deltas_enabled():
+            xform = XForm.objects.get(pk=instance.xform.pk)
+        else:
+            xform = XForm.objects.select_for_update().get(
+                pk=instance.xform.pk)
     except XForm.DoesNotExist:
         pass
     else:
-        xform.num_of_submissions -= 1
-        if xform.num_of_submissions < 0:
-            xform.num_of_submissions = 0
-        xform.save(update_fields=['num_of_submissions'])
-        profile_qs = User.profile.get_queryset()
-        try:
-            profile = profile_qs.select_for_update()\
-                .get(pk=xform.user.profile.pk)
-        except profile_qs.model.DoesNotExist:
-            pass
+        if submission_count_deltas_enabled():
+            SubmissionCountDelta.objects.create(xform=xform, delta=-1)
         else:
-            profile.num_of_submissions -= 1
-            if profile.num_of_submissions < 0:
-                profile.num_of_submissions = 0
-            profile.save()
+            xform.num_of_submissions -= 1
+            if xform.num_of_submissions < 0:
+                xform.num_of_submissions = 0
+            xform.save(update_fields=['num_of_submissions'])
+            profile_qs = User.profile.get_queryset()
+            try:
+                profile = profile_qs.select_for_update()\
+                    .get(pk=xform.user.profile.pk)
+            except profile_qs.model.DoesNotExist:
+                pass
+            else:
+                profile.num_of_submissions -= 1
+                if profile.num_of_submissions < 0:
+                    profile.num_of_submissions = 0
+                profile.save()
 
         # Track submissions made today
         _update_submission_count_for_today(
@@ -263,8 +290,10 @@ def save_full_json(instance_id, created):
         except Instance.DoesNotExist:
             pass
         else:
-            instance.json = instance.get_full_dict()
-            instance.save(update_fields=['json'])
+            # the json is complete if the id was allocated before the insert
+            if instance.json.get(ID) != instance.pk:
+                instance.json = instance.get_full_dict()
+                instance.save(update_fields=['json'])
 
 
 @app.task
@@ -280,6 +309,117 @@ def update_project_date_modified(instance_id, created):
         instance.xform.project.save(update_fields=['date_modified'])
 
 
+def process_submissions(submissions):
+    """
+    Runs update_xform_submission_count, save_full_json and
+    update_project_date_modified for a list of (instance_id, created) pairs
+    with one query per step instead of one per submission.
+    """
+    from multidb.pinning import use_master
+    from onadata.apps.logger.models.xform import clear_project_cache
+
+    created_ids = set(pk for (pk, created) in submissions if created)
+    with use_master:
+        instances = list(Instance.objects.select_related(
+            'xform', 'xform__project', 'user').filter(
+                pk__in=set(pk for (pk, created) in submissions)))
+        created_instances = [i for i in instances if i.pk in created_ids]
+
+        # update xform.num_of_submissions and profile.num_of_submissions
+        xform_counts = defaultdict(int)
+        user_counts = defaultdict(int)
+        last_submission_times = {}
+        for instance in created_instances:
+            xform_counts[instance.xform_id] += 1
+            user_counts[instance.xform.user_id] += 1
+            last_submission_times[instance.xform_id] = max(
+                instance.date_created,
+                last_submission_times.get(
+                    instance.xform_id, instance.date_created))
+
+        with transaction.atomic():
+            if submission_count_deltas_enabled():
+                SubmissionCountDelta.objects.bulk_create([
+                    SubmissionCountDelta(
+                        xform_id=i.xform_id,
+                        last_submission_time=i.date_created)
+                    for i in created_instances])
+            else:
+                cursor = connection.cursor()
+                for xform_id in sorted(xform_counts):
+                    cursor.execute(
+                        'UPDATE logger_xform SET '
+                        'num_of_submissions = num_of_submissions + %s, '
+                        'last_submission_time = %s '
+                        'WHERE id = %s',
+                        [xform_counts[xform_id],
+                         last_submission_times[xform_id], xform_id])
+                for user_id in sorted(user_counts):
+                    cursor.execute(
+                        'UPDATE main_userprofile SET '
+                        'num_of_submissions = num_of_submissions + %s '
+                        'WHERE user_id = %s',
+                        [user_counts[user_id], user_id])
+
+        for instance in created_instances:
+            # Track submissions made today
+            _update_submission_count_for_today(instance.xform_id)
+
+        for xform_id in xform_counts:
+            safe_delete('{}{}'.format(XFORM_DATA_VERSIONS, xform_id))
+            safe_delete('{}{}'.format(DATAVIEW_COUNT, xform_id))
+            safe_delete('{}{}'.format(XFORM_COUNT, xform_id))
+
+        # set json data, ensure the primary key is part of the json data
+        incomplete_instances = [
+            i for i in created_instances if i.json.get(ID) != i.pk]
+        for instance in incomplete_instances:
+            instance.json = instance.get_full_dict()
+        Instance.objects.bulk_update(incomplete_instances, ['json'])
+        for xform_id in set(i.xform_id for i in incomplete_instances):
+            reset_xform_data_version(xform_id, appended=True)
+
+        # update the date modified field of the projects which will change
+        # the etag value of the projects endpoint
+        projects = dict((i.xform.project_id, i.xform.project)
+                        for i in instances)
+        for project in listvalues(projects):
+            project.save(update_fields=['date_modified'])
+
+        # Clear project cache
+        for project_id in set(i.xform.project_id for i in created_instances):
+            clear_project_cache(project_id)
+
+
+def _schedule_post_submission_batch(queue):
+    process_post_submission_batch.apply_async(
+        countdown=getattr(settings, 'POST_SUBMISSION_BATCH_WINDOW', 5))
+
+
+register_queue(POST_SUBMISSION_QUEUE, _schedule_post_submission_batch)
+
+
+def queue_post_submission_processing(instance_id, created):
+    """
+    Adds a submission to the queue processed by
+    process_post_submission_batch.
+    """
+    queue_items(POST_SUBMISSION_QUEUE, [instance_id], {'created': created})
+
+
+@app.task
+def process_post_submission_batch():
+    """
+    Processes the submissions queued by queue_post_submission_processing in
+    one batch.
+    """
+    process_queue(
+        POST_SUBMISSION_QUEUE,
+        lambda items: process_submissions(
+            [(item.object_id, item.data.get('created')) for item in items]),
+        getattr(settings, 'POST_SUBMISSION_BATCH_SIZE', 1000))
+
+
 def convert_to_serializable_date(date):
     if hasattr(date, 'isoformat'):
         return date.isoformat()
@@ -352,14 +492,17 @@ class InstanceBaseClass(object):
         doc = self.get_dict()
         # pylint: disable=no-member
         if self.id:
+            # a new submission, whose id has been allocated, has no tags,
+            # notes or OSM data yet
+            new = self._state.adding
             doc.update({
                 UUID: self.uuid,
                 ID: self.id,
                 BAMBOO_DATASET_ID: self.xform.bamboo_dataset,
                 ATTACHMENTS: _get_attachments_from_instance(self),
                 STATUS: self.status,
-                TAGS: list(self.tags.names()),
-                NOTES: self.get_notes(),
+                TAGS: [] if new else list(self.tags.names()),
+                NOTES: [] if new else self.get_notes(),
                 VERSION: self.version,
                 DURATION: self.get_duration(),
                 XFORM_ID_STRING: self._parser.get_xform_id_string(),
@@ -369,7 +512,7 @@ class InstanceBaseClass(object):
                 SUBMITTED_BY: self.user.username if self.user else None
             })
 
-            for osm in self.osm_data.all():
+            for osm in [] if new else self.osm_data.all():
                 doc.update(osm.get_tags_with_prefix())
 
             if isinstance(self.deleted_at, datetime):
@@ -619,6 +762,67 @@ class Instance(models.Model, InstanceBaseClass):
             name__in=self.get_expected_media()
         ).distinct('name').order_by('name').count()
 
+    @classmethod
+    def allocate_ids(cls, count):
+        """
+        Returns count ids from the id sequence for new submissions, or None
+        if ids can not be allocated before the insert.
+        """
+        if connection.vendor != 'postgresql':
+            return None
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT nextval(pg_get_serial_sequence(%s, 'id')) "
+                "FROM generate_series(1, %s)",
+                [cls._meta.db_table, count])
+            return [row[0] for row in cursor.fetchall()]
+
+    def allocate_id(self):
+        """
+        Sets the primary key of a new submission from the id sequence so
+        that the full json, which includes the primary key, is written by the
+        insert. Returns False if ids can not be allocated before the insert.
+        """
+        ids = self.allocate_ids(1)
+        if ids is None:
+            return False
+
+        self.id = ids[0]
+
+        return True
+
+    def _update_json_dates(self, date_created=None):
+        """
+        Updates the dates in the json of a new submission, date_created and
+        date_modified are set on insert after the json was built.
+
+        The date_created set before the insert, e.g. the submission date in
+        the XML of the submission, replaces the one set on insert.
+        """
+        sql = 'UPDATE logger_instance SET json = json || %s::jsonb'
+        params = []
+        if date_created is not None and date_created != self.date_created:
+            self.date_created = date_created
+            sql += ', date_created = %s'
+            params.append(date_created)
+
+        dates = {
+            SUBMISSION_TIME: self.date_created.strftime(MONGO_STRFTIME),
+            DATE_MODIFIED: self.date_modified.strftime(MONGO_STRFTIME)
+        }
+        changed = {
+            key: value for (key, value) in dates.items()
+            if self.json.get(key) != value}
+        if changed or params:
+            self.json.update(changed)
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    sql + ' WHERE id = %s',
+                    [json.dumps(changed)] + params + [self.id])
+            # the submission is new, cached aggregates are updated with it
+            reset_xform_data_version(self.xform_id, appended=True)
+
     def save(self, *args, **kwargs):
         force = kwargs.get('force')
 
@@ -628,13 +832,26 @@ class Instance(models.Model, InstanceBaseClass):
         self._check_is_merged_dataset()
         self._check_active(force)
         self._set_geom()
+        # date_created is reset on insert
+        date_created = self.date_created if self._state.adding else None
+        allocated_id = self.pk is None and not args and self.allocate_id()
+        if allocated_id:
+            kwargs['force_insert'] = True
         self._set_json()
         self._set_survey_type()
         self._set_uuid()
         # pylint: disable=no-member
         self.version = self.json.get(VERSION, self.xform.version)
 
-        super(Instance, self).save(*args, **kwargs)
+        try:
+            super(Instance, self).save(*args, **kwargs)
+        except Exception:
+            if allocated_id:
+                self.id = None
+            raise
+
+        if kwargs.get('force_insert'):
+            self._update_json_dates(date_created)
 
     # pylint: disable=no-member
     def set_deleted(self, deleted_at=timezone.now(), user=None):
@@ -659,12 +876,18 @@ class Instance(models.Model, InstanceBaseClass):
 
 
 def post_save_submission(sender, instance=None, created=False, **kwargs):
+    reset_xform_data_version(instance.xform_id, appended=created)
     if instance.deleted_at is not None:
         _update_submission_count_for_today(instance.xform_id,
                                            incr=False,
                                            date_created=instance.date_created)
 
     if ASYNC_POST_SUBMISSION_PROCESSING_ENABLED:
+        if getattr(settings, 'POST_SUBMISSION_BATCH_PROCESSING_ENABLED',
+                   False):
+            queue_post_submission_processing(instance.pk, created)
+            return
+
         update_xform_submission_count.apply_async(args=[instance.pk, created])
         save_full_json.apply_async(args=[instance.pk, created])
         update_project_date_modified.apply_async(args=[instance.pk, created])
@@ -0,0 +1,123 @@
+"""
+Module containing the queued item model
+
+Work that is processed in batches is queued as QueuedItem rows. A batch is
+read with select_for_update(skip_locked=True) and deleted in the transaction
+that processes it, queued work is therefore kept until it is processed and
+is never processed by two batches at the same time.
+
+The processing of a queue is scheduled with the function registered for the
+queue name with register_queue.
+"""
+from datetime import timedelta
+
+from django.contrib.postgres.fields import JSONField
+from django.core.cache import cache
+from django.db import models, transaction
+from django.utils import timezone
+
+from onadata.celery import app
+from onadata.libs.utils.cache_tools import QUEUE_BATCH_SCHEDULED
+
+# seconds a scheduled batch is expected to start in, a queue with items
+# older than this is scheduled again by schedule_stale_queues
+QUEUE_SCHEDULE_TIMEOUT = 600
+
+_schedulers = {}
+
+
+class QueuedItem(models.Model):
+    """
+    An object queued for processing in a batch.
+    """
+    queue = models.CharField(max_length=64)
+    object_id = models.PositiveIntegerField()
+    data = JSONField(default=dict, blank=True)
+    date_created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        app_label = 'logger'
+        index_together = [('queue', 'id')]
+
+
+def register_queue(prefix, schedule):
+    """
+    Registers the function that schedules the processing of the queues whose
+    names start with prefix, it is called with the queue name.
+    """
+    _schedulers[prefix] = schedule
+
+
+def get_queue_scheduler(queue):
+    """
+    Returns the function registered for a queue name, the one with the
+    longest prefix if several match.
+    """
+    prefixes = [prefix for prefix in _schedulers if queue.startswith(prefix)]
+    if not prefixes:
+        return None
+
+    return _schedulers[max(prefixes, key=len)]
+
+
+def schedule_queue(queue):
+    """
+    Schedules the processing of a queue unless it has already been
+    scheduled.
+    """
+    schedule = get_queue_scheduler(queue)
+    if schedule is not None and cache.add(
+            '{}{}'.format(QUEUE_BATCH_SCHEDULED, queue), True,
+            QUEUE_SCHEDULE_TIMEOUT):
+        schedule(queue)
+
+
+def queue_items(queue, object_ids, data=None):
+    """
+    Adds objects to a queue, the processing of the queue is scheduled once
+    the current transaction commits.
+    """
+    QueuedItem.objects.bulk_create([
+        QueuedItem(queue=queue, object_id=object_id, data=data or {})
+        for object_id in object_ids])
+    transaction.on_commit(lambda: schedule_queue(queue))
+
+
+def process_queue(queue, handler, batchsize):
+    """
+    Calls handler with up to batchsize items of a queue, oldest first, and
+    deletes the items in the same transaction. Items locked by a concurrent
+    batch are skipped and the items stay queued if handler raises an
+    exception. The queue is scheduled again if items are left.
+
+    Returns the number of items processed.
+    """
+    # items queued from now on schedule another batch
+    cache.delete('{}{}'.format(QUEUE_BATCH_SCHEDULED, queue))
+
+    with transaction.atomic():
+        items = list(
+            QueuedItem.objects.select_for_update(skip_locked=True)
+            .filter(queue=queue).order_by('pk')[:batchsize])
+        if items:
+            handler(items)
+            QueuedItem.objects.filter(
+                pk__in=[item.pk for item in items]).delete()
+
+    if QueuedItem.objects.filter(queue=queue).exists():
+        schedule_queue(queue)
+
+    return len(items)
+
+
+@app.task
+def schedule_stale_queues():
+    """
+    Schedules the queues with items older than QUEUE_SCHEDULE_TIMEOUT, whose
+    scheduled batch was lost or failed.
+    """
+    stale_date = timezone.now() - timedelta(seconds=QUEUE_SCHEDULE_TIMEOUT)
+    queues = QueuedItem.objects.filter(date_created__lt=stale_date)\
+        .order_by().values_list('queue', flat=True).distinct()
+    for queue in queues:
+        schedule_queue(queue)
@@ -0,0 +1,158 @@
+"""
+Module containing the submission count delta model
+
+Submission count changes are recorded as rows that are periodically added
+to XForm.num_of_submissions and UserProfile.num_of_submissions by the
+flush_submission_count_deltas task, concurrent submissions to the same form
+therefore do not wait on the lock of a single logger_xform row.
+"""
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connection, models, transaction
+from django.db.models import Max, Sum
+
+from onadata.celery import app
+
+SUBMISSION_COUNT_FLUSH_BATCHSIZE = 10000
+
+
+def submission_count_deltas_enabled():
+    """
+    Returns True if submission counts are updated through
+    SubmissionCountDelta rows.
+    """
+    return getattr(settings, 'SUBMISSION_COUNT_DELTAS_ENABLED', False)
+
+
+class SubmissionCountDelta(models.Model):
+    """
+    A change to the number of submissions of an XForm that has not been
+    added to XForm.num_of_submissions yet.
+    """
+    xform = models.ForeignKey(
+        'logger.XForm', on_delete=models.CASCADE,
+        related_name='submission_count_deltas')
+    delta = models.IntegerField(default=1)
+    last_submission_time = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        app_label = 'logger'
+
+
+def get_pending_submission_count(xform_ids=None, user_id=None):
+    """
+    Returns the number of submissions, for the given XForms or for the XForms
+    of the given user, that have not been added to num_of_submissions yet.
+    """
+    if not submission_count_deltas_enabled():
+        return 0
+
+    queryset = SubmissionCountDelta.objects.all()
+    if xform_ids is not None:
+        queryset = queryset.filter(xform_id__in=xform_ids)
+    if user_id is not None:
+        queryset = queryset.filter(xform__user_id=user_id)
+
+    return queryset.aggregate(count=Sum('delta'))['count'] or 0
+
+
+def get_pending_submission_counts(xform_ids):
+    """
+    Returns the number of submissions of each of the given XForms that have
+    not been added to num_of_submissions yet, loaded in one query.
+    """
+    if not submission_count_deltas_enabled():
+        return {}
+
+    return dict(
+        SubmissionCountDelta.objects.filter(xform_id__in=xform_ids)
+        .values('xform_id').annotate(count=Sum('delta'))
+        .order_by().values_list('xform_id', 'count'))
+
+
+def recount_submissions(xform):
+    """
+    Returns the number of submissions of an XForm that are not pending in
+    SubmissionCountDelta rows, the pending rows not locked by a running
+    flush are counted and deleted and added to the
+    UserProfile.num_of_submissions of the XForm owner.
+
+    Must be called in the transaction that saves the count, the XForm row is
+    locked until then so that a flush can not update it in between and
+    xform.num_of_submissions is reloaded from the locked row.
+    """
+    cursor = connection.cursor()
+    cursor.execute(
+        'SELECT num_of_submissions FROM logger_xform WHERE id = %s '
+        'FOR UPDATE', [xform.pk])
+    xform.num_of_submissions = cursor.fetchone()[0]
+    pks = list(
+        SubmissionCountDelta.objects.select_for_update(skip_locked=True)
+        .filter(xform=xform).values_list('pk', flat=True))
+    # one statement so that the submissions and the deltas are read from
+    # the same snapshot, the deltas of a running flush are added by it later
+    cursor.execute(
+        'SELECT '
+        '(SELECT COUNT(*) FROM logger_instance '
+        ' WHERE xform_id = %s AND deleted_at IS NULL) - '
+        '(SELECT COALESCE(SUM(delta), 0) FROM logger_submissioncountdelta '
+        ' WHERE xform_id = %s AND NOT (id = ANY(%s::integer[])))',
+        [xform.pk, xform.pk, pks])
+    count = cursor.fetchone()[0]
+
+    if pks:
+        total = SubmissionCountDelta.objects.filter(pk__in=pks)\
+            .aggregate(count=Sum('delta'))['count']
+        cursor.execute(
+            'UPDATE main_userprofile SET '
+            'num_of_submissions = GREATEST(num_of_submissions + %s, 0) '
+            'WHERE user_id = %s',
+            [total, xform.user_id])
+        SubmissionCountDelta.objects.filter(pk__in=pks).delete()
+
+    return count
+
+
+@app.task
+def flush_submission_count_deltas(batchsize=SUBMISSION_COUNT_FLUSH_BATCHSIZE):
+    """
+    Adds the pending SubmissionCountDelta rows to XForm.num_of_submissions
+    and UserProfile.num_of_submissions with a single update per XForm and
+    user. Rows locked by a concurrent flush are skipped.
+    """
+    with transaction.atomic():
+        pks = list(
+            SubmissionCountDelta.objects.select_for_update(skip_locked=True)
+            .order_by('pk').values_list('pk', flat=True)[:batchsize])
+        if not pks:
+            return 0
+
+        totals = SubmissionCountDelta.objects.filter(pk__in=pks)\
+            .values('xform_id', 'xform__user_id')\
+            .annotate(count=Sum('delta'),
+                      last_submission_time=Max('last_submission_time'))\
+            .order_by('xform_id')
+        user_totals = defaultdict(int)
+        cursor = connection.cursor()
+        for total in totals:
+            cursor.execute(
+                'UPDATE logger_xform SET '
+                'num_of_submissions = GREATEST(num_of_submissions + %s, 0), '
+                'last_submission_time = '
+                'GREATEST(last_submission_time, %s) '
+                'WHERE id = %s',
+                [total['count'], total['last_submission_time'],
+                 total['xform_id']])
+            user_totals[total['xform__user_id']] += total['count']
+
+        for user_id in sorted(user_totals):
+            cursor.execute(
+                'UPDATE main_userprofile SET '
+                'num_of_submissions = GREATEST(num_of_submissions + %s, 0) '
+                'WHERE user_id = %s',
+                [user_totals[user_id], user_id])
+
+        SubmissionCountDelta.objects.filter(pk__in=pks).delete()
+
+    return len(pks)
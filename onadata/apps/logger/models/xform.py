@@ -25,22 +25,24 @@ from future.utils import listvalues
 from guardian.models import GroupObjectPermissionBase, UserObjectPermissionBase
 from past.builtins import cmp
 from pyxform import (
-    SurveyElementBuilder, constants, create_survey_element_from_dict)
+    SurveyElementBuilder, create_survey_element_from_dict)
 from pyxform.question import Question
 from pyxform.section import RepeatingSection
-from pyxform.xform2json import create_survey_element_from_xml
 from taggit.managers import TaggableManager
 
 from onadata.apps.logger.xform_instance_parser import (XLSFormError,
                                                        clean_and_parse_xml)
 from django.utils.html import conditional_escape
+from onadata.apps.logger.models.submission_count import (
+    get_pending_submission_count, recount_submissions,
+    submission_count_deltas_enabled)
 from onadata.libs.models.base_model import BaseModel
 from onadata.libs.utils.cache_tools import (
     IS_ORG, PROJ_BASE_FORMS_CACHE, PROJ_FORMS_CACHE,
     PROJ_NUM_DATASET_CACHE, PROJ_SUB_DATE_CACHE, XFORM_COUNT,
     PROJ_OWNER_CACHE, XFORM_SUBMISSION_COUNT_FOR_DAY,
-    XFORM_SUBMISSION_COUNT_FOR_DAY_DATE, safe_delete)
-from onadata.libs.utils.common_tags import (DURATION, ID, KNOWN_MEDIA_TYPES,
+    XFORM_SUBMISSION_COUNT_FOR_DAY_DATE, XFORM_TOPIC_METADATA, safe_delete)
+from onadata.libs.utils.common_tags import (DURATION, ID,
                                             MEDIA_ALL_RECEIVED, MEDIA_COUNT,
                                             NOTES, SUBMISSION_TIME,
                                             SUBMITTED_BY, TAGS, TOTAL_MEDIA,
@@ -49,6 +51,7 @@ from onadata.libs.utils.common_tags import (DURATION, ID, KNOWN_MEDIA_TYPES,
                                             MULTIPLE_SELECT_TYPE,
                                             DATE_MODIFIED)
 from onadata.libs.utils.model_tools import queryset_iterator
+from onadata.libs.utils.survey_cache import CompiledSurvey, survey_cache
 from onadata.libs.utils.mongo import _encode_for_mongo
 
 QUESTION_TYPES_TO_EXCLUDE = [
@@ -303,21 +306,39 @@ class XFormMixin(object):
 
         return id_string
 
+    def get_compiled_survey(self):
+        """
+        Returns the CompiledSurvey of the form from the process-wide survey
+        cache, or compiled from the survey set on this object.
+        """
+        survey = getattr(self, "_survey", None)
+        compiled_survey = getattr(self, "_compiled_survey", None)
+        if compiled_survey is None or (
+                survey is not None and compiled_survey.survey is not survey):
+            if survey is not None:
+                compiled_survey = CompiledSurvey(survey)
+            else:
+                compiled_survey = survey_cache.get(self)
+            self._compiled_survey = compiled_survey
+
+        return compiled_survey
+
+    compiled_survey = property(get_compiled_survey)
+
     def get_survey(self):
         if not hasattr(self, "_survey"):
-            try:
-                builder = SurveyElementBuilder()
-                self._survey = \
-                    builder.create_survey_element_from_json(self.json)
-            except ValueError:
-                xml = b(bytearray(self.xml, encoding='utf-8'))
-                self._survey = create_survey_element_from_xml(xml)
+            self._survey = self.compiled_survey.survey
         return self._survey
 
     survey = property(get_survey)
 
+    def _clear_compiled_survey(self):
+        for attr in ("_survey", "_compiled_survey"):
+            if hasattr(self, attr):
+                delattr(self, attr)
+
     def get_survey_elements(self):
-        return self.survey.iter_descendants()
+        return iter(self.compiled_survey.elements)
 
     def get_survey_element(self, name_or_xpath):
         """Searches survey element by xpath first,
@@ -399,12 +420,7 @@ class XFormMixin(object):
         ]
 
     def geopoint_xpaths(self):
-        survey_elements = self.get_survey_elements()
-
-        return [
-            e.get_abbreviated_xpath() for e in survey_elements
-            if e.bind.get(u'type') == u'geopoint'
-        ]
+        return list(self.compiled_survey.geopoint_xpaths)
 
     def xpath_of_first_geopoint(self):
         geo_xpaths = self.geopoint_xpaths()
@@ -506,16 +522,11 @@ class XFormMixin(object):
         return [remove_first_index(header) for header in self.get_headers()]
 
     def get_element(self, abbreviated_xpath):
-        if not hasattr(self, "_survey_elements"):
-            self._survey_elements = {}
-            for e in self.get_survey_elements():
-                self._survey_elements[e.get_abbreviated_xpath()] = e
-
         def remove_all_indices(xpath):
             return re.sub(r"\[\d+\]", u"", xpath)
 
         clean_xpath = remove_all_indices(abbreviated_xpath)
-        return self._survey_elements.get(clean_xpath)
+        return self.compiled_survey.xpath_elements.get(clean_xpath)
 
     def get_default_language(self):
         if not hasattr(self, '_default_language'):
@@ -634,54 +645,51 @@ class XFormMixin(object):
             self.has_start_time = False
 
     def get_survey_elements_of_type(self, element_type):
-        return [
-            e for e in self.get_survey_elements() if e.type == element_type
-        ]
+        return list(self.compiled_survey.get_elements_of_type(element_type))
 
-    def get_survey_elements_with_choices(self):
-        if not hasattr(self, '_survey_elements_with_choices'):
-            choices_type = [
-                constants.SELECT_ONE, constants.SELECT_ALL_THAT_APPLY
-            ]
+    def get_element_type(self, abbreviated_xpath):
+        """
+        Returns the type of the survey element at abbreviated_xpath or None
+        if there is no such element.
+        """
+        xpath_types = self.compiled_survey.xpath_types
+        if abbreviated_xpath in xpath_types:
+            return xpath_types[abbreviated_xpath]
 
-            self._survey_elements_with_choices = [
-                e for e in self.get_survey_elements() if e.type in choices_type
-            ]
+        element = self.get_element(abbreviated_xpath)
 
-        return self._survey_elements_with_choices
+        return element.type if element else None
+
+    def get_survey_elements_with_choices(self):
+        return self.compiled_survey.elements_with_choices
 
     def get_select_one_xpaths(self):
         """
         Returns abbreviated_xpath for SELECT_ONE questions in the survey.
         """
-        if not hasattr(self, '_select_one_xpaths'):
-            self._select_one_xpaths = [
-                e.get_abbreviated_xpath() for e in sum([
-                    self.get_survey_elements_of_type(select)
-                    for select in [constants.SELECT_ONE]], [])]
-
-        return self._select_one_xpaths
+        return self.compiled_survey.select_one_xpaths
 
     def get_select_multiple_xpaths(self):
         """
         Returns abbreviated_xpath for SELECT_ALL_THAT_APPLY questions in the
         survey.
         """
-        if not hasattr(self, '_select_multiple_xpaths'):
-            self._select_multiple_xpaths = [
-                e.get_abbreviated_xpath() for e in sum([
-                    self.get_survey_elements_of_type(select)
-                    for select in [constants.SELECT_ALL_THAT_APPLY]], [])]
-
-        return self._select_multiple_xpaths
+        return self.compiled_survey.select_multiple_xpaths
 
     def get_media_survey_xpaths(self):
-        return [
-            e.get_abbreviated_xpath()
-            for e in sum([
-                self.get_survey_elements_of_type(m) for m in KNOWN_MEDIA_TYPES
-            ], [])
-        ]
+        return list(self.compiled_survey.media_xpaths)
+
+    def get_repeat_xpaths(self):
+        """
+        Returns abbreviated_xpath for repeats in the survey.
+        """
+        return self.compiled_survey.repeat_xpaths
+
+    def get_integer_survey_elements(self):
+        """
+        Returns the integer questions in the survey.
+        """
+        return self.compiled_survey.get_elements_of_type(u'integer')
 
     def get_osm_survey_xpaths(self):
         """
@@ -847,6 +855,7 @@ class XForm(XFormMixin, BaseModel):
                 self.json = survey.to_json()
                 self.xml = survey.to_xml()
                 self._set_encrypted_field()
+                self._set_hash()
 
     def update(self, *args, **kwargs):
         super(XForm, self).save(*args, **kwargs)
@@ -922,6 +931,12 @@ class XForm(XFormMixin, BaseModel):
 
         super(XForm, self).save(*args, **kwargs)
 
+        if update_fields is None or \
+                {'json', 'xml', 'hash'}.intersection(update_fields):
+            # the form may have been replaced
+            self._clear_compiled_survey()
+            survey_cache.invalidate(self.pk)
+
     def __str__(self):
         return getattr(self, "id_string", "")
 
@@ -965,23 +980,49 @@ class XForm(XFormMixin, BaseModel):
                 deleted_at__isnull=True):
             metadata.soft_delete()
 
-    def submission_count(self, force_update=False):
-        if self.num_of_submissions == 0 or force_update:
-            if self.is_merged_dataset:
-                count = self.mergedxform.xforms.aggregate(
-                    num=Sum('num_of_submissions')).get('num') or 0
-            else:
-                count = self.instances.filter(deleted_at__isnull=True).count()
+    def submission_count(self, force_update=False, pending_counts=None):
+        """
+        Returns the number of submissions of the form. With submission count
+        deltas, the count of a new form is the sum of its pending deltas and
+        is only recounted when force_update is set. pending_counts may hold
+        the pending counts of the form loaded with those of other forms by
+        get_pending_submission_counts().
+        """
+        deltas_enabled = submission_count_deltas_enabled()
+        if force_update or (self.num_of_submissions == 0 and (
+                self.is_merged_dataset or not deltas_enabled)):
+            with transaction.atomic():
+                if self.is_merged_dataset:
+                    count = self.mergedxform.xforms.aggregate(
+                        num=Sum('num_of_submissions')).get('num') or 0
+                elif deltas_enabled:
+                    count = recount_submissions(self)
+                else:
+                    count = self.instances.filter(
+                        deleted_at__isnull=True).count()
 
-            if count != self.num_of_submissions:
-                self.num_of_submissions = count
-                self.save(update_fields=['num_of_submissions'])
+                updated = count != self.num_of_submissions
+                if updated:
+                    self.num_of_submissions = count
+                    self.save(update_fields=['num_of_submissions'])
 
+            if updated:
                 # clear cache
                 key = '{}{}'.format(XFORM_COUNT, self.pk)
                 safe_delete(key)
 
-        return self.num_of_submissions
+        if not deltas_enabled:
+            return self.num_of_submissions
+
+        # add the submissions not yet added to num_of_submissions
+        if pending_counts is not None and not self.is_merged_dataset:
+            return self.num_of_submissions + pending_counts.get(self.pk, 0)
+
+        xform_ids = list(self.mergedxform.xforms.values_list(
+            'pk', flat=True)) if self.is_merged_dataset else [self.pk]
+
+        return self.num_of_submissions + get_pending_submission_count(
+            xform_ids)
 
     submission_count.short_description = ugettext_lazy("Submission Count")
 
@@ -1068,6 +1109,7 @@ def set_object_permissions(sender, instance=None, created=False, **kwargs):
     project.refresh_from_db()
     clear_project_cache(project.pk)
     safe_delete('{}{}'.format(IS_ORG, instance.pk))
+    safe_delete('{}{}'.format(XFORM_TOPIC_METADATA, instance.pk))
 
     if created:
         from onadata.libs.permissions import OwnerRole
@@ -3,20 +3,27 @@ from datetime import datetime
 from datetime import timedelta
 
 from django.http.request import HttpRequest
+from django.test.utils import override_settings
 from django.utils.timezone import utc
 from django_digest.test import DigestAuth
 from mock import patch
 
 from onadata.apps.logger.models import XForm, Instance, SubmissionReview
 from onadata.apps.logger.models.instance import (
-    get_id_string_from_xml_str, numeric_checker)
+    POST_SUBMISSION_QUEUE, get_id_string_from_xml_str, numeric_checker,
+    process_post_submission_batch, queue_post_submission_processing,
+    save_full_json)
+from onadata.apps.logger.models.queued_item import QueuedItem
+from onadata.apps.logger.models.submission_count import (
+    SubmissionCountDelta, flush_submission_count_deltas,
+    get_pending_submission_count, get_pending_submission_counts)
 from onadata.apps.main.tests.test_base import TestBase
 from onadata.apps.viewer.models.parsed_instance import (
     ParsedInstance, query_data)
 from onadata.libs.serializers.submission_review_serializer import \
     SubmissionReviewSerializer
 from onadata.libs.utils.common_tags import MONGO_STRFTIME, SUBMISSION_TIME, \
-    XFORM_ID_STRING, SUBMITTED_BY
+    XFORM_ID_STRING, SUBMITTED_BY, ID
 
 
 class TestInstance(TestBase):
@@ -326,3 +333,93 @@ class TestInstance(TestBase):
         string_value = "Hello World"
         result = numeric_checker(string_value)
         self.assertEqual(result, "Hello World")
+
+    @override_settings(SUBMISSION_COUNT_DELTAS_ENABLED=True)
+    def test_submission_count_deltas(self):
+        """
+        Test that submission counts are recorded as SubmissionCountDelta rows
+        and added to the form and profile counts when flushed.
+        """
+        self._publish_transportation_form()
+        for a in range(3):
+            self._submit_transport_instance(survey_at=a)
+        self.xform.refresh_from_db()
+
+        self.assertEqual(SubmissionCountDelta.objects.count(), 3)
+        self.assertEqual(self.xform.num_of_submissions, 0)
+        self.assertEqual(
+            get_pending_submission_count(user_id=self.user.pk), 3)
+        # the count of a new form is its pending deltas, without a recount
+        self.assertEqual(self.xform.submission_count(), 3)
+        self.assertEqual(SubmissionCountDelta.objects.count(), 3)
+        self.assertEqual(self.xform.submission_count(
+            pending_counts=get_pending_submission_counts([self.xform.pk])), 3)
+
+        self.assertEqual(flush_submission_count_deltas(), 3)
+        self.xform.refresh_from_db()
+        self.user.profile.refresh_from_db()
+        self.assertEqual(SubmissionCountDelta.objects.count(), 0)
+        self.assertEqual(self.xform.num_of_submissions, 3)
+        self.assertEqual(self.user.profile.num_of_submissions, 3)
+        self.assertIsNotNone(self.xform.last_submission_time)
+
+        self.xform.instances.last().delete()
+        self.xform.refresh_from_db()
+        self.assertEqual(self.xform.num_of_submissions, 3)
+        self.assertEqual(self.xform.submission_count(), 2)
+
+        # a recount includes and removes the pending deltas
+        self.assertEqual(self.xform.submission_count(force_update=True), 2)
+        self.xform.refresh_from_db()
+        self.user.profile.refresh_from_db()
+        self.assertEqual(SubmissionCountDelta.objects.count(), 0)
+        self.assertEqual(self.xform.num_of_submissions, 2)
+        self.assertEqual(self.user.profile.num_of_submissions, 2)
+
+    def test_queue_post_submission_processing(self):
+        """
+        Test that queued submissions are processed in a batch.
+        """
+        self._publish_transportation_form()
+        for a in range(2):
+            self._submit_transport_instance(survey_at=a)
+        instance_ids = list(
+            self.xform.instances.values_list('pk', flat=True))
+        Instance.objects.filter(pk__in=instance_ids).update(json={})
+        XForm.objects.filter(pk=self.xform.pk).update(num_of_submissions=0)
+
+        for instance_id in instance_ids:
+            queue_post_submission_processing(instance_id, True)
+        self.assertEqual(QueuedItem.objects.filter(
+            queue=POST_SUBMISSION_QUEUE).count(), 2)
+
+        process_post_submission_batch()
+        self.xform.refresh_from_db()
+        self.assertEqual(self.xform.num_of_submissions, 2)
+        for instance in Instance.objects.filter(pk__in=instance_ids):
+            self.assertEqual(instance.json['_id'], instance.pk)
+        self.assertFalse(QueuedItem.objects.filter(
+            queue=POST_SUBMISSION_QUEUE).exists())
+
+    def test_json_includes_id_on_insert(self):
+        """
+        Test that the json of a new submission is complete when inserted and
+        save_full_json does not build it again.
+        """
+        self._publish_transportation_form()
+        path = os.path.join(
+            self.this_directory, 'fixtures', 'transportation', 'instances',
+            self.surveys[0], self.surveys[0] + '.xml')
+        with open(path) as f:
+            xml = f.read()
+        instance = Instance.objects.create(
+            xml=xml, user=self.user, xform=self.xform)
+        instance.refresh_from_db()
+
+        self.assertEqual(instance.json[ID], instance.pk)
+        self.assertEqual(instance.json[SUBMISSION_TIME],
+                         instance.date_created.strftime(MONGO_STRFTIME))
+
+        with patch.object(Instance, 'get_full_dict') as mock_get_full_dict:
+            save_full_json(instance.pk, True)
+            self.assertFalse(mock_get_full_dict.called)
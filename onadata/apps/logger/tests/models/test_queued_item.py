@@ -0,0 +1,98 @@
+"""
+QueuedItem Model Tests Module
+"""
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+from mock import MagicMock, patch
+
+from onadata.apps.logger.models.queued_item import (
+    QueuedItem, _schedulers, get_queue_scheduler, process_queue,
+    queue_items, register_queue, schedule_queue, schedule_stale_queues)
+from onadata.libs.utils.cache_tools import QUEUE_BATCH_SCHEDULED
+
+
+class TestQueuedItem(TestCase):
+    """
+    TestQueuedItem Class
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.schedule = MagicMock()
+        register_queue('test-', self.schedule)
+
+    def tearDown(self):
+        _schedulers.pop('test-', None)
+
+    def test_get_queue_scheduler(self):
+        """
+        Test the function registered with the longest prefix is returned.
+        """
+        other_schedule = MagicMock()
+        register_queue('test-other-', other_schedule)
+        try:
+            self.assertEqual(get_queue_scheduler('test-1'), self.schedule)
+            self.assertEqual(
+                get_queue_scheduler('test-other-1'), other_schedule)
+            self.assertIsNone(get_queue_scheduler('unknown'))
+        finally:
+            _schedulers.pop('test-other-', None)
+
+    def test_schedule_queue(self):
+        """
+        Test a queue is scheduled once until its batch runs.
+        """
+        schedule_queue('test-1')
+        schedule_queue('test-1')
+        self.schedule.assert_called_once_with('test-1')
+        self.assertTrue(cache.get(
+            '{}{}'.format(QUEUE_BATCH_SCHEDULED, 'test-1')))
+
+    def test_process_queue(self):
+        """
+        Test queued items are passed to the handler in batches and deleted.
+        """
+        queue_items('test-1', [1, 2, 3], {'created': True})
+        queue_items('test-2', [4])
+        handler = MagicMock()
+
+        self.assertEqual(process_queue('test-1', handler, 2), 2)
+        items = handler.call_args[0][0]
+        self.assertEqual([item.object_id for item in items], [1, 2])
+        self.assertEqual(items[0].data, {'created': True})
+        # the remaining item is scheduled
+        self.schedule.assert_called_once_with('test-1')
+
+        self.assertEqual(process_queue('test-1', handler, 2), 1)
+        self.assertEqual(process_queue('test-1', handler, 2), 0)
+        self.assertEqual(handler.call_count, 2)
+        self.assertEqual(
+            list(QueuedItem.objects.values_list('object_id', flat=True)),
+            [4])
+
+    def test_process_queue_handler_error(self):
+        """
+        Test the items stay queued when the handler raises an exception.
+        """
+        queue_items('test-1', [1, 2])
+        handler = MagicMock(side_effect=ValueError)
+
+        with self.assertRaises(ValueError):
+            process_queue('test-1', handler, 10)
+        self.assertEqual(QueuedItem.objects.filter(queue='test-1').count(), 2)
+
+    @patch('onadata.apps.logger.models.queued_item.schedule_queue')
+    def test_schedule_stale_queues(self, mock_schedule_queue):
+        """
+        Test the queues with old items are scheduled again.
+        """
+        queue_items('test-1', [1])
+        queue_items('test-2', [2])
+        QueuedItem.objects.filter(queue='test-1').update(
+            date_created=timezone.now() - timedelta(hours=1))
+
+        schedule_stale_queues()
+        mock_schedule_queue.assert_called_once_with('test-1')
@@ -12,6 +12,7 @@ from onadata.apps.logger.models.xform import (DuplicateUUIDError,
                                               check_xform_uuid)
 from onadata.apps.main.tests.test_base import TestBase
 from onadata.apps.logger.xform_instance_parser import XLSFormError
+from onadata.libs.utils.survey_cache import survey_cache
 
 
 class TestXForm(TestBase):
@@ -223,3 +224,54 @@ class TestXForm(TestBase):
 
         with self.assertRaises(XLSFormError):
             xform.save()
+
+    def test_compiled_survey_is_shared_until_form_is_replaced(self):
+        """
+        Test the compiled survey of a form is shared by XForm objects until
+        the form is replaced.
+        """
+        self._publish_transportation_form()
+        survey_cache.clear()
+
+        xform = XForm.objects.get(pk=self.xform.pk)
+        survey = xform.survey
+        self.assertEqual(survey_cache.stats()['misses'], 1)
+        self.assertEqual(
+            xform.get_element('transport/available_transportation_types_to_'
+                              'referral_facility').type,
+            'select all that apply')
+        self.assertEqual(xform.get_repeat_xpaths(), [])
+
+        xform = XForm.objects.get(pk=self.xform.pk)
+        self.assertIs(xform.survey, survey)
+        self.assertEqual(survey_cache.stats()['hits'], 1)
+
+        # replacing the form changes the form hash
+        xform.hash = 'md5:replaced'
+        xform.save()
+        self.assertEqual(survey_cache.stats()['size'], 0)
+
+        xform = XForm.objects.get(pk=self.xform.pk)
+        self.assertIsNot(xform.survey, survey)
+        self.assertEqual(survey_cache.stats()['misses'], 2)
+
+    def test_survey_element_type_index(self):
+        """
+        Test survey elements are looked up by type and xpath from the
+        compiled survey.
+        """
+        self._publish_transportation_form()
+        xform = XForm.objects.get(pk=self.xform.pk)
+
+        for element_type in ['select all that apply', 'group', 'osm']:
+            self.assertEqual(
+                xform.get_survey_elements_of_type(element_type),
+                [e for e in xform.survey.iter_descendants()
+                 if e.type == element_type])
+        self.assertEqual(
+            xform.get_element_type(
+                'transport/available_transportation_types_to_referral_'
+                'facility'),
+            'select all that apply')
+        self.assertEqual(xform.get_element_type('transport'), 'group')
+        self.assertIsNone(xform.get_element_type('does/not/exist'))
@@ -12,7 +12,7 @@ from onadata.apps.logger.xform_instance_parser import get_uuid_from_xml,\
 from onadata.libs.utils.common_tags import XFORM_ID_STRING
 from onadata.apps.logger.models.xform import XForm
 from onadata.apps.logger.xform_instance_parser import _xml_node_to_dict,\
-    clean_and_parse_xml
+    clean_and_parse_xml, _flatten_dict_nest_repeats, _parse_xml_to_dicts
 
 
 XML = u"xml"
@@ -229,3 +229,39 @@ class TestXFormInstanceParser(TestBase):
                 xml_dict['#document']['RW_OUNIS_2016']['S2A']))
             with open(json_file) as file:
                 self.assertEqual(json.loads(file.read()), xml_dict)
+
+    def test_parse_xml_to_dicts_matches_xml_node_to_dict(self):
+        xml_str = '<?xml version=\'1.0\' ?><data id="nested_repeats" ' \
+                  'xmlns:jr="http://openrosa.org/javarosa">' \
+                  '<kids jr:template=""><name>Abel &amp; Cain</name>' \
+                  '<toys><toy>car</toy></toys><toys><toy>ball</toy></toys>' \
+                  '</kids><kids><name>Seth</name></kids>' \
+                  '<info>\n  <age>80</age>\n  <note> </note>\n</info>' \
+                  '<meta><instanceID>uuid:1</instanceID></meta></data>'
+        repeats = ['kids', 'kids/toys']
+        root_node = clean_and_parse_xml(xml_str).documentElement
+        expected_dict = _xml_node_to_dict(root_node, repeats)
+        expected_flat_dict = {}
+        for path, value in _flatten_dict_nest_repeats(expected_dict, []):
+            expected_flat_dict[u"/".join(path[1:])] = value
+
+        root_node_name, xml_dict, flat_dict, attributes = \
+            _parse_xml_to_dicts(xml_str, repeats)
+        self.assertEqual(root_node_name, u'data')
+        self.assertEqual(xml_dict, expected_dict)
+        self.assertEqual(flat_dict, expected_flat_dict)
+        self.assertEqual(attributes, [
+            (u'xmlns:jr', u'http://openrosa.org/javarosa'),
+            (u'id', u'nested_repeats'), (u'jr:template', u'')])
+
+        # a repeated node that is not a repeat is flattened from the dict
+        with open(os.path.join(
+                os.path.dirname(os.path.abspath(__file__)),
+                "../fixtures/repeated_nodes.xml")) as xml_file:
+            xml_str = xml_file.read()
+        root_node_name, xml_dict, flat_dict, attributes = \
+            _parse_xml_to_dicts(xml_str)
+        self.assertEqual(
+            xml_dict, _xml_node_to_dict(
+                clean_and_parse_xml(xml_str).documentElement))
+        self.assertIsNone(flat_dict)
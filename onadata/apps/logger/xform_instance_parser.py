@@ -1,9 +1,12 @@
 import logging
 import re
+from io import BytesIO
 import dateutil.parser
 from builtins import str as text
 from future.utils import python_2_unicode_compatible
+from lxml import etree
 from xml.dom import minidom, Node
+from xml.parsers.expat import ExpatError
 
 from django.utils.encoding import smart_text, smart_str
 from django.utils.translation import ugettext as _
@@ -299,6 +302,151 @@ def _get_all_attributes(node):
             yield pair
 
 
+XML_NAMESPACE = 'http://www.w3.org/XML/1998/namespace'
+
+
+def _get_node_name(name, prefix=None, nsmap=None):
+    """
+    Returns the qualified name, prefix:name, of an lxml element or attribute
+    name in Clark notation i.e. {namespace}name.
+    """
+    if name[0] != '{':
+        return name
+
+    namespace, name = name[1:].split('}', 1)
+    if prefix is None and namespace == XML_NAMESPACE:
+        prefix = 'xml'
+    elif prefix is None and nsmap:
+        prefix = next((key for (key, value) in nsmap.items()
+                       if value == namespace and key), None)
+
+    return u'%s:%s' % (prefix, name) if prefix else name
+
+
+class _ParsedNode(object):
+    """
+    A node of an XForm instance being parsed by _parse_xml_to_dicts.
+    """
+    __slots__ = ('name', 'xpath', 'value', 'flat_dict', 'in_list',
+                 'repeated_names', 'has_children')
+
+    def __init__(self, name, xpath, flat_dict, in_list=False):
+        self.name = name
+        self.xpath = xpath
+        self.value = {}
+        # the flat dict the leaf nodes below this node are added to, a new
+        # one for each node in a list
+        self.flat_dict = flat_dict
+        self.in_list = in_list
+        # names of child nodes that are repeated but are not repeats
+        self.repeated_names = set()
+        self.has_children = False
+
+
+def _parse_xml_to_dicts(xml_str, repeats=[], encrypted=False):
+    """
+    Parses an XForm instance in a single pass with lxml's iterparse, nodes
+    are freed once they have been parsed.
+
+    Returns the root node name, the dict _xml_node_to_dict returns for the
+    root node, the flat dict _flatten_dict_nest_repeats returns for that
+    dict and the attributes of the nodes in document order. The flat dict is
+    None when a node that is not a repeat is repeated, it is then built from
+    the dict.
+    """
+    repeats = set(repeats)
+    xml_bytes = smart_text(xml_str).strip().encode('utf-8')
+    events = etree.iterparse(
+        BytesIO(xml_bytes), events=('start', 'end', 'start-ns'),
+        encoding='utf-8', resolve_entities=False, no_network=True,
+        huge_tree=True)
+
+    attributes = []
+    namespaces = []
+    stack = []
+    flat_dict = {}
+    root_name = None
+    result = None
+
+    try:
+        for event, element in events:
+            if event == 'start-ns':
+                prefix, namespace = element
+                namespaces.append(
+                    (u'xmlns:%s' % prefix if prefix else u'xmlns',
+                     namespace))
+            elif event == 'start':
+                name = _get_node_name(element.tag, element.prefix)
+                attributes.extend(namespaces)
+                namespaces = []
+                attributes.extend(
+                    (_get_node_name(key, nsmap=element.nsmap), value)
+                    for (key, value) in element.attrib.items())
+
+                if not stack:
+                    root_name = name
+                    stack.append(_ParsedNode(name, u'', flat_dict))
+                    continue
+
+                parent = stack[-1]
+                parent.has_children = True
+                xpath = u'/'.join([parent.xpath, name]) \
+                    if parent.xpath else name
+                # All the photo attachments in an encrypted form use name
+                # media
+                in_list = xpath in repeats or (
+                    encrypted and len(stack) == 1 and name == 'media')
+                stack.append(_ParsedNode(
+                    name, xpath, {} if in_list else parent.flat_dict,
+                    in_list))
+            else:
+                node = stack.pop()
+                if node.has_children or len(element):
+                    # an internal node, comments and processing instructions
+                    # have no data
+                    value = node.value or None
+                else:
+                    # a leaf node, white space between nodes is not data
+                    value = element.text \
+                        if element.text and element.text.strip() else None
+                    if value is not None:
+                        node.flat_dict[node.xpath] = value
+
+                # free the parsed nodes
+                element.clear()
+                while element.getprevious() is not None:
+                    del element.getparent()[0]
+
+                if not stack:
+                    result = {node.name: value} if value is not None \
+                        else None
+                    break
+
+                if value is None:
+                    continue
+
+                parent = stack[-1]
+                if node.in_list:
+                    if node.name not in parent.value:
+                        parent.value[node.name] = []
+                        parent.flat_dict[node.xpath] = []
+                    parent.value[node.name].append(value)
+                    parent.flat_dict[node.xpath].append(node.flat_dict)
+                elif node.name not in parent.value:
+                    parent.value[node.name] = value
+                else:
+                    # node is repeated, aggregate node values
+                    if node.name not in parent.repeated_names:
+                        parent.repeated_names.add(node.name)
+                        parent.value[node.name] = [parent.value[node.name]]
+                        flat_dict = None
+                    parent.value[node.name].append(value)
+    except etree.XMLSyntaxError as e:
+        raise ExpatError(text(e))
+
+    return root_name, result, flat_dict, attributes
+
+
 class XFormInstanceParser(object):
 
     def __init__(self, xml_str, data_dictionary):
@@ -306,27 +454,31 @@ class XFormInstanceParser(object):
         self.parse(xml_str)
 
     def parse(self, xml_str):
-        self._xml_obj = clean_and_parse_xml(xml_str)
-        self._root_node = self._xml_obj.documentElement
-        repeats = [e.get_abbreviated_xpath()
-                   for e in self.dd.get_survey_elements_of_type(u"repeat")]
+        self._xml_str = xml_str
+        self._root_node = None
+        repeats = self.dd.get_repeat_xpaths()
 
-        self._dict = _xml_node_to_dict(self._root_node, repeats,
-                                       self.dd.encrypted)
-        self._flat_dict = {}
+        self._root_node_name, self._dict, self._flat_dict, attributes = \
+            _parse_xml_to_dicts(xml_str, repeats, self.dd.encrypted)
 
         if self._dict is None:
             raise InstanceEmptyError
 
-        for path, value in _flatten_dict_nest_repeats(self._dict, []):
-            self._flat_dict[u"/".join(path[1:])] = value
-        self._set_attributes()
+        if self._flat_dict is None:
+            self._flat_dict = {}
+            for path, value in _flatten_dict_nest_repeats(self._dict, []):
+                self._flat_dict[u"/".join(path[1:])] = value
+        self._set_attributes(attributes)
 
     def get_root_node(self):
+        if self._root_node is None:
+            self._root_node = clean_and_parse_xml(
+                self._xml_str).documentElement
+
         return self._root_node
 
     def get_root_node_name(self):
-        return self._root_node.nodeName
+        return self._root_node_name
 
     def get(self, abbreviated_xpath):
         return self.to_flat_dict()[abbreviated_xpath]
@@ -340,9 +492,8 @@ class XFormInstanceParser(object):
     def get_attributes(self):
         return self._attributes
 
-    def _set_attributes(self):
+    def _set_attributes(self, all_attributes):
         self._attributes = {}
-        all_attributes = list(_get_all_attributes(self._root_node))
         for key, value in all_attributes:
             # Since enketo forms may have the template attribute in
             # multiple xml tags, overriding and log when this occurs
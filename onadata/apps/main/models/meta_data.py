@@ -15,12 +15,13 @@ from django.core.exceptions import ValidationError
 from django.core.files.temp import NamedTemporaryFile
 from django.core.files.uploadedfile import InMemoryUploadedFile
 from django.core.validators import URLValidator
-from django.db import IntegrityError, models
+from django.db import IntegrityError, models, transaction
 from django.db.models.signals import post_delete, post_save
 from past.builtins import basestring
 
 from onadata.libs.utils.cache_tools import XFORM_METADATA_CACHE, safe_delete
-from onadata.libs.utils.common_tags import (GOOGLE_SHEET_DATA_TYPE, TEXTIT,
+from onadata.libs.utils.common_tags import (GOOGLE_SHEET_DATA_TYPE,
+                                            INDEXED_FIELD, TEXTIT,
                                             XFORM_META_PERMS, TEXTIT_DETAILS)
 
 CHUNK_SIZE = 1024
@@ -455,6 +456,15 @@ class MetaData(models.Model):
         data_type = 'imported_via_csv_by'
         return unique_type_for_form(content_object, data_type, data_value)
 
+    @staticmethod
+    def indexed_field(content_object, data_value):
+        content_type = ContentType.objects.get_for_model(content_object)
+        metadata, created = MetaData.objects.get_or_create(
+            object_id=content_object.id, content_type=content_type,
+            data_type=INDEXED_FIELD, data_value=data_value)
+
+        return metadata
+
 
 def clear_cached_metadata_instance_object(
         sender, instance=None, created=False, **kwargs):
@@ -467,9 +477,34 @@ def update_attached_object(sender, instance=None, created=False, **kwargs):
         instance.content_object.save()
 
 
+def create_json_index(sender, instance=None, created=False, **kwargs):
+    if instance and instance.data_type == INDEXED_FIELD:
+        if instance.deleted_at is not None:
+            drop_json_index(sender, instance)
+        elif created:
+            from onadata.apps.api.tasks import create_json_index_async
+
+            xform_id, field = instance.object_id, instance.data_value
+            transaction.on_commit(
+                lambda: create_json_index_async.delay(xform_id, field))
+
+
+def drop_json_index(sender, instance=None, **kwargs):
+    if instance and instance.data_type == INDEXED_FIELD:
+        from onadata.apps.api.tasks import drop_json_index_async
+
+        xform_id, field = instance.object_id, instance.data_value
+        transaction.on_commit(
+            lambda: drop_json_index_async.delay(xform_id, field))
+
+
 post_save.connect(clear_cached_metadata_instance_object, sender=MetaData,
                   dispatch_uid='clear_cached_metadata_instance_object')
 post_save.connect(update_attached_object, sender=MetaData,
                   dispatch_uid='update_attached_xform')
 post_delete.connect(clear_cached_metadata_instance_object, sender=MetaData,
                     dispatch_uid='clear_cached_metadata_instance_delete')
+post_save.connect(create_json_index, sender=MetaData,
+                  dispatch_uid='create_json_index')
+post_delete.connect(drop_json_index, sender=MetaData,
+                    dispatch_uid='drop_json_index')
@@ -167,6 +167,13 @@ urlpatterns = [
     re_path(r'^(?P<username>\w+)/forms/(?P<id_string>[^/]+)/data\.sav.zip',
             viewer_views.data_export, name='sav_zip_export',
             kwargs={'export_type': 'sav_zip'}),
+    re_path(r'^(?P<username>\w+)/forms/(?P<id_string>[^/]+)/'
+            r'data\.parquet.zip',
+            viewer_views.data_export, name='parquet_zip_export',
+            kwargs={'export_type': 'parquet_zip'}),
+    re_path(r'^(?P<username>\w+)/forms/(?P<id_string>[^/]+)/data\.arrow.zip',
+            viewer_views.data_export, name='arrow_zip_export',
+            kwargs={'export_type': 'arrow_zip'}),
     re_path(r'^(?P<username>\w+)/forms/(?P<id_string>[^/]+)/data\.kml$',
             viewer_views.kml_export, name='kml-export'),
     re_path(r'^(?P<username>\w+)/forms/(?P<id_string>[^/]+)/data\.zip',
@@ -4,10 +4,47 @@ Messaging notification base module.
 """
 from __future__ import unicode_literals
 
+import json
+import logging
+import threading
+from collections import OrderedDict
+
 from actstream.models import Action
+from django.conf import settings
 from django.utils.module_loading import import_string
 from multidb.pinning import use_master
 
+from onadata.apps.logger.models.queued_item import (process_queue,
+                                                    queue_items,
+                                                    register_queue)
+
+# seconds actions are collected for before they are sent together
+NOTIFICATION_BATCH_WINDOW = 2
+# maximum number of actions sent together
+NOTIFICATION_BATCH_SIZE = 1000
+# queue of the actions sent by send_notification_batch
+NOTIFICATION_QUEUE = 'notification'
+
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+def get_backend(backend, backend_options=None):
+    """
+    Returns the instance of a notification backend class with the options,
+    instances are created once per worker process.
+    """
+    key = (backend,
+           json.dumps(backend_options, sort_keys=True, default=str))
+    with _backends_lock:
+        backend_instance = _backends.get(key)
+        if backend_instance is None:
+            backend_class = import_string(backend)
+            backend_instance = _backends[key] = backend_class(
+                options=backend_options)
+
+    return backend_instance
+
 
 @use_master
 def call_backend(backend, instance_id, backend_options=None):
@@ -19,8 +56,71 @@ def call_backend(backend, instance_id, backend_options=None):
     except Action.DoesNotExist:
         pass
     else:
-        backend_class = import_string(backend)
-        backend_class(options=backend_options).send(instance)
+        get_backend(backend, backend_options).send(instance)
+
+
+def group_actions(actions):
+    """
+    Groups actions by target and verb in the order of their first action.
+    """
+    groups = OrderedDict()
+    for action in actions:
+        key = (action.target_content_type_id, action.target_object_id,
+               action.verb)
+        groups.setdefault(key, []).append(action)
+
+    return list(groups.values())
+
+
+@use_master
+def call_backends(action_ids):
+    """
+    Sends actions to the NOTIFICATION_BACKENDS, the actions are loaded in one
+    query and sent to each backend grouped by target and verb.
+    """
+    backends = getattr(settings, 'NOTIFICATION_BACKENDS', {})
+    actions = Action.objects.filter(pk__in=action_ids).select_related(
+        'actor_content_type', 'target_content_type').prefetch_related(
+            'actor', 'target').order_by('pk')
+    groups = group_actions(actions)
+    for name in backends:
+        backend = get_backend(
+            backends[name]['BACKEND'], backends[name].get('OPTIONS'))
+        for group in groups:
+            try:
+                backend.send_group(group)
+            except Exception:  # pylint: disable=broad-except
+                logging.exception(
+                    'Notification backend %s failed to send actions %s', name,
+                    [action.pk for action in group])
+
+
+def _schedule_notification_batch(queue):
+    from onadata.apps.messaging.tasks import send_notification_batch_async
+
+    send_notification_batch_async.apply_async(
+        countdown=getattr(settings, 'NOTIFICATION_BATCH_WINDOW',
+                          NOTIFICATION_BATCH_WINDOW))
+
+
+register_queue(NOTIFICATION_QUEUE, _schedule_notification_batch)
+
+
+def queue_notification(action_id):
+    """
+    Adds an action to the queue sent by send_notification_batch.
+    """
+    queue_items(NOTIFICATION_QUEUE, [action_id])
+
+
+def send_notification_batch():
+    """
+    Sends the actions queued by queue_notification in one batch.
+    """
+    process_queue(
+        NOTIFICATION_QUEUE,
+        lambda items: call_backends([item.object_id for item in items]),
+        getattr(settings, 'NOTIFICATION_BATCH_SIZE', NOTIFICATION_BATCH_SIZE))
 
 
 class BaseBackend(object):  # pylint: disable=too-few-public-methods
@@ -36,3 +136,11 @@ class BaseBackend(object):  # pylint: disable=too-few-public-methods
         This method actually sends the message
         """
         raise NotImplementedError()
+
+    def send_group(self, instances):
+        """
+        Sends actions on the same target with the same verb, one message per
+        action unless the backend combines them.
+        """
+        for instance in instances:
+            self.send(instance)
@@ -5,16 +5,37 @@ Messaging notification backend for MQTT
 from __future__ import unicode_literals
 
 import json
+import os
 import ssl
+import threading
+import time
+from collections import OrderedDict, deque
 
-import paho.mqtt.publish as publish
+import paho.mqtt.client as mqtt
+from celery.signals import worker_process_shutdown
 from django.conf import settings
+from django.core.cache import cache
 
 from onadata.apps.logger.models import XForm
 from onadata.apps.messaging.backends.base import BaseBackend
 from onadata.apps.messaging.constants import MESSAGE
 from onadata.apps.messaging.constants import PROJECT, USER, XFORM, \
     VERB_TOPIC_DICT
+from onadata.libs.utils.cache_tools import XFORM_TOPIC_METADATA
+
+# seconds the organization and project of a form are cached for topics
+MQTT_TOPIC_CACHE_TIMEOUT = 60 * 60
+# maximum number of messages kept while a broker is not connected
+MQTT_MAX_QUEUED_MESSAGES = 1000
+MQTT_KEEPALIVE = 60
+# seconds a closing client waits for the broker to acknowledge the messages
+# published with a QoS above 0
+MQTT_CLOSE_TIMEOUT = 10
+# maximum number of ids in a message combining the ids of several actions
+NOTIFICATION_GROUP_ID_LIMIT = 1000
+
+_clients = {}
+_clients_lock = threading.Lock()
 
 
 def get_target_metadata(target_obj):
@@ -33,6 +54,40 @@ def get_target_metadata(target_obj):
     return metadata
 
 
+def get_xform_topic_metadata(xform_id):
+    """
+    Returns the organization username and project id of the topics of a
+    form's messages.
+    """
+    key = '{}{}'.format(XFORM_TOPIC_METADATA, xform_id)
+    metadata = cache.get(key)
+    if metadata is None:
+        xform = XForm.objects.select_related('project__organization').get(
+            id=xform_id)
+        metadata = {
+            'organization_username': xform.project.organization.username,
+            'project_id': xform.project_id}
+        cache.set(key, metadata, MQTT_TOPIC_CACHE_TIMEOUT)
+
+    return metadata
+
+
+def get_message_ids(instance):
+    """
+    Returns the ids of an action with a {"id": [...]} message, None for
+    other messages.
+    """
+    try:
+        description = json.loads(instance.description)
+    except (TypeError, ValueError):
+        return None
+    if isinstance(description, dict) and list(description) == ['id'] and \
+            isinstance(description['id'], list):
+        return description['id']
+
+    return None
+
+
 def get_payload(instance, verbose_payload: bool = False):
     """
     Constructs the message payload
@@ -73,6 +128,128 @@ def get_payload(instance, verbose_payload: bool = False):
     return json.dumps(payload)
 
 
+class MQTTClient(object):
+    """
+    A connection to an MQTT broker shared by the backends of a worker
+    process. The connection is kept open and reconnected when it drops.
+
+    QoS 0 messages published while it is down are queued in pending and
+    published once it is connected again, messages with a higher QoS are
+    kept and resent by paho until the broker acknowledges them.
+    """
+
+    def __init__(self, host, port=None, cert_info=None):
+        self.host = host
+        self.port = port or (8883 if cert_info else 1883)
+        max_queued_messages = getattr(
+            settings, 'MQTT_MAX_QUEUED_MESSAGES', MQTT_MAX_QUEUED_MESSAGES)
+        self.pending = deque(maxlen=max_queued_messages)
+        self.unacknowledged = deque(maxlen=max_queued_messages)
+        self._lock = threading.Lock()
+        self.client = mqtt.Client()
+        if cert_info:
+            self.client.tls_set(**cert_info)
+        self.client.max_queued_messages_set(max_queued_messages)
+        self.client.reconnect_delay_set(min_delay=1, max_delay=60)
+        self.client.on_connect = self._on_connect
+        self.client.connect_async(self.host, self.port, MQTT_KEEPALIVE)
+        self.client.loop_start()
+
+    def _on_connect(self, client, userdata, flags, rc):
+        # pylint: disable=unused-argument,invalid-name
+        if rc == mqtt.CONNACK_ACCEPTED:
+            self.flush()
+
+    def _publish(self, message):
+        topic, payload, qos, retain = message
+        info = self.client.publish(topic, payload=payload, qos=qos,
+                                   retain=retain)
+
+        return None if info.rc == mqtt.MQTT_ERR_NO_CONN else info
+
+    def flush(self):
+        """
+        Publishes the queued QoS 0 messages.
+        """
+        with self._lock:
+            while self.pending:
+                if self._publish(self.pending[0]) is None:
+                    break
+                self.pending.popleft()
+
+    def publish(self, topic, payload, qos=0, retain=False):
+        """
+        Publishes a message, returns the paho MQTTMessageInfo of the message
+        or None when a QoS 0 message is queued until the broker is connected.
+        """
+        if qos > 0:
+            info = self.client.publish(topic, payload=payload, qos=qos,
+                                       retain=retain)
+            with self._lock:
+                self.unacknowledged = deque(
+                    (unacknowledged for unacknowledged in self.unacknowledged
+                     if not unacknowledged.is_published()),
+                    maxlen=self.unacknowledged.maxlen)
+                self.unacknowledged.append(info)
+
+            return info
+
+        message = (topic, payload, qos, retain)
+        with self._lock:
+            if not self.pending:
+                info = self._publish(message)
+                if info is not None:
+                    return info
+            self.pending.append(message)
+
+        return None
+
+    def close(self, timeout=MQTT_CLOSE_TIMEOUT):
+        """
+        Waits up to timeout seconds for the broker to acknowledge the
+        messages published with a QoS above 0 and disconnects from the
+        broker.
+        """
+        deadline = time.time() + timeout
+        while time.time() < deadline and any(
+                not info.is_published() for info in self.unacknowledged):
+            time.sleep(0.1)
+        self.client.disconnect()
+        self.client.loop_stop()
+
+
+def get_client(host, port=None, cert_info=None):
+    """
+    Returns the MQTTClient of a broker for the current process, the client
+    connects on first use.
+    """
+    key = (os.getpid(), host, port,
+           json.dumps(cert_info, sort_keys=True, default=str))
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = _clients[key] = MQTTClient(host, port, cert_info)
+
+    return client
+
+
+def close_clients():
+    """
+    Disconnects the MQTT clients of the current process.
+    """
+    with _clients_lock:
+        for key in [k for k in _clients if k[0] == os.getpid()]:
+            _clients.pop(key).close()
+
+
+@worker_process_shutdown.connect
+def close_worker_clients(**kwargs):  # pylint: disable=unused-argument
+    """
+    Disconnects the MQTT clients of a Celery worker process when it exits.
+    """
+    close_clients()
+
+
 class MQTTBackend(BaseBackend):
     """
     Notification backend for MQTT
@@ -120,11 +297,9 @@ class MQTTBackend(BaseBackend):
             'verb': instance.verb
         }
         if kwargs.get('target_name') == XFORM:
-            xform = XForm.objects.get(id=instance.target_object_id)
-            kwargs[
-                'organization_username'] = xform.project.organization.username
+            kwargs.update(
+                get_xform_topic_metadata(instance.target_object_id))
             kwargs['verb'] = VERB_TOPIC_DICT[instance.verb]
-            kwargs['project_id'] = xform.project.id
             return ('/{topic_base}/organization/{organization_username}/'
                     'project/{project_id}/{target_name}/{target_id}/{verb}/'
                     'messages/publish').format(**kwargs)
@@ -142,7 +317,41 @@ class MQTTBackend(BaseBackend):
         topic = self.get_topic(instance)
         payload = get_payload(instance)
         # send it
+        client = get_client(self.host, self.port, self.cert_info)
 
-        return publish.single(topic, payload=payload, hostname=self.host,
-                              port=self.port, tls=self.cert_info, qos=self.qos,
+        return client.publish(topic, payload, qos=self.qos,
                               retain=self.retain)
+
+    def send_group(self, instances):
+        """
+        Sends actions on the same target with the same verb, the ids of the
+        actions of a user are combined into messages of up to
+        NOTIFICATION_GROUP_ID_LIMIT ids.
+        """
+        id_limit = getattr(settings, 'NOTIFICATION_GROUP_ID_LIMIT',
+                           NOTIFICATION_GROUP_ID_LIMIT)
+        actor_actions = OrderedDict()
+        for instance in instances:
+            ids = get_message_ids(instance)
+            if ids is None:
+                self.send(instance)
+            else:
+                key = (instance.actor_content_type_id,
+                       instance.actor_object_id)
+                actor_actions.setdefault(key, []).append((instance, ids))
+
+        for actions in actor_actions.values():
+            message_ids = []
+            for instance, ids in actions:
+                if message_ids and len(message_ids) + len(ids) > id_limit:
+                    self._send_ids(last_instance, message_ids)
+                    message_ids = []
+                message_ids.extend(ids)
+                last_instance = instance
+            self._send_ids(last_instance, message_ids)
+
+    def _send_ids(self, instance, ids):
+        # the combined message is sent as the last action, which is not saved
+        instance.description = json.dumps({'id': ids})
+
+        return self.send(instance)
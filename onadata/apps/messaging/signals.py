@@ -9,8 +9,8 @@ from django.conf import settings
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 
-from onadata.apps.messaging.backends.base import call_backend
-from onadata.apps.messaging.tasks import call_backend_async
+from onadata.apps.messaging.backends.base import (call_backend,
+                                                  queue_notification)
 
 
 @receiver(post_save, sender=Action, dispatch_uid='messaging_backends_handler')
@@ -23,13 +23,12 @@ def messaging_backends_handler(sender, **kwargs):  # pylint: disable=W0613
     created = kwargs.get('created')
     instance = kwargs.get('instance')
     if instance and created:
+        if as_task and backends:
+            # sent with the actions of the next few seconds once the action
+            # is committed
+            queue_notification(instance.id)
+            return
         for name in backends:
             backend = backends[name]['BACKEND']
             backend_options = backends[name].get('OPTIONS')
-            if as_task:
-                # Sometimes the Action isn't created yet, hence
-                # the need to delay 2 seconds
-                call_backend_async.apply_async(
-                    (backend, instance.id, backend_options), countdown=2)
-            else:
-                call_backend(backend, instance.id, backend_options)
+            call_backend(backend, instance.id, backend_options)
@@ -4,7 +4,8 @@ Messaging tasks
 """
 from __future__ import unicode_literals
 
-from onadata.apps.messaging.backends.base import call_backend
+from onadata.apps.messaging.backends.base import (call_backend,
+                                                  send_notification_batch)
 from onadata.celery import app
 
 
@@ -14,3 +15,11 @@ def call_backend_async(backend, instance_id, backend_options=None):
     Task to send messages to notification backeds such as MQTT
     """
     call_backend(backend, instance_id, backend_options)
+
+
+@app.task(ignore_result=True)
+def send_notification_batch_async():
+    """
+    Task to send the queued actions to the notification backends together
+    """
+    send_notification_batch()
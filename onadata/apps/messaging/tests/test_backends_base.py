@@ -5,12 +5,30 @@ Tests Messaging backends base module.
 from __future__ import unicode_literals
 
 from django.test import TestCase
-
-from onadata.apps.messaging.backends.base import call_backend
+from django.test.utils import override_settings
+from onadata.apps.logger.models import QueuedItem
+from onadata.apps.messaging.backends.base import (NOTIFICATION_QUEUE,
+                                                  BaseBackend, call_backend,
+                                                  get_backend,
+                                                  queue_notification,
+                                                  send_notification_batch)
 from onadata.apps.messaging.tests.test_base import (_create_message,
                                                     _create_user)
 
 
+class RecordingBackend(BaseBackend):
+    """
+    Backend that records the groups of actions it is sent.
+    """
+    groups = []
+
+    def send(self, instance):
+        pass
+
+    def send_group(self, instances):
+        RecordingBackend.groups.append([i.pk for i in instances])
+
+
 class TestBackendsBase(TestCase):
     """
     Test messaging backends base functions.
@@ -27,3 +45,46 @@ class TestBackendsBase(TestCase):
         with self.assertRaises(NotImplementedError):
             call_backend('onadata.apps.messaging.backends.base.BaseBackend',
                          instance.id, {'HOST': 'localhost'})
+
+    def test_get_backend(self):
+        """
+        Test backend instances are created once per class and options.
+        """
+        backend = get_backend(
+            'onadata.apps.messaging.backends.base.BaseBackend', {'A': 1})
+        self.assertIs(backend, get_backend(
+            'onadata.apps.messaging.backends.base.BaseBackend', {'A': 1}))
+        self.assertIsNot(backend, get_backend(
+            'onadata.apps.messaging.backends.base.BaseBackend', {'A': 2}))
+
+    @override_settings(NOTIFICATION_BACKENDS={
+        'recording': {
+            'BACKEND': 'onadata.apps.messaging.tests.test_backends_base.'
+                       'RecordingBackend'
+        },
+    })
+    def test_send_notification_batch(self):
+        """
+        Test queued actions are sent together, grouped by target.
+        """
+        from_user = _create_user('Bob')
+        alice = _create_user('Alice')
+        john = _create_user('John')
+        actions = [_create_message(from_user, alice, 'Hello Alice'),
+                   _create_message(from_user, john, 'Hello John'),
+                   _create_message(from_user, alice, 'Bye Alice')]
+        RecordingBackend.groups = []
+        for action in actions:
+            queue_notification(action.pk)
+        self.assertEqual(QueuedItem.objects.filter(
+            queue=NOTIFICATION_QUEUE).count(), 3)
+
+        send_notification_batch()
+        self.assertEqual(RecordingBackend.groups, [
+            [actions[0].pk, actions[2].pk], [actions[1].pk]])
+        self.assertFalse(QueuedItem.objects.filter(
+            queue=NOTIFICATION_QUEUE).exists())
+
+        # the queue is empty
+        send_notification_batch()
+        self.assertEqual(len(RecordingBackend.groups), 2)
@@ -11,7 +11,8 @@ from django.test import TestCase
 
 from mock import MagicMock, patch
 
-from onadata.apps.messaging.backends.mqtt import (MQTTBackend, get_payload,
+from onadata.apps.messaging.backends.mqtt import (MQTTBackend, MQTTClient,
+                                                  close_clients, get_payload,
                                                   get_target_metadata)
 from onadata.apps.messaging.constants import PROJECT, XFORM
 from onadata.apps.messaging.tests.test_base import (_create_message,
@@ -24,6 +25,9 @@ class TestMQTTBackend(TestCase):
     """
     maxDiff = None
 
+    def tearDown(self):
+        close_clients()
+
     def test_mqtt_get_topic(self):
         """
         Test MQTT backend get_topic method
@@ -115,7 +119,7 @@ class TestMQTTBackend(TestCase):
             json.dumps(expected_payload), get_payload(
                 instance, verbose_payload=False))
 
-    @patch('onadata.apps.messaging.backends.mqtt.publish.single')
+    @patch('onadata.apps.messaging.backends.mqtt.mqtt.Client')
     def test_mqtt_send(self, mocked):
         """
         Test MQTT Backend send method
@@ -131,19 +135,118 @@ class TestMQTTBackend(TestCase):
             'CERT_FILE': 'emq.pem',
             'KEY_FILE': 'emq.key'
         })
+        client = mocked.return_value
+        client.publish.return_value.rc = 0
         mqtt.send(instance=instance)
-        self.assertTrue(mocked.called)
-        args, kwargs = mocked.call_args_list[0]
+        self.assertTrue(client.publish.called)
+        args, kwargs = client.publish.call_args_list[0]
         self.assertEquals(mqtt.get_topic(instance), args[0])
         self.assertEquals(get_payload(instance), kwargs['payload'])
-        self.assertEquals('localhost', kwargs['hostname'])
-        self.assertEquals(8883, kwargs['port'])
         self.assertEquals(0, kwargs['qos'])
         self.assertEquals(False, kwargs['retain'])
-        self.assertDictEqual(
-            dict(ca_certs='cacert.pem',
-                 certfile='emq.pem',
-                 keyfile='emq.key',
-                 tls_version=ssl.PROTOCOL_TLSv1_2,
-                 cert_reqs=ssl.CERT_NONE),
-            kwargs['tls'])
+        client.connect_async.assert_called_with('localhost', 8883, 60)
+        client.tls_set.assert_called_with(
+            ca_certs='cacert.pem',
+            certfile='emq.pem',
+            keyfile='emq.key',
+            tls_version=ssl.PROTOCOL_TLSv1_2,
+            cert_reqs=ssl.CERT_NONE)
+
+        # the connection is reused
+        mqtt.send(instance=instance)
+        self.assertEqual(mocked.call_count, 1)
+        self.assertEqual(client.connect_async.call_count, 1)
+        self.assertEqual(client.publish.call_count, 2)
+
+    @patch('onadata.apps.messaging.backends.mqtt.mqtt.Client')
+    def test_mqtt_client_queues_messages_while_disconnected(self, mocked):
+        """
+        Test messages published while the broker is not connected are
+        published once it is connected.
+        """
+        published = []
+
+        def publish(topic, payload=None, qos=0, retain=False):
+            info = MagicMock()
+            # MQTT_ERR_NO_CONN until connected
+            info.rc = 0 if connected else 4
+            if connected:
+                published.append(topic)
+
+            return info
+
+        connected = False
+        mocked.return_value.publish.side_effect = publish
+        client = MQTTClient('localhost')
+        self.assertIsNone(client.publish('a', 'message a'))
+        self.assertIsNone(client.publish('b', 'message b'))
+        self.assertEqual(len(client.pending), 2)
+        self.assertEqual(published, [])
+
+        connected = True
+        mocked.return_value.on_connect(mocked.return_value, None, {}, 0)
+        self.assertEqual(published, ['a', 'b'])
+        self.assertEqual(len(client.pending), 0)
+
+        self.assertIsNotNone(client.publish('c', 'message c'))
+        self.assertEqual(published, ['a', 'b', 'c'])
+
+    @patch('onadata.apps.messaging.backends.mqtt.time.sleep')
+    @patch('onadata.apps.messaging.backends.mqtt.mqtt.Client')
+    def test_mqtt_client_qos_messages(self, mocked, mocked_sleep):
+        """
+        Test messages with a QoS above 0 are left to paho while the broker is
+        not connected and are waited for when the client is closed.
+        """
+        info = mocked.return_value.publish.return_value
+        # MQTT_ERR_NO_CONN, paho resends the message once connected
+        info.rc = 4
+        info.is_published.side_effect = [False, True]
+        client = MQTTClient('localhost')
+        self.assertEqual(client.publish('a', 'message a', qos=1), info)
+        self.assertEqual(len(client.pending), 0)
+        self.assertEqual(list(client.unacknowledged), [info])
+
+        client.close()
+        self.assertEqual(mocked_sleep.call_count, 1)
+        self.assertTrue(mocked.return_value.disconnect.called)
+
+    @patch('onadata.apps.messaging.backends.mqtt.mqtt.Client')
+    def test_mqtt_client_drops_acknowledged_messages(self, mocked):
+        """
+        Test acknowledged messages are no longer kept, whatever their order,
+        and at most MQTT_MAX_QUEUED_MESSAGES messages are kept.
+        """
+        infos = [MagicMock() for _i in range(4)]
+        for info, published in zip(infos, [False, True, False, False]):
+            info.is_published.return_value = published
+        mocked.return_value.publish.side_effect = infos
+        with self.settings(MQTT_MAX_QUEUED_MESSAGES=2):
+            client = MQTTClient('localhost')
+        for topic in 'abc':
+            client.publish(topic, 'message', qos=1)
+        self.assertEqual(list(client.unacknowledged), [infos[0], infos[2]])
+
+        client.publish('d', 'message', qos=1)
+        self.assertEqual(list(client.unacknowledged), [infos[2], infos[3]])
+
+    @patch('onadata.apps.messaging.backends.mqtt.MQTTBackend.send')
+    def test_mqtt_send_group(self, mocked):
+        """
+        Test the ids of the actions of a user are combined in one message.
+        """
+        from_user = _create_user('Bob')
+        to_user = _create_user('Alice')
+        actions = [
+            _create_message(from_user, to_user, json.dumps({'id': [1, 2]})),
+            _create_message(from_user, to_user, json.dumps({'id': [3]})),
+            _create_message(from_user, to_user, 'I love oov')]
+        mqtt = MQTTBackend(options={'HOST': 'localhost'})
+        mqtt.send_group(actions)
+
+        self.assertEqual(mocked.call_count, 2)
+        self.assertEqual(mocked.call_args_list[0][0][0].description,
+                         'I love oov')
+        combined = mocked.call_args_list[1][0][0]
+        self.assertEqual(combined.pk, actions[1].pk)
+        self.assertEqual(json.loads(combined.description), {'id': [1, 2, 3]})
@@ -9,6 +9,8 @@ from django.test import TestCase
 from django.test.utils import override_settings
 from mock import patch
 
+from onadata.apps.logger.models import QueuedItem
+from onadata.apps.messaging.backends.base import NOTIFICATION_QUEUE
 from onadata.apps.messaging.signals import messaging_backends_handler
 
 
@@ -25,16 +27,16 @@ class TestSignals(TestCase):
             },
         },
         MESSAGING_ASYNC_NOTIFICATION=True)
-    @patch('onadata.apps.messaging.signals.call_backend_async.apply_async')
-    def test_messaging_backends_handler_async(self, call_backend_async_mock):
+    @patch('onadata.apps.messaging.signals.call_backend')
+    def test_messaging_backends_handler_async(self, call_backend_mock):
         """
         Test messaging backends handler function.
         """
         messaging_backends_handler(Action, instance=Action(id=9), created=True)
-        self.assertTrue(call_backend_async_mock.called)
-        call_backend_async_mock.assert_called_with(
-            ('onadata.apps.messaging.backends.base.BaseBackend', 9, None),
-            countdown=2)
+        self.assertEqual(
+            list(QueuedItem.objects.filter(queue=NOTIFICATION_QUEUE)
+                 .values_list('object_id', flat=True)), [9])
+        self.assertFalse(call_backend_mock.called)
 
     @override_settings(NOTIFICATION_BACKENDS={
         'mqtt': {
@@ -1,3 +1,74 @@
+"""
+RestServiceInterface module
+"""
+import threading
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+# (connect, read) timeout in seconds of a request to a service
+REST_SERVICE_TIMEOUT = (5, 30)
+# number of connections kept open to each host
+REST_SERVICE_POOL_SIZE = 10
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """
+    Returns the HTTP session shared by the services of a worker process, the
+    connections to a host are kept open and reused.
+    """
+    global _session  # pylint: disable=global-statement
+
+    with _session_lock:
+        if _session is None:
+            pool_size = getattr(
+                settings, 'REST_SERVICE_POOL_SIZE', REST_SERVICE_POOL_SIZE)
+            adapter = HTTPAdapter(
+                pool_connections=pool_size, pool_maxsize=pool_size)
+            session = requests.Session()
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            _session = session
+
+    return _session
+
+
 class RestServiceInterface(object):
+    # services that set accepts_batches send several submissions in one
+    # request with send_batch
+    accepts_batches = False
+
     def send(self, url, data=None):
         raise NotImplementedError
+
+    def send_batch(self, url, submission_instances):
+        raise NotImplementedError
+
+    def _get_timeout(self):
+        return getattr(settings, 'REST_SERVICE_TIMEOUT', REST_SERVICE_TIMEOUT)
+
+    def get(self, url, **kwargs):
+        """
+        Sends a GET request with the shared session, raises HTTPError for
+        error responses.
+        """
+        kwargs.setdefault('timeout', self._get_timeout())
+        response = get_session().get(url, **kwargs)
+        response.raise_for_status()
+
+        return response
+
+    def post(self, url, **kwargs):
+        """
+        Sends a POST request with the shared session, raises HTTPError for
+        error responses.
+        """
+        kwargs.setdefault('timeout', self._get_timeout())
+        response = get_session().post(url, **kwargs)
+        response.raise_for_status()
+
+        return response
@@ -0,0 +1,35 @@
+#!/usr/bin/env python
+
+from django.core.management.base import BaseCommand
+from django.utils.translation import ugettext as _
+
+from onadata.apps.restservice.models import FailedDelivery
+from onadata.apps.restservice.tasks import send_to_service_async
+
+
+class Command(BaseCommand):
+    help = _("Send the submissions that could not be sent to a service "
+             "again.")
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--service', type=int, help=_("Only resend to this service id."))
+
+    def handle(self, *args, **options):
+        failed_deliveries = FailedDelivery.objects.all()
+        if options.get('service'):
+            failed_deliveries = failed_deliveries.filter(
+                rest_service_id=options['service'])
+
+        instance_pks = {}
+        for service_pk, instance_pk in failed_deliveries.values_list(
+                'rest_service_id', 'instance_id'):
+            instance_pks.setdefault(service_pk, set()).add(instance_pk)
+        # submissions that fail again are recorded again
+        failed_deliveries.delete()
+
+        for service_pk, pks in instance_pks.items():
+            send_to_service_async.delay(service_pk, sorted(pks))
+            self.stdout.write(
+                _("Resending %(count)d submissions to service %(pk)d" % {
+                    'count': len(pks), 'pk': service_pk}))
@@ -0,0 +1,27 @@
+# Generated by Django 2.2 on 2026-10-18 10:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logger', '0065_submissioncountdelta'),
+        ('restservice', '0005_auto_20190125_0517'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FailedDelivery',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('attempts', models.PositiveIntegerField(default=1)),
+                ('status_code', models.PositiveIntegerField(blank=True, null=True)),
+                ('error', models.TextField(blank=True, default='')),
+                ('date_created', models.DateTimeField(auto_now_add=True)),
+                ('instance', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='logger.Instance')),
+                ('rest_service', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='failed_deliveries', to='restservice.RestService')),
+            ],
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 2.2 on 2026-10-18 11:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restservice', '0006_faileddelivery'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='restservice',
+            name='batch_interval',
+            field=models.PositiveIntegerField(default=60, verbose_name='Batch interval'),
+        ),
+        migrations.AddField(
+            model_name='restservice',
+            name='batch_size',
+            field=models.PositiveIntegerField(default=0, verbose_name='Batch size'),
+        ),
+    ]
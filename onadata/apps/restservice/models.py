@@ -36,6 +36,12 @@ class RestService(models.Model):
                                  blank=False, null=False)
     inactive_reason = models.TextField(ugettext_lazy("Inactive reason"),
                                        blank=True, default="")
+    # submissions are sent batch_size at a time, or every batch_interval
+    # seconds, to services that accept batches, 0 sends them one at a time
+    batch_size = models.PositiveIntegerField(
+        ugettext_lazy("Batch size"), default=0)
+    batch_interval = models.PositiveIntegerField(
+        ugettext_lazy("Batch interval"), default=60)
 
     def __str__(self):
         return u"%s:%s - %s" % (self.xform, self.long_name, self.service_url)
@@ -117,3 +123,26 @@ post_delete.connect(
     delete_merged_datasets_service,
     sender=RestService,
     dispatch_uid='propagate_merged_datasets')
+
+
+@python_2_unicode_compatible
+class FailedDelivery(models.Model):
+    """
+    A submission that could not be sent to an external service, kept until
+    it is sent again.
+    """
+
+    class Meta:
+        app_label = 'restservice'
+
+    rest_service = models.ForeignKey(
+        RestService, related_name='failed_deliveries',
+        on_delete=models.CASCADE)
+    instance = models.ForeignKey('logger.Instance', on_delete=models.CASCADE)
+    attempts = models.PositiveIntegerField(default=1)
+    status_code = models.PositiveIntegerField(null=True, blank=True)
+    error = models.TextField(blank=True, default="")
+    date_created = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return u"%s - %s" % (self.rest_service, self.instance_id)
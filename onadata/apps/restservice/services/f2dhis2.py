@@ -1,5 +1,3 @@
-import requests
-
 from onadata.apps.restservice.RestServiceInterface import RestServiceInterface
 
 
@@ -13,4 +11,4 @@ class ServiceDefinition(RestServiceInterface):
             "uuid": submission_instance.uuid
         }
         valid_url = url % info
-        requests.get(valid_url)
+        self.get(valid_url)
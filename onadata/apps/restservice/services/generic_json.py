@@ -1,15 +1,22 @@
 import json
 
-import requests
-
 from onadata.apps.restservice.RestServiceInterface import RestServiceInterface
 
 
 class ServiceDefinition(RestServiceInterface):
     id = u'json'
     verbose_name = u'JSON POST'
+    accepts_batches = True
 
     def send(self, url, submission_instance):
         post_data = json.dumps(submission_instance.json)
         headers = {"Content-Type": "application/json"}
-        requests.post(url, headers=headers, data=post_data)
+        self.post(url, headers=headers, data=post_data)
+
+    def send_batch(self, url, submission_instances):
+        """
+        Posts the submissions as a JSON array.
+        """
+        post_data = json.dumps([i.json for i in submission_instances])
+        headers = {"Content-Type": "application/json"}
+        self.post(url, headers=headers, data=post_data)
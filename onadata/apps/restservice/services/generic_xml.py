@@ -1,12 +1,25 @@
-import requests
+import re
 
 from onadata.apps.restservice.RestServiceInterface import RestServiceInterface
 
+XML_DECLARATION = re.compile(r'^\s*<\?xml[^>]*\?>\s*')
+
 
 class ServiceDefinition(RestServiceInterface):
     id = u'xml'
     verbose_name = u'XML POST'
+    accepts_batches = True
 
     def send(self, url, submission_instance):
         headers = {"Content-Type": "application/xml"}
-        requests.post(url, data=submission_instance.xml, headers=headers)
+        self.post(url, data=submission_instance.xml, headers=headers)
+
+    def send_batch(self, url, submission_instances):
+        """
+        Posts the submissions in a <submissions> document.
+        """
+        headers = {"Content-Type": "application/xml"}
+        data = u'<?xml version="1.0" encoding="UTF-8"?><submissions>{}' \
+            u'</submissions>'.format(u''.join(
+                XML_DECLARATION.sub(u'', i.xml) for i in submission_instances))
+        self.post(url, data=data.encode('utf-8'), headers=headers)
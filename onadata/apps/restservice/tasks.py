@@ -1,4 +1,6 @@
-from onadata.apps.restservice.utils import call_service
+from onadata.apps.restservice.models import RestService
+from onadata.apps.restservice.utils import (call_service, dispatch,
+                                             flush_service_queue)
 from onadata.celery import app
 
 
@@ -8,10 +10,38 @@ def call_service_async(instance_pk):
     from onadata.apps.logger.models.instance import Instance
 
     try:
-        instance = Instance.objects.get(pk=instance_pk)
+        instance = Instance.objects.select_related('xform').get(
+            pk=instance_pk)
     except Instance.DoesNotExist:
         # if the instance has already been removed we do not send it to the
         # service
         pass
     else:
         call_service(instance)
+
+
+@app.task()
+def send_to_service_async(service_pk, instance_pks, attempt=0):
+    """
+    Sends submissions to a service again after a failed call.
+    """
+    from onadata.apps.logger.models.instance import Instance
+
+    try:
+        rest_service = RestService.objects.get(pk=service_pk)
+    except RestService.DoesNotExist:
+        return
+
+    # submissions removed since the failed call are not sent
+    instances = list(Instance.objects.select_related('xform').filter(
+        pk__in=instance_pks, deleted_at__isnull=True).order_by('pk'))
+    if instances:
+        dispatch([rest_service], instances, attempt)
+
+
+@app.task()
+def flush_service_queue_async(service_pk):
+    """
+    Sends the queued submissions of a batched service.
+    """
+    flush_service_queue(service_pk)
@@ -1,17 +1,22 @@
+import json
 import os
 import time
 
+import requests
 from django.test.utils import override_settings
 from django.urls import reverse
 from mock import patch
 
+from onadata.apps.logger.models.queued_item import QueuedItem
 from onadata.apps.logger.models.xform import XForm
 from onadata.apps.main.models import MetaData
 from onadata.apps.main.tests.test_base import TestBase
 from onadata.apps.main.views import show
 from onadata.apps.restservice.RestServiceInterface import RestServiceInterface
-from onadata.apps.restservice.models import RestService
+from onadata.apps.restservice.models import FailedDelivery, RestService
 from onadata.apps.restservice.services.textit import ServiceDefinition
+from onadata.apps.restservice.utils import (flush_service_queue,
+                                             get_service_queue)
 from onadata.apps.restservice.views import add_service, delete_service
 
 
@@ -110,7 +115,7 @@ class RestServiceTest(TestBase):
         self.assertEqual(response.status_code, 404)
 
     @override_settings(CELERY_TASK_ALWAYS_EAGER=True)
-    @patch('requests.post')
+    @patch('requests.Session.post')
     def test_textit_service(self, mock_http):
         service_url = "https://textit.io/api/v1/runs.json"
         service_name = "textit"
@@ -137,7 +142,7 @@ class RestServiceTest(TestBase):
         self.assertEquals(mock_http.call_count, 1)
 
     @override_settings(CELERY_TASK_ALWAYS_EAGER=True)
-    @patch('requests.post')
+    @patch('requests.Session.post')
     def test_rest_service_not_set(self, mock_http):
         xml_submission = os.path.join(self.this_directory,
                                       u'fixtures',
@@ -148,6 +153,96 @@ class RestServiceTest(TestBase):
         self.assertFalse(mock_http.called)
         self.assertEquals(mock_http.call_count, 0)
 
+    @override_settings(CELERY_TASK_ALWAYS_EAGER=True,
+                       REST_SERVICE_MAX_RETRIES=2)
+    @patch('requests.Session.post')
+    def test_failed_service_call_is_retried(self, mock_http):
+        mock_http.side_effect = requests.ConnectionError('Connection refused')
+        self._add_rest_service('https://example.com/', 'generic_json')
+        xml_submission = os.path.join(self.this_directory,
+                                      u'fixtures',
+                                      u'dhisform_submission1.xml')
+
+        self._make_submission(xml_submission)
+
+        # the call and two retries
+        self.assertEqual(mock_http.call_count, 3)
+        failed_delivery = FailedDelivery.objects.get()
+        self.assertEqual(failed_delivery.instance, self.xform.instances.get())
+        self.assertEqual(failed_delivery.attempts, 3)
+        self.assertIsNone(failed_delivery.status_code)
+
+    @override_settings(CELERY_TASK_ALWAYS_EAGER=True)
+    @patch('requests.Session.post')
+    def test_rejected_service_call_is_not_retried(self, mock_http):
+        response = requests.Response()
+        response.status_code = 400
+        mock_http.return_value = response
+        self._add_rest_service('https://example.com/', 'generic_json')
+        xml_submission = os.path.join(self.this_directory,
+                                      u'fixtures',
+                                      u'dhisform_submission1.xml')
+
+        self._make_submission(xml_submission)
+
+        self.assertEqual(mock_http.call_count, 1)
+        failed_delivery = FailedDelivery.objects.get()
+        self.assertEqual(failed_delivery.attempts, 1)
+        self.assertEqual(failed_delivery.status_code, 400)
+
+    @override_settings(CELERY_TASK_ALWAYS_EAGER=True)
+    @patch('requests.Session.post')
+    def test_batched_service(self, mock_http):
+        rest_service = RestService.objects.create(
+            service_url='https://example.com/', xform=self.xform,
+            name='generic_json', batch_size=2)
+        for name in ['dhisform_submission1.xml', 'dhisform_submission2.xml']:
+            self._make_submission(
+                os.path.join(self.this_directory, u'fixtures', name))
+
+        # the submissions are queued
+        self.assertFalse(mock_http.called)
+        self.assertEqual(QueuedItem.objects.filter(
+            queue=get_service_queue(rest_service.pk)).count(), 2)
+
+        flush_service_queue(rest_service.pk)
+        self.assertEqual(mock_http.call_count, 1)
+        post_data = json.loads(mock_http.call_args[1]['data'])
+        self.assertEqual(
+            [record['_id'] for record in post_data],
+            list(self.xform.instances.order_by('pk').values_list(
+                'pk', flat=True)))
+
+        # the queue is empty
+        flush_service_queue(rest_service.pk)
+        self.assertEqual(mock_http.call_count, 1)
+        self.assertFalse(QueuedItem.objects.filter(
+            queue=get_service_queue(rest_service.pk)).exists())
+
+    @override_settings(CELERY_TASK_ALWAYS_EAGER=True,
+                       REST_SERVICE_MAX_RETRIES=0)
+    @patch('requests.Session.post')
+    def test_batched_service_failed_delivery(self, mock_http):
+        response = requests.Response()
+        response.status_code = 500
+        mock_http.return_value = response
+        rest_service = RestService.objects.create(
+            service_url='https://example.com/', xform=self.xform,
+            name='generic_json', batch_size=2)
+        for name in ['dhisform_submission1.xml', 'dhisform_submission2.xml']:
+            self._make_submission(
+                os.path.join(self.this_directory, u'fixtures', name))
+
+        flush_service_queue(rest_service.pk)
+        self.assertEqual(mock_http.call_count, 1)
+        # the submissions that could not be sent are recorded
+        self.assertEqual(
+            sorted(FailedDelivery.objects.values_list(
+                'instance_id', flat=True)),
+            sorted(self.xform.instances.values_list('pk', flat=True)))
+        self.assertFalse(QueuedItem.objects.filter(
+            queue=get_service_queue(rest_service.pk)).exists())
+
     def test_clean_keys_of_slashes(self):
         service = ServiceDefinition()
 
@@ -1,21 +1,209 @@
 import logging
+from concurrent.futures import ThreadPoolExecutor
 
+import requests
+from django.conf import settings
+from django.db import connection, transaction
 from django.utils.translation import ugettext as _
 
-from onadata.apps.restservice.models import RestService
+from onadata.apps.logger.models.queued_item import (QueuedItem,
+                                                    process_queue,
+                                                    queue_items,
+                                                    register_queue)
+from onadata.apps.restservice.models import FailedDelivery, RestService
 from onadata.libs.utils.common_tags import GOOGLE_SHEET
 
+# maximum number of services called at the same time for a submission
+REST_SERVICE_MAX_WORKERS = 5
+# number of times a failed call to a service is retried
+REST_SERVICE_MAX_RETRIES = 5
+# seconds before the first retry, doubled on each retry
+REST_SERVICE_RETRY_BACKOFF = 30
+# prefix of the queues of the submissions of batched services
+REST_SERVICE_QUEUE = 'rest-service-'
+
+
+def is_retryable(error):
+    """
+    Returns True for the errors a service call may succeed after, connection
+    errors, timeouts, server errors and rate limits.
+    """
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        return error.response.status_code >= 500 or \
+            error.response.status_code == 429
+
+    return isinstance(error, requests.RequestException)
+
+
+def send_to_service(rest_service, instances):
+    """
+    Sends submissions to a service, in one request when the service accepts
+    batches. Returns the (instances, error) pairs of the failed requests.
+    """
+    service = rest_service.get_service_definition()()
+    if service.accepts_batches and rest_service.batch_size:
+        batches = [instances[i:i + rest_service.batch_size]
+                   for i in range(0, len(instances), rest_service.batch_size)]
+    else:
+        batches = [[instance] for instance in instances]
+
+    failures = []
+    for batch in batches:
+        try:
+            if len(batch) > 1:
+                service.send_batch(rest_service.service_url, batch)
+            else:
+                service.send(rest_service.service_url, batch[0])
+        except Exception as e:  # pylint: disable=broad-except
+            logging.exception(_(u'Service threw exception: %s' % str(e)))
+            failures.append((batch, e))
+
+    return failures
+
+
+def _send_in_thread(rest_service, instances):
+    try:
+        return send_to_service(rest_service, instances)
+    finally:
+        # the thread's database connection
+        connection.close()
+
+
+def _handle_failure(rest_service, instances, error, attempt):
+    """
+    Schedules a retry of a failed call to a service, with exponential
+    backoff, or records the submissions as failed deliveries.
+    """
+    from onadata.apps.restservice.tasks import send_to_service_async
+
+    max_retries = getattr(
+        settings, 'REST_SERVICE_MAX_RETRIES', REST_SERVICE_MAX_RETRIES)
+    if is_retryable(error) and attempt < max_retries:
+        backoff = getattr(
+            settings, 'REST_SERVICE_RETRY_BACKOFF', REST_SERVICE_RETRY_BACKOFF)
+        send_to_service_async.apply_async(
+            args=[rest_service.pk, [instance.pk for instance in instances],
+                  attempt + 1],
+            countdown=backoff * 2 ** attempt)
+        return
+
+    response = getattr(error, 'response', None)
+    FailedDelivery.objects.bulk_create([
+        FailedDelivery(
+            rest_service=rest_service, instance=instance,
+            attempts=attempt + 1,
+            status_code=getattr(response, 'status_code', None),
+            error=str(error))
+        for instance in instances])
+
+
+def dispatch(services, instances, attempt=0):
+    """
+    Sends submissions to services, at most REST_SERVICE_MAX_WORKERS services
+    at a time. Failed calls are retried, the submissions of the calls that
+    still fail are recorded as failed deliveries.
+    """
+    services = list(services)
+    max_workers = min(
+        len(services),
+        getattr(settings, 'REST_SERVICE_MAX_WORKERS',
+                REST_SERVICE_MAX_WORKERS))
+    if max_workers > 1:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(
+                lambda sv: _send_in_thread(sv, instances), services))
+    else:
+        results = [send_to_service(sv, instances) for sv in services]
+
+    for rest_service, failures in zip(services, results):
+        for failed_instances, error in failures:
+            _handle_failure(rest_service, failed_instances, error, attempt)
+
+
+def is_batched(rest_service):
+    """
+    Returns True if submissions are sent to a service in batches.
+    """
+    return bool(rest_service.batch_size) and \
+        rest_service.get_service_definition().accepts_batches
+
+
+def get_service_queue(service_pk):
+    """
+    Returns the name of the queue of the submissions of a batched service.
+    """
+    return '{}{}'.format(REST_SERVICE_QUEUE, service_pk)
+
+
+def _schedule_flush(queue):
+    from onadata.apps.restservice.tasks import flush_service_queue_async
+
+    service_pk = int(queue[len(REST_SERVICE_QUEUE):])
+    batch_interval = RestService.objects.filter(pk=service_pk).values_list(
+        'batch_interval', flat=True).first()
+    flush_service_queue_async.apply_async(
+        args=[service_pk], countdown=batch_interval or 0)
+
+
+register_queue(REST_SERVICE_QUEUE, _schedule_flush)
+
+
+def _flush_full_queue(rest_service):
+    from onadata.apps.restservice.tasks import flush_service_queue_async
+
+    queued = QueuedItem.objects.filter(
+        queue=get_service_queue(rest_service.pk)).count()
+    if queued >= rest_service.batch_size:
+        flush_service_queue_async.apply_async(args=[rest_service.pk])
+
+
+def queue_submission(rest_service, instance_id):
+    """
+    Adds a submission to the queue of a batched service, the queue is sent
+    once it has batch_size submissions or batch_interval seconds after the
+    first submission.
+    """
+    queue_items(get_service_queue(rest_service.pk), [instance_id])
+    transaction.on_commit(lambda: _flush_full_queue(rest_service))
+
+
+def flush_service_queue(service_pk):
+    """
+    Sends the next batch_size submissions in the queue of a batched service
+    in one request. The submissions that can not be sent are retried and
+    then recorded as failed deliveries, the queue of a removed service is
+    discarded.
+    """
+    from onadata.apps.logger.models.instance import Instance
+
+    queue = get_service_queue(service_pk)
+    rest_service = RestService.objects.filter(pk=service_pk).first()
+    if rest_service is None:
+        QueuedItem.objects.filter(queue=queue).delete()
+        return
+
+    def _send(items):
+        # submissions removed since they were queued are not sent
+        instances = list(Instance.objects.select_related('xform').filter(
+            pk__in=set(item.object_id for item in items),
+            deleted_at__isnull=True).order_by('pk'))
+        if instances:
+            dispatch([rest_service], instances)
+
+    process_queue(queue, _send, rest_service.batch_size or 1)
+    if rest_service.batch_size:
+        # send the next batch now if it is full
+        _flush_full_queue(rest_service)
+
 
 def call_service(submission_instance):
     # lookup service which is not google sheet service
-    services = RestService.objects.filter(
-        xform_id=submission_instance.xform_id).exclude(name=GOOGLE_SHEET)
+    services = []
+    for sv in RestService.objects.filter(
+            xform_id=submission_instance.xform_id).exclude(name=GOOGLE_SHEET):
+        if is_batched(sv):
+            queue_submission(sv, submission_instance.pk)
+        else:
+            services.append(sv)
     # call service send with url and data parameters
-    for sv in services:
-        # TODO: Queue service
-        try:
-            service = sv.get_service_definition()()
-            service.send(sv.service_url, submission_instance)
-        except Exception as e:
-            # TODO: Handle gracefully | requeue/resend
-            logging.exception(_(u'Service threw exception: %s' % str(e)))
+    dispatch(services, [submission_instance])
@@ -73,6 +73,8 @@ class Export(models.Model):
     ZIP_EXPORT = 'zip'
     CSV_ZIP_EXPORT = 'csv_zip'
     SAV_ZIP_EXPORT = 'sav_zip'
+    PARQUET_ZIP_EXPORT = 'parquet_zip'
+    ARROW_ZIP_EXPORT = 'arrow_zip'
     SAV_EXPORT = 'sav'
     EXTERNAL_EXPORT = 'external'
     OSM_EXPORT = OSM
@@ -85,6 +87,8 @@ class Export(models.Model):
         'zip': 'zip',
         'csv_zip': 'zip',
         'sav_zip': 'zip',
+        'parquet_zip': 'zip',
+        'arrow_zip': 'zip',
         'sav': 'sav',
         'kml': 'vnd.google-earth.kml+xml',
         OSM: OSM
@@ -97,6 +101,8 @@ class Export(models.Model):
         (KML_EXPORT, 'kml'),
         (CSV_ZIP_EXPORT, 'CSV ZIP'),
         (SAV_ZIP_EXPORT, 'SAV ZIP'),
+        (PARQUET_ZIP_EXPORT, 'Parquet ZIP'),
+        (ARROW_ZIP_EXPORT, 'Arrow ZIP'),
         (SAV_EXPORT, 'SAV'),
         (EXTERNAL_EXPORT, 'Excel'),
         (OSM, OSM),
@@ -133,7 +139,7 @@ class Export(models.Model):
     # Required fields
     xform = models.ForeignKey('logger.XForm', on_delete=models.CASCADE)
     export_type = models.CharField(
-        max_length=10, choices=EXPORT_TYPES, default=XLS_EXPORT
+        max_length=12, choices=EXPORT_TYPES, default=XLS_EXPORT
     )
 
     # optional fields
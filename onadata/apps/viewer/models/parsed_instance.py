@@ -2,6 +2,7 @@ import datetime
 import json
 import types
 from builtins import str as text
+from hashlib import md5
 
 import six
 from dateutil import parser
@@ -19,6 +20,7 @@ from onadata.apps.viewer.parsed_instance_tools import (get_where_clause,
                                                        NONE_JSON_FIELDS)
 from onadata.libs.models.sorting import (
     json_order_by, json_order_by_params, sort_from_mongo_sort_str)
+from onadata.libs.utils.cache_tools import get_xform_data_version
 from onadata.libs.utils.common_tags import ID, UUID, ATTACHMENTS, \
     GEOLOCATION, SUBMISSION_TIME, MONGO_STRFTIME, BAMBOO_DATASET_ID, \
     DELETEDAT, TAGS, NOTES, SUBMITTED_BY, VERSION, DURATION, EDITED, \
@@ -79,10 +81,41 @@ def _parse_sort_fields(fields):
             yield NONE_JSON_FIELDS.get(field, field)
 
 
-def _query_iterator(sql, fields=None, params=[], count=False):
+def _get_cursor(chunk_size=None):
+    """
+    Returns a server-side (named) cursor when chunk_size is set and the
+    database supports it, otherwise returns a regular client-side cursor.
+    """
+    if chunk_size and connection.vendor == 'postgresql' and \
+            not connection.settings_dict.get('DISABLE_SERVER_SIDE_CURSORS'):
+        cursor = connection.chunked_cursor()
+        cursor.cursor.itersize = chunk_size
+
+        return cursor
+
+    return connection.cursor()
+
+
+def _fetch_rows(cursor, chunk_size=None):
+    """
+    Yields rows from the cursor, chunk_size rows at a time when it is set.
+    """
+    if not chunk_size:
+        for row in cursor.fetchall():
+            yield row
+    else:
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            for row in rows:
+                yield row
+
+
+def _query_iterator(sql, fields=None, params=[], count=False,
+                    chunk_size=None):
     if not sql:
         raise ValueError(_(u"Bad SQL: %s" % sql))
-    cursor = connection.cursor()
     sql_params = fields + params if fields is not None else params
 
     if count:
@@ -90,15 +123,21 @@ def _query_iterator(sql, fields=None, params=[], count=False):
         # is less hacky
         sql = u"SELECT COUNT(*) FROM (" + sql + ") AS CQ"
         fields = [u'count']
+        # a count returns a single row, no need for a server-side cursor
+        chunk_size = None
 
-    cursor.execute(sql, [text(i) for i in sql_params])
+    cursor = _get_cursor(chunk_size)
+    try:
+        cursor.execute(sql, [text(i) for i in sql_params])
 
-    if fields is None:
-        for row in cursor.fetchall():
-            yield row[0]
-    else:
-        for row in cursor.fetchall():
-            yield dict(zip(fields, row))
+        if fields is None:
+            for row in _fetch_rows(cursor, chunk_size):
+                yield row[0]
+        else:
+            for row in _fetch_rows(cursor, chunk_size):
+                yield dict(zip(fields, row))
+    finally:
+        cursor.close()
 
 
 def get_etag_hash_from_query(queryset, sql=None, params=None):
@@ -120,6 +159,21 @@ def get_etag_hash_from_query(queryset, sql=None, params=None):
     return u'%s' % datetime.datetime.utcnow()
 
 
+def get_etag_hash_from_data_version(xform, *args):
+    """Returns md5 hash of the data version of the XForm, or of the XForms
+    of a merged dataset, and args.
+    """
+    if xform.is_merged_dataset:
+        xform_ids = list(
+            xform.mergedxform.xforms.values_list('pk', flat=True))
+    else:
+        xform_ids = [xform.pk]
+    etag_value = [get_xform_data_version(xform_id) for xform_id in xform_ids]
+    etag_value.extend(text(arg) for arg in args)
+
+    return md5(':'.join(etag_value).encode('utf-8')).hexdigest()
+
+
 def _start_index_limit(records, sql, fields, params, sort, start_index, limit):
     if start_index is not None and \
             (start_index < 0 or (limit is not None and limit < 0)):
@@ -184,7 +238,7 @@ def get_sql_with_params(xform, query=None, fields=None, sort=None, start=None,
 
     known_integers = [
         get_name_from_survey_element(e)
-        for e in xform.get_survey_elements_of_type('integer')]
+        for e in xform.get_integer_survey_elements()]
     where, where_params = get_where_clause(query, known_integers)
 
     if fields and isinstance(fields, six.string_types):
@@ -238,7 +292,15 @@ def get_sql_with_params(xform, query=None, fields=None, sort=None, start=None,
 
 def query_data(xform, query=None, fields=None, sort=None, start=None,
                end=None, start_index=None, limit=None, count=None,
-               json_only: bool = True):
+               json_only: bool = True, chunk_size=None):
+    """
+    Returns the submissions of an XForm matching the given parameters.
+
+    When chunk_size is set, raw SQL queries i.e. queries with fields or JSON
+    sort fields, are read through a server-side cursor chunk_size rows at a
+    time so that memory use does not grow with the number of records.
+    Querysets are returned as is, use `.iterator(chunk_size=...)` on them.
+    """
 
     sql, params, records = get_sql_with_params(
         xform, query, fields, sort, start, end, start_index, limit, count,
@@ -248,7 +310,8 @@ def query_data(xform, query=None, fields=None, sort=None, start=None,
         fields = json.loads(fields)
     sort = _get_sort_fields(sort)
     if (ParsedInstance._has_json_fields(sort) or fields) and sql:
-        records = _query_iterator(sql, fields, params, count)
+        records = _query_iterator(sql, fields, params, count,
+                                  chunk_size=chunk_size)
 
     if count and isinstance(records, types.GeneratorType):
         return [i for i in records]
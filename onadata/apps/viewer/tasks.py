@@ -5,6 +5,7 @@ Export tasks.
 import sys
 from datetime import timedelta
 
+from celery import chord, current_task, group
 from future.utils import iteritems
 
 from django.conf import settings
@@ -15,13 +16,18 @@ from kombu.exceptions import OperationalError
 from requests import ConnectionError
 
 from onadata.apps.viewer.models.export import Export, ExportTypeError
+from onadata.apps.viewer.models.parsed_instance import query_data
 from onadata.libs.exceptions import NoRecordsFoundError
 from onadata.libs.utils.common_tools import get_boolean_value, report_exception
-from onadata.libs.utils.export_tools import (generate_attachments_zip_export,
+from onadata.libs.utils.export_tools import (can_export_in_shards,
+                                             generate_attachments_zip_export,
                                              generate_export,
+                                             generate_export_shard,
                                              generate_external_export,
                                              generate_kml_export,
-                                             generate_osm_export)
+                                             generate_osm_export,
+                                             get_export_shards,
+                                             merge_export_shards)
 from onadata.celery import app
 
 EXPORT_QUERY_KEY = 'query'
@@ -49,6 +55,57 @@ def _get_export_details(username, id_string, export_id):
     return details
 
 
+def _create_sharded_export(export_type, export, options):
+    """
+    Starts a sharded export: a create_export_shard task formats each shard
+    of the submissions and create_merged_export joins the shards once they
+    have all been formatted. The progress of the shard tasks is reported to
+    the current task.
+    """
+    xform = export.xform
+    query = options.get(EXPORT_QUERY_KEY)
+    total_records = query_data(
+        xform, query=query, count=True)[0].get('count') \
+        if query else xform.num_of_submissions
+    options = dict(options, task_id=current_task.request.id,
+                   total_records=total_records)
+
+    shards = group(
+        create_export_shard.s(
+            export_type, export.id, shard, min_instance_id, max_instance_id,
+            **options)
+        for (shard, (min_instance_id, max_instance_id)) in enumerate(
+            get_export_shards(xform, settings.EXPORT_SHARD_SIZE)))
+    chord(shards)(create_merged_export.s(export_type, export.id, **options))
+
+    return export
+
+
+def _complete_sharded_export(export, task_id):
+    """
+    Sets the state of the task that started a sharded export, which the
+    shard tasks report their progress to, back to SUCCESS once the export
+    has been generated or has failed.
+    """
+    if task_id:
+        current_task.update_state(
+            task_id=task_id, state='SUCCESS', meta=export.id)
+
+
+def _mark_sharded_export_as_failed(export_type, export, error):
+    export.internal_status = Export.FAILED
+    export.error_message = str(error)
+    export.save()
+    # mail admins
+    details = _get_export_details(
+        export.xform.user.username, export.xform.id_string, export.id)
+    details['export_type'] = export_type.upper()
+    report_exception(
+        "Sharded %(export_type)s Export Exception: Export ID - "
+        "%(export_id)s, /%(username)s/%(id_string)s" % details, error,
+        sys.exc_info())
+
+
 def create_async_export(xform, export_type, query, force_xlsx, options=None):
     """
     Starts asynchronous export tasks and returns an export object.
@@ -90,6 +147,8 @@ def create_async_export(xform, export_type, query, force_xlsx, options=None):
         Export.CSV_EXPORT: create_csv_export,
         Export.CSV_ZIP_EXPORT: create_csv_zip_export,
         Export.SAV_ZIP_EXPORT: create_sav_zip_export,
+        Export.PARQUET_ZIP_EXPORT: create_parquet_zip_export,
+        Export.ARROW_ZIP_EXPORT: create_arrow_zip_export,
         Export.ZIP_EXPORT: create_zip_export,
         Export.KML_EXPORT: create_kml_export,
         Export.OSM_EXPORT: create_osm_export,
@@ -169,10 +228,14 @@ def create_csv_export(username, id_string, export_id, **options):
     export = _get_export_object(export_id)
 
     try:
-        # though export is not available when for has 0 submissions, we
-        # catch this since it potentially stops celery
-        gen_export = generate_export(Export.CSV_EXPORT, export.xform,
-                                     export_id, options)
+        if can_export_in_shards(export.xform, Export.CSV_EXPORT, options):
+            gen_export = _create_sharded_export(
+                Export.CSV_EXPORT, export, options)
+        else:
+            # though export is not available when for has 0 submissions, we
+            # catch this since it potentially stops celery
+            gen_export = generate_export(Export.CSV_EXPORT, export.xform,
+                                         export_id, options)
     except NoRecordsFoundError:
         # not much we can do but we don't want to report this as the user
         # should not even be on this page if the survey has no records
@@ -301,10 +364,14 @@ def create_csv_zip_export(username, id_string, export_id, **options):
     export = _get_export_object(export_id)
     options["extension"] = Export.ZIP_EXPORT
     try:
-        # though export is not available when for has 0 submissions, we
-        # catch this since it potentially stops celery
-        gen_export = generate_export(Export.CSV_ZIP_EXPORT, export.xform,
-                                     export_id, options)
+        if can_export_in_shards(export.xform, Export.CSV_ZIP_EXPORT, options):
+            gen_export = _create_sharded_export(
+                Export.CSV_ZIP_EXPORT, export, options)
+        else:
+            # though export is not available when for has 0 submissions, we
+            # catch this since it potentially stops celery
+            gen_export = generate_export(Export.CSV_ZIP_EXPORT, export.xform,
+                                         export_id, options)
     except (Exception, NoRecordsFoundError) as e:
         export.internal_status = Export.FAILED
         export.error_message = str(e)
@@ -320,6 +387,41 @@ def create_csv_zip_export(username, id_string, export_id, **options):
         return gen_export.id
 
 
+@app.task(track_started=True)
+def create_export_shard(export_type, export_id, shard, min_instance_id,
+                        max_instance_id, **options):
+    """
+    Sharded export task, formats a shard of the submissions.
+    """
+    export = _get_export_object(export_id)
+    try:
+        return generate_export_shard(
+            export_type, export.xform, export_id, shard, min_instance_id,
+            max_instance_id, options)
+    except Exception as e:
+        _mark_sharded_export_as_failed(export_type, export, e)
+        _complete_sharded_export(export, options.get('task_id'))
+        raise
+
+
+@app.task(track_started=True)
+def create_merged_export(shards, export_type, export_id, **options):
+    """
+    Sharded export task, merges the formatted shards into the export.
+    """
+    export = _get_export_object(export_id)
+    try:
+        gen_export = merge_export_shards(
+            export_type, export.xform, export_id, shards, options)
+    except Exception as e:
+        _mark_sharded_export_as_failed(export_type, export, e)
+        raise
+    else:
+        return gen_export.id
+    finally:
+        _complete_sharded_export(export, options.get('task_id'))
+
+
 @app.task(track_started=True)
 def create_sav_zip_export(username, id_string, export_id, **options):
     """
@@ -346,6 +448,60 @@ def create_sav_zip_export(username, id_string, export_id, **options):
         return gen_export.id
 
 
+@app.task(track_started=True)
+def create_parquet_zip_export(username, id_string, export_id, **options):
+    """
+    Parquet zip export task.
+    """
+    export = _get_export_object(export_id)
+    options["extension"] = Export.ZIP_EXPORT
+    try:
+        # though export is not available when for has 0 submissions, we
+        # catch this since it potentially stops celery
+        gen_export = generate_export(Export.PARQUET_ZIP_EXPORT, export.xform,
+                                     export_id, options)
+    except (Exception, NoRecordsFoundError) as e:
+        export.internal_status = Export.FAILED
+        export.error_message = str(e)
+        export.save()
+        # mail admins
+        details = _get_export_details(username, id_string, export_id)
+        report_exception(
+            "PARQUET ZIP Export Exception: Export ID - "
+            "%(export_id)s, /%(username)s/%(id_string)s" % details, e,
+            sys.exc_info())
+        raise
+    else:
+        return gen_export.id
+
+
+@app.task(track_started=True)
+def create_arrow_zip_export(username, id_string, export_id, **options):
+    """
+    Arrow IPC zip export task.
+    """
+    export = _get_export_object(export_id)
+    options["extension"] = Export.ZIP_EXPORT
+    try:
+        # though export is not available when for has 0 submissions, we
+        # catch this since it potentially stops celery
+        gen_export = generate_export(Export.ARROW_ZIP_EXPORT, export.xform,
+                                     export_id, options)
+    except (Exception, NoRecordsFoundError) as e:
+        export.internal_status = Export.FAILED
+        export.error_message = str(e)
+        export.save()
+        # mail admins
+        details = _get_export_details(username, id_string, export_id)
+        report_exception(
+            "ARROW ZIP Export Exception: Export ID - "
+            "%(export_id)s, /%(username)s/%(id_string)s" % details, e,
+            sys.exc_info())
+        raise
+    else:
+        return gen_export.id
+
+
 @app.task(track_started=True)
 def create_external_export(username, id_string, export_id, **options):
     """
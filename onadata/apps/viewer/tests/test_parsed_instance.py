@@ -4,7 +4,8 @@ from onadata.apps.logger.models.instance import Instance
 from onadata.apps.main.models.user_profile import UserProfile
 from onadata.apps.main.tests.test_base import TestBase
 from onadata.apps.viewer.models.parsed_instance import (
-    get_where_clause, get_sql_with_params, _parse_sort_fields
+    get_where_clause, get_sql_with_params, _parse_sort_fields, query_data,
+    get_etag_hash_from_data_version
 )
 
 
@@ -149,3 +150,49 @@ class TestParsedInstance(TestBase):
         expected_return = ['name', 'date_created', '-date_modified']
         self.assertEqual(
             [i for i in _parse_sort_fields(fields)], expected_return)
+
+    def test_query_data_with_chunk_size(self):
+        """
+        Test that query_data returns the same records when reading them
+        through a server-side cursor in chunks
+        """
+        self._create_user_and_login()
+        self._publish_transportation_form()
+        for a in range(4):
+            self._submit_transport_instance(survey_at=a)
+
+        fields = '["_id", "transport/available_transportation_types_to_referral_facility"]'  # noqa
+        expected = list(query_data(self.xform, fields=fields))
+        self.assertEqual(len(expected), 4)
+
+        records = query_data(self.xform, fields=fields, chunk_size=1)
+        self.assertEqual(list(records), expected)
+
+        records = query_data(self.xform, sort='{"_id": -1}', chunk_size=3)
+        self.assertEqual(
+            [i['_id'] for i in records],
+            [i['_id'] for i in reversed(expected)])
+
+    def test_get_etag_hash_from_data_version(self):
+        """
+        Test that the data version ETag changes when submissions are created
+        or deleted and only then
+        """
+        self._create_user_and_login()
+        self._publish_transportation_form()
+        self._submit_transport_instance(survey_at=0)
+
+        etag_hash = get_etag_hash_from_data_version(self.xform, '/data')
+        self.assertEqual(
+            etag_hash, get_etag_hash_from_data_version(self.xform, '/data'))
+        self.assertNotEqual(
+            etag_hash, get_etag_hash_from_data_version(self.xform, '/data/1'))
+
+        self._submit_transport_instance(survey_at=1)
+        new_etag_hash = get_etag_hash_from_data_version(self.xform, '/data')
+        self.assertNotEqual(etag_hash, new_etag_hash)
+
+        self.xform.instances.last().set_deleted()
+        self.assertNotEqual(
+            new_etag_hash,
+            get_etag_hash_from_data_version(self.xform, '/data'))
@@ -1,7 +1,10 @@
 from datetime import timedelta
+from zipfile import ZipFile
 
 from celery import current_app
 from django.conf import settings
+from django.core.files.storage import default_storage
+from django.test.utils import override_settings
 from django.utils import timezone
 
 from onadata.apps.main.tests.test_base import TestBase
@@ -44,6 +47,33 @@ class TestExportTasks(TestBase):
             self.assertIn("username", options)
             self.assertEquals(options.get("id_string"), self.xform.id_string)
 
+    def test_create_sharded_export(self):
+        """
+        Test sharded exports have the same content as exports generated by
+        a single task.
+        """
+        self._publish_transportation_form()
+        self._make_submissions()
+        self.xform.refresh_from_db()
+
+        def _get_export_content(export_type):
+            export = create_async_export(
+                self.xform, export_type, None, False, {})[0]
+            export.refresh_from_db()
+            self.assertEqual(export.internal_status, Export.SUCCESSFUL)
+            with default_storage.open(export.filepath) as export_file:
+                if export_type == Export.CSV_EXPORT:
+                    return export_file.read()
+                with ZipFile(export_file) as zip_file:
+                    return {name: zip_file.read(name)
+                            for name in zip_file.namelist()}
+
+        for export_type in [Export.CSV_EXPORT, Export.CSV_ZIP_EXPORT]:
+            content = _get_export_content(export_type)
+            with override_settings(EXPORT_SHARD_SIZE=3):
+                sharded_content = _get_export_content(export_type)
+            self.assertEqual(content, sharded_content)
+
     def test_mark_expired_pending_exports_as_failed(self):
         self._publish_transportation_form_and_submit_instance()
         over_threshold = settings.EXPORT_TASK_LIFESPAN + 2
@@ -1,7 +1,13 @@
 import logging
+from contextlib import contextmanager
+
 from django.conf import settings
-from django.db import connection
+from django.core.cache import cache
+from django.db import connection, transaction
 
+from onadata.libs.utils.cache_tools import (
+    XFORM_AGGREGATES, get_xform_data_rewrite_version, get_xform_data_version,
+    safe_key)
 from onadata.libs.utils.common_tags import (
     SUBMISSION_TIME, SUBMITTED_BY)
 from onadata.apps.logger.models.data_view import DataView
@@ -9,6 +15,11 @@ from onadata.apps.logger.models.data_view import DataView
 
 logger = logging.getLogger(__name__)
 
+# seconds an aggregate is cached for, the cached aggregate is replaced
+# whenever the submissions of the form change
+AGGREGATE_CACHE_TIMEOUT = 24 * 60 * 60
+AGGREGATE_COLUMNS = ('count', 'sum', 'mean')
+
 
 def _dictfetchall(cursor):
     "Returns all rows from a cursor as a dict"
@@ -27,6 +38,118 @@ def _execute_query(query, to_dict=True):
     return _dictfetchall(cursor) if to_dict else cursor
 
 
+@contextmanager
+def _repeatable_read():
+    """
+    Runs the queries of the block on the same snapshot of the database.
+    """
+    if connection.in_atomic_block:
+        # the isolation level can only be set when a transaction starts
+        yield
+        return
+
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+        yield
+
+
+def _get_submissions_snapshot(xform, max_id=0):
+    """
+    Returns the last submission id and number of submissions of an XForm and
+    the number of submissions with an id up to max_id.
+    """
+    cursor = connection.cursor()
+    cursor.execute(
+        "SELECT MAX(id), COUNT(*), COUNT(*) FILTER (WHERE id <= %s) "
+        "FROM logger_instance WHERE xform_id = %s AND deleted_at IS NULL",
+        [max_id, xform.pk])
+    last_id, total, previous_total = cursor.fetchone()
+
+    return last_id or 0, total, previous_total
+
+
+def _merge_aggregates(rows, new_rows):
+    """
+    Returns the aggregate rows with the counts and sums of new_rows added or
+    None when new_rows has groups that are not in rows.
+    """
+    rows = [dict(row) for row in rows]
+    groups = dict(
+        (tuple((k, v) for k, v in row.items() if k not in AGGREGATE_COLUMNS),
+         row) for row in rows)
+    for new_row in new_rows:
+        row = groups.get(tuple(
+            (k, v) for k, v in new_row.items() if k not in AGGREGATE_COLUMNS))
+        if row is None:
+            # the position of a new group depends on the database collation
+            return None
+
+        row['count'] += new_row['count']
+        if 'sum' in row:
+            if new_row['sum'] is not None:
+                row['sum'] = (row['sum'] or 0) + new_row['sum']
+            if 'mean' in row:
+                row['mean'] = row['sum'] / row['count'] \
+                    if row['sum'] is not None and row['count'] else None
+
+    return rows
+
+
+def _execute_cached_query(xform, build_query, *args):
+    """
+    Returns the result of the aggregate query build_query(min_id) on the
+    submissions of an XForm. The result is cached until the submissions of
+    the form change, when submissions have only been added the cached result
+    is updated with the aggregate of the submissions after the last one.
+    """
+    timeout = getattr(
+        settings, 'AGGREGATE_CACHE_TIMEOUT', AGGREGATE_CACHE_TIMEOUT)
+    if not timeout or xform.is_merged_dataset:
+        return _execute_query(build_query(None))
+
+    data_view = args[-1]
+    key = '{}{}-{}'.format(XFORM_AGGREGATES, xform.pk, safe_key(repr(
+        (build_query.__name__, xform.hash) + args[:-1] +
+        ((data_view.pk, data_view.query) if data_view else (None, )))))
+    version = get_xform_data_version(xform.pk)
+    rewrite_version = get_xform_data_rewrite_version(xform.pk)
+    cached = cache.get(key)
+    if cached and cached['version'] == version:
+        return cached['rows']
+
+    rows = None
+    if cached and cached['rewrite_version'] == rewrite_version:
+        with _repeatable_read():
+            max_id, total, previous_total = _get_submissions_snapshot(
+                xform, cached['max_id'])
+            if previous_total == cached['total']:
+                rows = _merge_aggregates(
+                    cached['rows'],
+                    _execute_query(build_query(cached['max_id'])))
+    if rows is None:
+        with _repeatable_read():
+            max_id, total, previous_total = _get_submissions_snapshot(xform)
+            rows = _execute_query(build_query(None))
+
+    cache.set(key, {
+        'version': version,
+        'rewrite_version': rewrite_version,
+        'max_id': max_id,
+        'total': total,
+        'rows': rows
+    }, timeout)
+
+    return rows
+
+
+def _id_filter(min_id, column='id'):
+    if min_id is None:
+        return ""
+
+    return " AND %s > %d " % (column, min_id)
+
+
 def _get_fields_of_type(xform, types):
     k = []
     survey_elements = flatten(
@@ -60,7 +183,7 @@ def _json_query(field):
 
 
 def _postgres_count_group_field_n_group_by(field, name, xform, group_by,
-                                           data_view):
+                                           data_view, min_id=None):
     string_args = _query_args(field, name, xform, group_by)
     if is_date_field(xform, field):
         string_args['json'] = "to_char(to_date(%(json)s, 'YYYY-MM-DD'), 'YYYY"\
@@ -75,7 +198,8 @@ def _postgres_count_group_field_n_group_by(field, name, xform, group_by,
             "%(group_by)s AS \"%(group_name)s\", "\
             "count(*) as count "\
             "FROM %(table)s WHERE " + restricted_string + \
-            "AND deleted_at IS NULL " + additional_filters + \
+            "AND deleted_at IS NULL " + _id_filter(min_id) + \
+            additional_filters + \
             " GROUP BY %(json)s, %(group_by)s" + \
             " ORDER BY %(json)s, %(group_by)s"
     query = query % string_args
@@ -83,7 +207,7 @@ def _postgres_count_group_field_n_group_by(field, name, xform, group_by,
     return query
 
 
-def _postgres_count_group(field, name, xform, data_view=None):
+def _postgres_count_group(field, name, xform, data_view=None, min_id=None):
     string_args = _query_args(field, name, xform)
     if is_date_field(xform, field):
         string_args['json'] = "to_char(to_date(%(json)s, 'YYYY-MM-DD'), 'YYYY"\
@@ -93,22 +217,26 @@ def _postgres_count_group(field, name, xform, data_view=None):
     if data_view:
         additional_filters = _additional_data_view_filters(data_view)
 
+    id_filter = _id_filter(min_id)
     # Use left join to the auth user model for better performance.
     if field == SUBMITTED_BY:
         string_args["json"] = "au.username"
         string_args["join"] = "i LEFT JOIN auth_user au ON au.id = i.user_id"
+        id_filter = _id_filter(min_id, 'i.id')
 
     restricted_string = _restricted_query(xform)
     sql_query = "SELECT %(json)s AS \"%(name)s\", COUNT(*) AS count FROM " \
         "%(table)s %(join)s WHERE " + restricted_string + \
-        " AND deleted_at IS NULL " + additional_filters + " GROUP BY %(json)s"\
+        " AND deleted_at IS NULL " + id_filter + additional_filters + \
+        " GROUP BY %(json)s"\
         " ORDER BY %(json)s"
     sql_query = sql_query % string_args
 
     return sql_query
 
 
-def _postgres_aggregate_group_by(field, name, xform, group_by, data_view=None):
+def _postgres_aggregate_group_by(field, name, xform, group_by, data_view=None,
+                                 min_id=None):
     string_args = _query_args(field, name, xform, group_by)
     if is_date_field(xform, field):
         string_args['json'] = "to_char(to_date(%(json)s, 'YYYY-MM-DD'), 'YYYY"\
@@ -141,7 +269,8 @@ def _postgres_aggregate_group_by(field, name, xform, group_by, data_view=None):
         group_by_group_by = "%(json)s, " + group_by_group_by
     query = "SELECT " + group_by_select + aggregation_string + \
             "FROM %(table)s WHERE " + restricted_string + \
-            " AND deleted_at IS NULL " + additional_filters + \
+            " AND deleted_at IS NULL " + _id_filter(min_id) + \
+            additional_filters + \
             " GROUP BY " + group_by_group_by + \
             " ORDER BY " + group_by_group_by
 
@@ -217,13 +346,49 @@ def get_field_records(field, xform):
     return [float(i[0]) for i in result if i[0] is not None]
 
 
+def get_fields_records(fields, xform, chunk_size=10000):
+    """
+    Returns the values of fields in the submissions of an XForm, read in one
+    pass over the submissions, as a list of values for each field. Empty
+    values are left out. The submissions are read chunk_size rows at a time
+    with a server-side cursor when the database supports it.
+    """
+    if not fields:
+        return []
+
+    string_args = _query_args(fields[0], fields[0], xform)
+    restricted_string = _restricted_query(xform) % string_args
+    query = "SELECT " + ", ".join(_json_query(f) for f in fields) + \
+        " FROM logger_instance WHERE " + restricted_string + \
+        " AND deleted_at IS NULL"
+    records = [[] for _field in fields]
+    if connection.vendor == 'postgresql' and \
+            not connection.settings_dict.get('DISABLE_SERVER_SIDE_CURSORS'):
+        cursor = connection.chunked_cursor()
+        cursor.cursor.itersize = chunk_size
+    else:
+        cursor = connection.cursor()
+    with cursor:
+        cursor.execute(query)
+        rows = cursor.fetchmany(chunk_size)
+        while rows:
+            for i, values in enumerate(records):
+                values.extend(row[i] for row in rows if row[i] is not None)
+            rows = cursor.fetchmany(chunk_size)
+
+    return records
+
+
 def get_form_submissions_grouped_by_field(xform, field, name=None,
                                           data_view=None):
     """Number of submissions grouped by field"""
     if not name:
         name = field
 
-    return _execute_query(_postgres_count_group(field, name, xform, data_view))
+    def count_group(min_id):
+        return _postgres_count_group(field, name, xform, data_view, min_id)
+
+    return _execute_cached_query(xform, count_group, field, name, data_view)
 
 
 def get_form_submissions_aggregated_by_select_one(xform, field, name=None,
@@ -232,11 +397,13 @@ def get_form_submissions_aggregated_by_select_one(xform, field, name=None,
     """Number of submissions grouped and aggregated by select_one field"""
     if not name:
         name = field
-    return _execute_query(_postgres_aggregate_group_by(field,
-                                                       name,
-                                                       xform,
-                                                       group_by,
-                                                       data_view))
+
+    def aggregate_group_by(min_id):
+        return _postgres_aggregate_group_by(
+            field, name, xform, group_by, data_view, min_id)
+
+    return _execute_cached_query(
+        xform, aggregate_group_by, field, name, group_by, data_view)
 
 
 def get_form_submissions_grouped_by_select_one(xform, field, group_by,
@@ -244,11 +411,13 @@ def get_form_submissions_grouped_by_select_one(xform, field, group_by,
     """Number of submissions disaggregated by select_one field"""
     if not name:
         name = field
-    return _execute_query(_postgres_count_group_field_n_group_by(field,
-                                                                 name,
-                                                                 xform,
-                                                                 group_by,
-                                                                 data_view))
+
+    def count_group_field_n_group_by(min_id):
+        return _postgres_count_group_field_n_group_by(
+            field, name, xform, group_by, data_view, min_id)
+
+    return _execute_cached_query(
+        xform, count_group_field_n_group_by, field, name, group_by, data_view)
 
 
 def get_numeric_fields(xform):
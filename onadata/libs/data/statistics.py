@@ -1,6 +1,9 @@
 import numpy as np
 from onadata.apps.api.tools import DECIMAL_PRECISION
-from onadata.libs.data.query import get_field_records, get_numeric_fields
+from onadata.libs.data.query import (get_field_records, get_fields_records,
+                                     get_numeric_fields)
+
+STATS = ('mean', 'median', 'mode', 'max', 'min', 'range')
 
 
 def _chk_asarray(a, axis):
@@ -21,24 +24,69 @@ def get_median(values, axis=None):
     return np.median(values, axis)
 
 
+def _get_mode(a):
+    scores, counts = np.unique(a, return_counts=True)
+    if not scores.size:
+        return 0., 0.
+
+    # the smallest of the most frequent scores
+    index = np.argmax(counts)
+
+    return scores[index], counts[index]
+
+
 def get_mode(values, axis=0):
     """
+    Returns the most frequent values along an axis and their counts.
+
     Adapted from
     https://github.com/scipy/scipy/blob/master/scipy/stats/stats.py#L568
     """
     a, axis = _chk_asarray(values, axis)
-    scores = np.unique(np.ravel(a))       # get ALL unique values
     testshape = list(a.shape)
     testshape[axis] = 1
-    oldmostfreq = np.zeros(testshape)
-    oldcounts = np.zeros(testshape)
-    for score in scores:
-        template = (a == score)
-        counts = np.expand_dims(np.sum(template, axis), axis)
-        mostfrequent = np.where(counts > oldcounts, score, oldmostfreq)
-        oldcounts = np.maximum(counts, oldcounts)
-        oldmostfreq = mostfrequent
-    return mostfrequent, oldcounts
+    if a.ndim == 1:
+        mostfrequent, counts = _get_mode(a)
+
+        return (np.full(testshape, mostfrequent, dtype=float),
+                np.full(testshape, counts, dtype=float))
+
+    modes = np.apply_along_axis(
+        lambda x: np.array(_get_mode(x), dtype=float), axis, a)
+
+    return np.take(modes, [0], axis), np.take(modes, [1], axis)
+
+
+def get_stats(values, stats=STATS):
+    """
+    Returns the stats of a NumPy array of values.
+    """
+    data = {}
+    if 'mean' in stats:
+        data['mean'] = np.round(np.mean(values), DECIMAL_PRECISION)
+    if 'median' in stats:
+        data['median'] = np.median(values)
+    if 'mode' in stats:
+        mode, _count = get_mode(values)
+        data['mode'] = np.round(mode, DECIMAL_PRECISION)
+    if set(['max', 'min', 'range']).intersection(stats):
+        _max, _min = np.max(values), np.min(values)
+        data.update({'max': _max, 'min': _min, 'range': _max - _min})
+
+    return data
+
+
+def get_stats_for_numeric_fields_in_form(xform, field=None, stats=STATS):
+    """
+    Returns the stats of a numeric field or of all the numeric fields of an
+    XForm, the values of all the fields are read in one query.
+    """
+    fields = [field] if field else get_numeric_fields(xform)
+    records = get_fields_records(fields, xform)
+
+    return dict(
+        (field_name, get_stats(np.array(values, dtype=float), stats))
+        for field_name, values in zip(fields, records))
 
 
 def get_median_for_field(field, xform):
@@ -46,11 +94,8 @@ def get_median_for_field(field, xform):
 
 
 def get_median_for_numeric_fields_in_form(xform, field=None):
-    data = {}
-    for field_name in [field] if field else get_numeric_fields(xform):
-        median = get_median_for_field(field_name, xform)
-        data.update({field_name: median})
-    return data
+    data = get_stats_for_numeric_fields_in_form(xform, field, ['median'])
+    return dict((k, v['median']) for k, v in data.items())
 
 
 def get_mean_for_field(field, xform):
@@ -58,11 +103,8 @@ def get_mean_for_field(field, xform):
 
 
 def get_mean_for_numeric_fields_in_form(xform, field):
-    data = {}
-    for field_name in [field] if field else get_numeric_fields(xform):
-        mean = get_mean_for_field(field_name, xform)
-        data.update({field_name: np.round(mean, DECIMAL_PRECISION)})
-    return data
+    data = get_stats_for_numeric_fields_in_form(xform, field, ['mean'])
+    return dict((k, v['mean']) for k, v in data.items())
 
 
 def get_mode_for_field(field, xform):
@@ -72,11 +114,8 @@ def get_mode_for_field(field, xform):
 
 
 def get_mode_for_numeric_fields_in_form(xform, field=None):
-    data = {}
-    for field_name in [field] if field else get_numeric_fields(xform):
-        mode = get_mode_for_field(field_name, xform)
-        data.update({field_name: np.round(mode, DECIMAL_PRECISION)})
-    return data
+    data = get_stats_for_numeric_fields_in_form(xform, field, ['mode'])
+    return dict((k, v['mode']) for k, v in data.items())
 
 
 def get_min_max_range_for_field(field, xform):
@@ -88,26 +127,9 @@ def get_min_max_range_for_field(field, xform):
 
 
 def get_min_max_range(xform, field=None):
-    data = {}
-    for field_name in [field] if field else get_numeric_fields(xform):
-        _min, _max, _range = get_min_max_range_for_field(field_name, xform)
-        data[field_name] = {'max': _max, 'min': _min, 'range': _range}
-    return data
+    return get_stats_for_numeric_fields_in_form(
+        xform, field, ['max', 'min', 'range'])
 
 
 def get_all_stats(xform, field=None):
-    data = {}
-    for field_name in [field] if field else get_numeric_fields(xform):
-        _min, _max, _range = get_min_max_range_for_field(field_name, xform)
-        mode = get_mode_for_field(field_name, xform)
-        mean = get_mean_for_field(field_name, xform)
-        median = get_median_for_field(field_name, xform)
-        data[field_name] = {
-            'mean': np.round(mean, DECIMAL_PRECISION),
-            'median': median,
-            'mode': np.round(mode, DECIMAL_PRECISION),
-            'max': _max,
-            'min': _min,
-            'range': _range
-        }
-    return data
+    return get_stats_for_numeric_fields_in_form(xform, field)
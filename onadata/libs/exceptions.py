@@ -30,6 +30,10 @@ class J2XException(Exception):
     pass
 
 
+class IncrementalExportError(Exception):
+    pass
+
+
 class ServiceUnavailable(APIException):
     status_code = 503
     default_detail = 'Service temporarily unavailable, try again later.'
@@ -1,17 +1,49 @@
 from builtins import str as text
 from hashlib import md5
 
+from django.db.models import Count, Max
+from django.shortcuts import get_object_or_404
+from rest_framework import status
+from rest_framework.response import Response
+
 MODELS_WITH_DATE_MODIFIED = ('XForm', 'Instance', 'Project', 'Attachment',
                              'MetaData', 'Note', 'OrganizationProfile',
                              'UserProfile', 'Team')
 
 
+class NotModified(Exception):
+    """
+    Raised when the ETag of a GET request matches its If-None-Match header.
+    """
+
+
+def parse_if_none_match(header):
+    """
+    Returns the ETags in an If-None-Match header without quotes and weak
+    indicators.
+    """
+    etags = []
+    for etag in (header or '').split(','):
+        etag = etag.strip()
+        if etag.startswith('W/'):
+            etag = etag[2:]
+        etag = etag.strip('"')
+        if etag:
+            etags.append(etag)
+
+    return etags
+
+
 class ETagsMixin(object):
     """
     Applies the Etag on GET responses with status code 200, 201, 202
 
     self.etag_data - if it is set, the etag is calculated from this data,
         otherwise the date_modifed of self.object or self.object_list is used.
+
+    get_etag_version() - if it returns a value for a GET request, it is the
+        etag of the response and a 304 Not Modified response is returned when
+        it matches the If-None-Match header, before the view is called.
     """
 
     def set_etag_header(self, etag_value, etag_hash=None):
@@ -20,6 +52,59 @@ class ETagsMixin(object):
         if etag_hash:
             self.headers.update({'ETag': etag_hash})
 
+    def get_etag_version(self, request, *args, **kwargs):
+        """
+        Returns the etag of a GET request computed without running the view,
+        None if the etag is only known once the response is built.
+        """
+        return None
+
+    def get_etag_object(self, queryset, *fields):
+        """
+        Returns the object of the request with only fields loaded, the
+        object permissions are checked as in get_object().
+        """
+        queryset = self.filter_queryset(queryset).select_related(
+            None).prefetch_related(None).only(*fields)
+        obj = get_object_or_404(
+            queryset, **{self.lookup_field: self.kwargs[self.lookup_field]})
+        self.check_object_permissions(self.request, obj)
+
+        return obj
+
+    def get_etag_permissions(self, obj, *permission_models):
+        """
+        Returns the count and the highest id of the object permissions of obj
+        in each of the guardian permission_models, they change when the
+        object is shared or unshared.
+        """
+        permissions = []
+        for model in permission_models:
+            aggregate = model.objects.filter(content_object_id=obj.pk)\
+                .aggregate(count=Count('pk'), max_id=Max('pk'))
+            permissions += [aggregate['count'], aggregate['max_id']]
+
+        return permissions
+
+    def initial(self, request, *args, **kwargs):
+        super(ETagsMixin, self).initial(request, *args, **kwargs)
+
+        if request.method == 'GET':
+            etag_hash = self.get_etag_version(request, *args, **kwargs)
+            if etag_hash:
+                self.etag_hash = etag_hash
+                if etag_hash in parse_if_none_match(
+                        request.META.get('HTTP_IF_NONE_MATCH')):
+                    raise NotModified()
+
+    def handle_exception(self, exc):
+        if isinstance(exc, NotModified):
+            self.set_etag_header(None, self.etag_hash)
+
+            return Response(status=status.HTTP_304_NOT_MODIFIED)
+
+        return super(ETagsMixin, self).handle_exception(exc)
+
     def finalize_response(self, request, response, *args, **kwargs):
         if request.method == 'GET' and not response.streaming and \
                 response.status_code in [200, 201, 202]:
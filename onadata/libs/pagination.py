@@ -2,7 +2,8 @@ from django.core.paginator import Paginator
 from django.conf import settings
 from django.db.models import QuerySet
 from rest_framework.pagination import (
-    PageNumberPagination, InvalidPage, NotFound, replace_query_param)
+    CursorPagination, PageNumberPagination, InvalidPage, NotFound,
+    replace_query_param)
 from rest_framework.request import Request
 
 
@@ -98,3 +99,26 @@ class CountOverridablePageNumberPagination(StandardPageNumberPagination):
 
         self.request = request
         return list(self.page)
+
+
+class IdCursorPagination(CursorPagination):
+    """
+    Keyset pagination on the primary key, fetching a page costs the same
+    regardless of how deep into the records the page is.
+    """
+    ordering = 'id'
+    page_size = 1000
+    page_size_query_param = 'page_size'
+    max_page_size = getattr(
+        settings, "STANDARD_PAGINATION_MAX_PAGE_SIZE", 10000)
+
+    def generate_link_header(self):
+        links = []
+
+        for rel, link in (
+                ('prev', self.get_previous_link()),
+                ('next', self.get_next_link())):
+            if link:
+                links.append(f'<{link}>; rel="{rel}"')
+
+        return {'Link': ', '.join(links)} if links else {}
@@ -153,6 +153,38 @@ class SAVZIPRenderer(BaseRenderer):  # pylint: disable=too-few-public-methods
         return data
 
 
+class ParquetZIPRenderer(BaseRenderer):  # pylint: disable=R0903
+    """
+    ParquetZIPRenderer - renders a ZIP file that contains Parquet files.
+    """
+    media_type = 'application/octet-stream'
+    format = 'parquetzip'
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, six.text_type):
+            return data.encode('utf-8')
+        elif isinstance(data, dict):
+            return json.dumps(data)
+        return data
+
+
+class ArrowZIPRenderer(BaseRenderer):  # pylint: disable=R0903
+    """
+    ArrowZIPRenderer - renders a ZIP file that contains Arrow IPC files.
+    """
+    media_type = 'application/octet-stream'
+    format = 'arrowzip'
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, six.text_type):
+            return data.encode('utf-8')
+        elif isinstance(data, dict):
+            return json.dumps(data)
+        return data
+
+
 class SurveyRenderer(BaseRenderer):  # pylint: disable=too-few-public-methods
     """
     SurveyRenderer - renders XML data.
@@ -1,7 +1,9 @@
+from future.utils import iteritems
 from rest_framework import serializers
 
 from onadata.apps.viewer.models.export import Export
 from onadata.libs.utils.async_status import status_msg
+from onadata.libs.utils.export_tools import INCREMENTAL_EXPORT_KEY
 
 from rest_framework.reverse import reverse
 
@@ -11,6 +13,7 @@ class ExportSerializer(serializers.HyperlinkedModelSerializer):
     job_status = serializers.SerializerMethodField()
     type = serializers.SerializerMethodField()
     export_url = serializers.SerializerMethodField()
+    options = serializers.SerializerMethodField()
 
     class Meta:
         model = Export
@@ -24,6 +27,12 @@ class ExportSerializer(serializers.HyperlinkedModelSerializer):
     def get_type(self, obj):
         return obj.export_type
 
+    def get_options(self, obj):
+        # the incremental export state is internal to the export
+        return {
+            key: value for (key, value) in iteritems(obj.options or {})
+            if key != INCREMENTAL_EXPORT_KEY}
+
     def get_export_url(self, obj):
         if obj.export_url:
             return obj.export_url
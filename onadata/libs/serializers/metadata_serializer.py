@@ -28,7 +28,9 @@ from onadata.libs.serializers.fields.project_related_field import \
 from onadata.libs.serializers.fields.xform_related_field import \
     XFormRelatedField
 from onadata.libs.utils.common_tags import (
-    XFORM_META_PERMS, SUBMISSION_REVIEW, IMPORTED_VIA_CSV_BY)
+    XFORM_META_PERMS, SUBMISSION_REVIEW, IMPORTED_VIA_CSV_BY, INDEXED_FIELD)
+from onadata.libs.utils.json_index_tools import (JSON_INDEX_MAX_FIELDS,
+                                                 get_indexed_fields)
 
 UNIQUE_TOGETHER_ERROR = u"Object already exists"
 
@@ -50,7 +52,8 @@ METADATA_TYPES = (
     ('google_sheets', _(u"Google Sheet")),
     ('xform_meta_perms', _("Xform meta permissions")),
     ('submission_review', _("Submission Review")),
-    (IMPORTED_VIA_CSV_BY, _("Imported via CSV by")))  # yapf:disable
+    (IMPORTED_VIA_CSV_BY, _("Imported via CSV by")),
+    (INDEXED_FIELD, _("Indexed Field")))  # yapf:disable
 
 DATAVIEW_TAG = 'dataview'
 XFORM_TAG = 'xform'
@@ -205,6 +208,23 @@ class MetaDataSerializer(serializers.HyperlinkedModelSerializer):
                 raise serializers.ValidationError(
                     _(u"Format 'role'|'role' or Invalid role"))
 
+        if data_type == INDEXED_FIELD:
+            xform = attrs.get('xform')
+            if xform is None:
+                raise serializers.ValidationError({
+                    'xform': _(u"Only form fields can be indexed.")})
+            if xform.get_element(value) is None:
+                raise serializers.ValidationError({
+                    'data_value':
+                    _(u"Field '%s' not found in the form." % value)})
+            max_fields = getattr(
+                settings, 'JSON_INDEX_MAX_FIELDS', JSON_INDEX_MAX_FIELDS)
+            if len(get_indexed_fields(xform)) >= max_fields:
+                raise serializers.ValidationError({
+                    'data_value':
+                    _(u"A form can not have more than %d indexed fields."
+                      % max_fields)})
+
         return attrs
 
     # pylint: disable=R0201
@@ -1,3 +1,4 @@
+from django.utils.translation import ugettext as _
 from rest_framework import serializers
 
 from onadata.apps.logger.models import XForm
@@ -15,4 +16,22 @@ class RestServiceSerializer(serializers.ModelSerializer):
     class Meta:
         model = RestService
         fields = ('id', 'xform', 'name', 'service_url', 'date_created',
-                  'date_modified', 'active', 'inactive_reason')
+                  'date_modified', 'active', 'inactive_reason', 'batch_size',
+                  'batch_interval')
+
+    def validate(self, attrs):
+        name = attrs.get('name', getattr(self.instance, 'name', None))
+        batch_size = attrs.get(
+            'batch_size', getattr(self.instance, 'batch_size', 0))
+        if batch_size and name:
+            service = RestService(name=name)
+            try:
+                accepts_batches = \
+                    service.get_service_definition().accepts_batches
+            except ImportError:
+                accepts_batches = False
+            if not accepts_batches:
+                raise serializers.ValidationError({
+                    'batch_size': _(u"%s does not accept batches." % name)})
+
+        return attrs
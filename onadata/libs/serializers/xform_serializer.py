@@ -20,6 +20,8 @@ from rest_framework.reverse import reverse
 from onadata.apps.logger.models import DataView, Instance, XForm
 from onadata.apps.main.models.meta_data import MetaData
 from onadata.apps.logger.models import XFormVersion
+from onadata.apps.logger.models.submission_count import (
+    get_pending_submission_counts, submission_count_deltas_enabled)
 from onadata.libs.exceptions import EnketoError
 from onadata.libs.permissions import get_role, is_organization
 from onadata.libs.serializers.dataview_serializer import \
@@ -250,6 +252,23 @@ class XFormMixin(object):
             return data_views
         return []
 
+    def _get_pending_submission_counts(self):
+        """
+        Returns the pending submission counts of the forms of a list, loaded
+        once for all the forms, None for a single form.
+        """
+        if not submission_count_deltas_enabled() or \
+                not isinstance(self.parent, serializers.ListSerializer):
+            return None
+
+        counts = self.context.get('pending_submission_counts')
+        if counts is None:
+            counts = self.context['pending_submission_counts'] = \
+                get_pending_submission_counts(
+                    [xform.pk for xform in self.parent.instance])
+
+        return counts
+
     def get_num_of_submissions(self, obj):
         if obj:
             key = '{}{}'.format(XFORM_COUNT, obj.pk)
@@ -258,7 +277,8 @@ class XFormMixin(object):
                 return count
 
             force_update = True if obj.is_merged_dataset else False
-            count = obj.submission_count(force_update)
+            count = obj.submission_count(
+                force_update, self._get_pending_submission_counts())
 
             cache.set(key, count)
             return count
@@ -1,5 +1,7 @@
 import unittest
 
+import numpy as np
+
 from onadata.libs.data import statistics as stats
 
 
@@ -13,3 +15,26 @@ class TestStatistics(unittest.TestCase):
         values = [1, 2, 3, 2, 5, 5]
         result = stats.get_median(values)
         self.assertEqual(result, 2.5)
+
+    def test_get_mode(self):
+        values = [1, 2, 3, 2, 5, 5]
+        mode, count = stats.get_mode(values)
+        self.assertEqual(mode, 2)
+        self.assertEqual(count, 2)
+
+        mode, count = stats.get_mode([[1, 2], [1, 3], [4, 3]])
+        self.assertEqual(mode.tolist(), [[1, 3]])
+        self.assertEqual(count.tolist(), [[2, 2]])
+
+    def test_get_stats(self):
+        values = np.array([1, 2, 3, 2, 5, 5], dtype=float)
+        self.assertEqual(stats.get_stats(values), {
+            'mean': 3,
+            'median': 2.5,
+            'mode': 2,
+            'max': 5,
+            'min': 1,
+            'range': 4
+        })
+        self.assertEqual(stats.get_stats(values, ['median']),
+                         {'median': 2.5})
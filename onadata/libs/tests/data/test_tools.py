@@ -6,8 +6,9 @@ from mock import patch
 
 from onadata.apps.logger.models.instance import Instance
 from onadata.apps.main.tests.test_base import TestBase
+from onadata.libs.data import query
 from onadata.libs.data.query import get_form_submissions_grouped_by_field,\
-    get_date_fields, get_field_records
+    get_date_fields, get_field_records, get_fields_records
 
 
 class TestTools(TestBase):
@@ -167,6 +168,39 @@ class TestTools(TestBase):
                   is None][0]
         self.assertEqual(result['count'], 1)
 
+    def test_get_form_submissions_grouped_by_field_cache(self):
+        """
+        Test aggregates are cached until the submissions change and updated
+        with the new submissions when submissions are only added.
+        """
+        self._make_submissions()
+        field = '_submission_time'
+        count = self.xform.instances.count()
+
+        result = get_form_submissions_grouped_by_field(self.xform, field)
+        self.assertEqual(result[0]['count'], count)
+
+        with patch('onadata.libs.data.query._execute_query',
+                   wraps=query._execute_query) as mock_execute_query:
+            result = get_form_submissions_grouped_by_field(self.xform, field)
+            self.assertEqual(result[0]['count'], count)
+            self.assertFalse(mock_execute_query.called)
+
+            path = os.path.join(
+                self.this_directory, 'fixtures', 'transportation',
+                'instances', 'transport_no_response',
+                'transport_no_response.xml')
+            self._make_submission(path, self.user.username)
+            result = get_form_submissions_grouped_by_field(self.xform, field)
+            self.assertEqual(result[0]['count'], count + 1)
+            # only the new submission is aggregated
+            self.assertIn(' AND id > ', mock_execute_query.call_args[0][0])
+
+            self.xform.instances.first().set_deleted()
+            result = get_form_submissions_grouped_by_field(self.xform, field)
+            self.assertEqual(result[0]['count'], count)
+            self.assertNotIn(' AND id > ', mock_execute_query.call_args[0][0])
+
     def test_get_date_fields_includes_start_end(self):
         path = os.path.join(
             os.path.dirname(__file__), "fixtures", "tutorial", "tutorial.xls")
@@ -191,3 +225,19 @@ class TestTools(TestBase):
         field = 'age'
         records = get_field_records(field, self.xform)
         self.assertEqual(sorted(records), sorted([23, 23, 35]))
+
+    def test_get_fields_records(self):
+        submissions = ['1', '2', '3', 'no_age']
+        path = os.path.join(
+            os.path.dirname(__file__), "fixtures", "tutorial", "tutorial.xls")
+        self._publish_xls_file_and_set_xform(path)
+
+        for i in submissions:
+            self._make_submission(os.path.join(
+                'onadata', 'apps', 'api', 'tests', 'fixtures', 'forms',
+                'tutorial', 'instances', '{}.xml'.format(i)))
+
+        age, net_worth = get_fields_records(
+            ['age', 'net_worth'], self.xform)
+        self.assertEqual(sorted(age), ['23', '23', '35'])
+        self.assertEqual(len(net_worth), 4)
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""
+Test bulk submission import module.
+"""
+import os
+
+from onadata.apps.logger.models import Instance, XForm
+from onadata.apps.main.tests.test_base import TestBase
+from onadata.libs.utils.bulk_import import (BulkSubmission,
+                                            bulk_create_instances)
+from onadata.libs.utils.common_tags import (DATE_MODIFIED, ID,
+                                            MONGO_STRFTIME, SUBMISSION_TIME,
+                                            SUBMITTED_BY)
+
+
+class TestBulkImport(TestBase):
+    """
+    Test bulk_create_instances.
+    """
+
+    def _get_transport_submissions(self):
+        submissions = []
+        for survey in self.surveys:
+            path = os.path.join(
+                self.this_directory, 'fixtures', 'transportation',
+                'instances', survey, survey + '.xml')
+            with open(path, 'rb') as xml_file:
+                submissions.append(xml_file.read())
+
+        return submissions
+
+    def test_bulk_create_instances(self):
+        """
+        Test submissions are imported in batches and duplicates are not
+        imported.
+        """
+        self._publish_transportation_form()
+        submissions = self._get_transport_submissions()
+        # a duplicate of a submission in the same batch
+        submissions.append(submissions[0])
+
+        results = bulk_create_instances(
+            self.xform, submissions[:2] + [BulkSubmission(
+                submissions[2], submitted_by=self.user)] + submissions[3:],
+            status='imported_via_csv', batch_size=3)
+
+        self.assertEqual(len(results), 5)
+        self.assertEqual([error for (error, instance) in results[:4]],
+                         [None] * 4)
+        self.assertEqual(results[4][0].status_code, 202)
+        self.assertIsNone(results[4][1])
+
+        instances = Instance.objects.filter(xform=self.xform).order_by('pk')
+        self.assertEqual(instances.count(), 4)
+        for instance in instances:
+            self.assertEqual(instance.json[ID], instance.pk)
+            self.assertEqual(instance.status, 'imported_via_csv')
+            self.assertTrue(instance.uuid)
+            self.assertIsNotNone(instance.parsed_instance)
+            self.assertEqual(instance.json[SUBMISSION_TIME],
+                             instance.date_created.strftime(MONGO_STRFTIME))
+            self.assertEqual(instance.json[DATE_MODIFIED],
+                             instance.date_modified.strftime(MONGO_STRFTIME))
+        self.assertEqual(instances[2].user, self.user)
+        self.assertEqual(instances[2].json[SUBMITTED_BY], self.user.username)
+
+        xform = XForm.objects.get(pk=self.xform.pk)
+        self.assertEqual(xform.num_of_submissions, 4)
+
+        # submissions that have already been received are duplicates
+        results = bulk_create_instances(self.xform, submissions[:1])
+        self.assertEqual(results[0][0].status_code, 202)
+        self.assertEqual(
+            Instance.objects.filter(xform=self.xform).count(), 4)
@@ -116,6 +116,33 @@ class TestCSVDataFrameBuilder(TestBase):
             self._test_csv_files(csv_file, csv_fixture_path)
         os.unlink(temp_file.name)
 
+    def test_csv_dataframe_export_to_reads_records_once(self):
+        """
+        Test CSVDataFrameBuilder.export_to() reads the records in one pass.
+        """
+        self._publish_nested_repeats_form()
+        self._submit_fixture_instance(
+            "nested_repeats", "01", submission_time=self._submission_time)
+        self._submit_fixture_instance(
+            "nested_repeats", "02", submission_time=self._submission_time)
+
+        csv_df_builder = CSVDataFrameBuilder(
+            self.user.username, self.xform.id_string, include_images=False)
+        # pylint: disable=protected-access
+        records = list(csv_df_builder._query_data())
+        temp_file = NamedTemporaryFile(suffix=".csv", delete=False)
+        # an iterator can only be consumed once
+        with patch.object(CSVDataFrameBuilder, '_query_data',
+                          return_value=iter(records)):
+            csv_df_builder.export_to(temp_file.name)
+        csv_fixture_path = os.path.join(
+            os.path.dirname(os.path.abspath(__file__)), "fixtures",
+            "nested_repeats", "nested_repeats.csv")
+        temp_file.close()
+        with open(temp_file.name) as csv_file:
+            self._test_csv_files(csv_file, csv_fixture_path)
+        os.unlink(temp_file.name)
+
     # pylint: disable=invalid-name
     def test_csv_columns_for_gps_within_groups(self):
         """
@@ -55,39 +55,38 @@ class CSVImportTestCase(TestBase):
         resp = csv_import.submit_csv('userX', XForm(), 123456)
         self.assertIsNotNone(resp.get('error'))
 
-    @mock.patch('onadata.libs.utils.csv_import.safe_create_instance')
-    def test_submit_csv_xml_params(self, safe_create_instance):
+    @mock.patch('onadata.libs.utils.csv_import.bulk_create_instances')
+    def test_submit_csv_xml_params(self, bulk_create_instances):
         self._publish_xls_file(self.xls_file_path)
         self.xform = XForm.objects.get()
 
-        safe_create_instance.return_value = {}
+        bulk_create_instances.return_value = []
         single_csv = open(os.path.join(self.fixtures_dir, 'single.csv'), 'rb')
         csv_import.submit_csv(self.user.username, self.xform, single_csv)
         xml_file_param = BytesIO(
             open(os.path.join(self.fixtures_dir, 'single.xml'), 'rb').read())
-        safe_create_args = list(safe_create_instance.call_args[0])
+        bulk_create_args = list(bulk_create_instances.call_args[0])
 
-        self.assertEqual(safe_create_args[0], self.user.username,
-                         'Wrong username passed')
+        self.assertEqual(bulk_create_args[0], self.xform,
+                         'Wrong xform passed')
+        self.assertEqual(len(bulk_create_args[1]), 1)
+        submission = bulk_create_args[1][0]
         self.assertEqual(
-            strip_xml_uuid(safe_create_args[1].getvalue()),
+            strip_xml_uuid(submission.data),
             strip_xml_uuid(xml_file_param.getvalue()),
             'Wrong xml param passed')
-        self.assertEqual(safe_create_args[2], [],
+        self.assertEqual(submission.media_files, None,
                          'Wrong media array param passed')
-        self.assertEqual(safe_create_args[3], self.xform.uuid,
-                         'Wrong xform uuid passed')
-        self.assertEqual(safe_create_args[4], None)
+        self.assertEqual(
+            bulk_create_instances.call_args[1]['status'], 'imported_via_csv')
 
-    @mock.patch('onadata.libs.utils.csv_import.safe_create_instance')
+    @mock.patch('onadata.libs.utils.csv_import.bulk_create_instances')
     @mock.patch('onadata.libs.utils.csv_import.dict2xmlsubmission')
     def test_submit_csv_xml_location_property_test(self, d2x,
-                                                   safe_create_instance):
+                                                   bulk_create_instances):
         self._publish_xls_file(self.xls_file_path)
         self.xform = XForm.objects.get()
-        safe_create_instance.return_value = [
-            None,
-        ]
+        bulk_create_instances.return_value = []
         single_csv = open(os.path.join(self.fixtures_dir, 'single.csv'), 'rb')
         csv_import.submit_csv(self.user.username, self.xform, single_csv)
 
@@ -126,9 +125,9 @@ class CSVImportTestCase(TestBase):
 
         # Test rollback on error and user feedback
         with patch(
-            'onadata.libs.utils.csv_import.safe_create_instance'
-                ) as safe_create_mock:
-            safe_create_mock.side_effect = [AttributeError]
+            'onadata.libs.utils.csv_import.bulk_create_instances'
+                ) as bulk_create_mock:
+            bulk_create_mock.side_effect = [AttributeError]
             initial_count = self.xform.num_of_submissions
             resp = csv_import.submit_csv(
                 self.user.username, self.xform, self.good_csv)
@@ -367,19 +366,19 @@ class CSVImportTestCase(TestBase):
         self.assertEqual(
             g_csv_reader.fieldnames[10], c_csv_reader.fieldnames[10])
 
-    @mock.patch('onadata.libs.utils.csv_import.safe_create_instance')
-    def test_submit_csv_instance_id_consistency(self, safe_create_instance):
+    @mock.patch('onadata.libs.utils.csv_import.bulk_create_instances')
+    def test_submit_csv_instance_id_consistency(self, bulk_create_instances):
         self._publish_xls_file(self.xls_file_path)
         self.xform = XForm.objects.get()
 
-        safe_create_instance.return_value = {}
+        bulk_create_instances.return_value = []
         single_csv = open(os.path.join(self.fixtures_dir, 'single.csv'), 'rb')
         csv_import.submit_csv(self.user.username, self.xform, single_csv)
         xml_file_param = BytesIO(
             open(os.path.join(self.fixtures_dir, 'single.xml'), 'rb').read())
-        safe_create_args = list(safe_create_instance.call_args[0])
+        bulk_create_args = list(bulk_create_instances.call_args[0])
 
-        instance_xml = fromstring(safe_create_args[1].getvalue())
+        instance_xml = fromstring(bulk_create_args[1][0].data)
         single_instance_xml = fromstring(xml_file_param.getvalue())
 
         instance_id = [
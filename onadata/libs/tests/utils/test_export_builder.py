@@ -7,6 +7,7 @@ from __future__ import unicode_literals
 import csv
 import datetime
 import os
+import re
 import shutil
 import tempfile
 import zipfile
@@ -15,9 +16,13 @@ from collections import OrderedDict
 from ctypes import ArgumentError
 from io import BytesIO
 
+import pyarrow
+import pyarrow.ipc
+import pyarrow.parquet
 import xlrd
 from django.conf import settings
 from django.core.files.temp import NamedTemporaryFile
+from django.test.utils import override_settings
 from openpyxl import load_workbook
 from past.builtins import basestring
 from pyxform.builder import create_survey_from_xls
@@ -537,6 +542,83 @@ class TestExportBuilder(TestBase):
             self.assertEqual(data['children.info/fav_colors/pink\'s'], 'False')
             # check that red and blue are set to true
 
+    def test_zipped_parquet_and_arrow_exports(self):
+        md = """
+        | survey |
+        |        | type         | name     | label    |
+        |        | integer      | age      | Age      |
+        |        | decimal      | amount   | Amount   |
+        |        | date         | visited  | Visited  |
+        |        | geopoint     | location | Location |
+        |        | begin repeat | children | Children |
+        |        | text         | name     | Name     |
+        |        | integer      | age      | Age      |
+        |        | end repeat   |          |          |
+        """
+        survey = self.md_to_pyxform_survey(md, {'name': 'exp'})
+        data = [{
+            'age': '35', 'amount': '1.5', 'visited': '2013-01-03',
+            'location': '-1.2 36.8 1700 10', '_id': 1,
+            '_submission_time': '2016-11-21T03:43:43',
+            'children': [
+                {'children/name': 'Mike', 'children/age': '5'},
+                {'children/name': 'John', 'children/age': 'two'}]}]
+        export_builder = ExportBuilder()
+        # a row group per row
+        export_builder.COLUMNAR_BATCH_SIZE = 1
+        export_builder.set_survey(survey)
+
+        temp_dir = tempfile.mkdtemp()
+        temp_zip_file = NamedTemporaryFile(suffix='.zip')
+        export_builder.to_zipped_parquet(temp_zip_file.name, data)
+        with zipfile.ZipFile(temp_zip_file.name, 'r') as zip_file:
+            self.assertEqual(sorted(zip_file.namelist()),
+                             ['children.parquet', 'exp.parquet'])
+            zip_file.extractall(temp_dir)
+        temp_zip_file.close()
+
+        table = pyarrow.parquet.read_table(
+            os.path.join(temp_dir, 'exp.parquet'))
+        self.assertEqual(table.schema.field('age').type, pyarrow.int64())
+        self.assertEqual(table.schema.field('amount').type, pyarrow.float64())
+        self.assertEqual(table.schema.field('visited').type, pyarrow.date32())
+        self.assertEqual(table.schema.field('_location_latitude').type,
+                         pyarrow.float64())
+        self.assertEqual(table.schema.field('_submission_time').type,
+                         pyarrow.timestamp('us'))
+        row = table.to_pydict()
+        self.assertEqual(row['age'], [35])
+        self.assertEqual(row['amount'], [1.5])
+        self.assertEqual(row['visited'], [datetime.date(2013, 1, 3)])
+        self.assertEqual(row['location'], ['-1.2 36.8 1700 10'])
+        self.assertEqual(row['_location_latitude'], [-1.2])
+        self.assertEqual(row['_submission_time'],
+                         [datetime.datetime(2016, 11, 21, 3, 43, 43)])
+
+        children_file = pyarrow.parquet.ParquetFile(
+            os.path.join(temp_dir, 'children.parquet'))
+        self.assertEqual(children_file.num_row_groups, 2)
+        children = children_file.read().to_pydict()
+        self.assertEqual(children['children/name'], ['Mike', 'John'])
+        # values that are not integers are null
+        self.assertEqual(children['children/age'], [5, None])
+        self.assertEqual(children['_parent_index'], [1, 1])
+
+        temp_zip_file = NamedTemporaryFile(suffix='.zip')
+        export_builder.to_zipped_arrow(temp_zip_file.name, data)
+        with zipfile.ZipFile(temp_zip_file.name, 'r') as zip_file:
+            self.assertEqual(sorted(zip_file.namelist()),
+                             ['children.arrow', 'exp.arrow'])
+            zip_file.extractall(temp_dir)
+        temp_zip_file.close()
+
+        children = pyarrow.ipc.open_file(
+            os.path.join(temp_dir, 'children.arrow')).read_all()
+        self.assertEqual(children.schema.field('children/age').type,
+                         pyarrow.int64())
+        self.assertEqual(children.to_pydict()['children/age'], [5, None])
+        shutil.rmtree(temp_dir)
+
     def test_zipped_sav_export_with_date_field(self):
         md = """
         | survey |
@@ -1555,6 +1637,31 @@ class TestExportBuilder(TestBase):
 
         xls_file.close()
 
+    @override_settings(XLS_EXPORT_MAX_ROWS_PER_SHEET=2)
+    def test_to_xls_export_splits_sheets_by_max_rows(self):
+        survey = self._create_childrens_survey()
+        export_builder = ExportBuilder()
+        export_builder.set_survey(survey)
+        xls_file = NamedTemporaryFile(suffix='.xlsx')
+        filename = xls_file.name
+        export_builder.to_xls_export(filename, self.data)
+        xls_file.seek(0)
+        wb = load_workbook(filename)
+
+        # each sheet has the header row and a single record
+        main_sheets = [
+            name for name in wb.sheetnames
+            if name.startswith('childrens_survey')]
+        self.assertEqual(len(main_sheets), len(self.data))
+        self.assertEqual(main_sheets[0], 'childrens_survey')
+        for name in wb.sheetnames:
+            self.assertLessEqual(wb[name].max_row, 2)
+            self.assertEqual(
+                [c.value for c in wb[name][1]],
+                [c.value for c in wb[re.sub(r'_\d+$', '', name)][1]])
+
+        xls_file.close()
+
     def test_to_xls_export_respects_custom_field_delimiter(self):
         survey = self._create_childrens_survey()
         export_builder = ExportBuilder()
@@ -26,6 +26,7 @@ from onadata.apps.main.tests.test_base import TestBase
 from onadata.apps.viewer.models.export import Export
 from onadata.apps.viewer.models.parsed_instance import query_data
 from onadata.apps.api.viewsets.data_viewset import DataViewSet
+from onadata.libs.serializers.export_serializer import ExportSerializer
 from onadata.libs.serializers.merged_xform_serializer import \
     MergedXFormSerializer
 from onadata.libs.utils.export_builder import (encode_if_str,
@@ -33,8 +34,8 @@ from onadata.libs.utils.export_builder import (encode_if_str,
 from onadata.libs.utils.export_tools import (
     ExportBuilder, check_pending_export, generate_attachments_zip_export,
     generate_export, generate_kml_export, generate_osm_export,
-    get_repeat_index_tags, kml_export_data, parse_request_export_options,
-    should_create_new_export, str_to_bool)
+    get_incremental_export_base, get_repeat_index_tags, kml_export_data,
+    parse_request_export_options, should_create_new_export, str_to_bool)
 
 
 def _logger_fixture_path(*args):
@@ -789,3 +790,46 @@ class TestExportTools(TestBase):
             self.assertTrue(
                 os.path.exists(os.path.join(temp_dir, a.media_file.name)))
         shutil.rmtree(temp_dir)
+
+    @override_settings(ENABLE_INCREMENTAL_EXPORTS=True)
+    def test_generate_incremental_csv_export(self):
+        """
+        Test generate_export appends new submissions to the previous CSV
+        export and regenerates it when a submission is edited.
+        """
+        self._publish_transportation_form()
+        self._submit_transport_instance(survey_at=0)
+        options = {"extension": "csv"}
+
+        export = generate_export(Export.CSV_EXPORT, self.xform, None, options)
+        self.assertTrue(export.is_successful)
+        state = export.options['incremental']
+        self.assertEqual(state['count'], 1)
+        self.assertEqual(
+            state['last_instance_id'], self.xform.instances.last().id)
+
+        self._submit_transport_instance(survey_at=1)
+        export = generate_export(Export.CSV_EXPORT, self.xform, None, options)
+        self.assertTrue(export.is_successful)
+        self.assertEqual(export.options['incremental']['count'], 2)
+
+        with default_storage.open(export.filepath) as csv_file:
+            incremental_rows = csv_file.read().decode('utf-8').splitlines()
+
+        with override_settings(ENABLE_INCREMENTAL_EXPORTS=False):
+            full_export = generate_export(
+                Export.CSV_EXPORT, self.xform, None, options)
+        with default_storage.open(full_export.filepath) as csv_file:
+            full_rows = csv_file.read().decode('utf-8').splitlines()
+
+        self.assertEqual(incremental_rows, full_rows)
+        self.assertNotIn(
+            'incremental', ExportSerializer(
+                full_export, context={'request': None}).data['options'])
+
+        # an edited submission requires the export to be regenerated
+        instance = self.xform.instances.first()
+        instance.save()
+        export_base = get_incremental_export_base(
+            self.xform, Export.CSV_EXPORT, options)
+        self.assertIsNone(export_base)
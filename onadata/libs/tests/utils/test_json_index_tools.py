@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""
+Test submission JSON index tools.
+"""
+from django.db import connection
+from django.test.utils import override_settings
+
+from onadata.apps.main.models import MetaData
+from onadata.apps.main.tests.test_base import TestBase
+from onadata.libs.utils.json_index_tools import (get_indexed_fields,
+                                                 get_json_index_name,
+                                                 get_query_fields,
+                                                 record_query_fields)
+
+FIELD = 'transport/available_transportation_types_to_referral_facility'
+
+
+class TestJsonIndexTools(TestBase):
+    """
+    Test json_index_tools module.
+    """
+
+    def _index_exists(self, xform_id, field):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT COUNT(*) FROM pg_indexes WHERE indexname = %s",
+                [get_json_index_name(xform_id, field)])
+
+            return cursor.fetchone()[0] == 1
+
+    def test_get_query_fields(self):
+        """
+        Test the fields of a query= filter are returned.
+        """
+        self.assertEqual(get_query_fields('{"a": "1", "b": {"$gt": 2}}'),
+                         ['a', 'b'])
+        self.assertEqual(
+            get_query_fields(
+                {'$or': [{'a': '1'}, {'c': '2'}], '_id': 1, 'a': '3'}),
+            ['a', 'c'])
+        self.assertEqual(get_query_fields([{'a': 1}, '{"b": 2}']),
+                         ['a', 'b'])
+        self.assertEqual(get_query_fields('ambulance'), [])
+
+    def test_indexed_field_index(self):
+        """
+        Test an index is created for an indexed field and dropped when the
+        field is no longer indexed.
+        """
+        self._publish_transportation_form()
+        metadata = MetaData.indexed_field(self.xform, FIELD)
+
+        self.assertEqual(get_indexed_fields(self.xform), [FIELD])
+        self.assertTrue(self._index_exists(self.xform.pk, FIELD))
+
+        metadata.delete()
+        self.assertEqual(get_indexed_fields(self.xform), [])
+        self.assertFalse(self._index_exists(self.xform.pk, FIELD))
+
+    @override_settings(JSON_INDEX_AUTO_THRESHOLD=2)
+    def test_record_query_fields(self):
+        """
+        Test fields are indexed once they have been queried
+        JSON_INDEX_AUTO_THRESHOLD times.
+        """
+        self._publish_transportation_form()
+        query = {FIELD: 'ambulance', 'not_a_field': 'ambulance'}
+
+        record_query_fields(self.xform, query)
+        self.assertEqual(get_indexed_fields(self.xform), [])
+
+        record_query_fields(self.xform, query)
+        self.assertEqual(get_indexed_fields(self.xform), [FIELD])
+        self.assertTrue(self._index_exists(self.xform.pk, FIELD))
+
+    @override_settings(JSON_INDEX_AUTO_THRESHOLD=1,
+                       JSON_INDEX_AUTO_MAX_INDEXES=0)
+    def test_record_query_fields_max_indexes(self):
+        """
+        Test fields are not indexed automatically once there are
+        JSON_INDEX_AUTO_MAX_INDEXES indexed fields.
+        """
+        self._publish_transportation_form()
+
+        record_query_fields(self.xform, {FIELD: 'ambulance'})
+        self.assertEqual(get_indexed_fields(self.xform), [])
+        self.assertFalse(self._index_exists(self.xform.pk, FIELD))
@@ -3,7 +3,9 @@ import re
 from io import BytesIO
 
 from django.conf import settings
+from django.db import connection
 from django.http.request import HttpRequest
+from django.test.utils import CaptureQueriesContext
 from mock import patch
 
 from pyxform.tests_v1.pyxform_test_case import PyxformTestCase
@@ -116,6 +118,55 @@ class TestLoggerTools(PyxformTestCase, TestBase):
         self.assertEquals(instance3.json[MEDIA_ALL_RECEIVED],
                           instance3.media_all_received)
 
+    def test_submission_saved_with_single_insert(self):
+        """
+        Test a new submission and its attachments are saved with an insert
+        each, the json of the submission includes the attachments.
+        """
+        md = """
+        | survey |       |        |       |
+        |        | type  | name   | label |
+        |        | image | image1 | Photo |
+        """
+        self._create_user_and_login()
+        self.xform = self._publish_markdown(md, self.user)
+
+        xml_string = """
+        <data id="{}">
+            <meta>
+                <instanceID>uuid:UJ5jSMAJ1Jz4EszdgHy8n851AsKaqBPO5</instanceID>
+            </meta>
+            <image1>1300221157303.jpg</image1>
+        </data>
+        """.format(self.xform.id_string)
+        file_path = "{}/apps/logger/tests/Health_2011_03_13."\
+                    "xml_2011-03-15_20-30-28/1300221157303"\
+                    ".jpg".format(settings.PROJECT_ROOT)
+        media_file = django_file(
+            path=file_path, field_name="image1", content_type="image/jpeg")
+
+        with CaptureQueriesContext(connection) as context:
+            instance = create_instance(
+                self.user.username,
+                BytesIO(xml_string.strip().encode('utf-8')),
+                media_files=[media_file])
+
+        queries = [query['sql'] for query in context.captured_queries]
+        self.assertEqual(
+            len([q for q in queries
+                 if q.startswith('INSERT INTO "logger_instance"')]), 1)
+        self.assertEqual(
+            len([q for q in queries
+                 if q.startswith('INSERT INTO "logger_attachment"')]), 1)
+        instance = Instance.objects.get(pk=instance.pk)
+        self.assertEqual(instance.json['_id'], instance.pk)
+        self.assertEqual(
+            [a['name'] for a in instance.json['_attachments']],
+            ['1300221157303.jpg'])
+        self.assertTrue(instance.json[MEDIA_ALL_RECEIVED])
+        self.assertEqual(instance.media_count, 1)
+        self.assertTrue(instance.parsed_instance)
+
     def test_attachment_tracking_for_repeats(self):
         """
         Test that when a submission with many attachments is made,
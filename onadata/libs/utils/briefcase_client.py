@@ -16,8 +16,11 @@ import requests
 from requests.auth import HTTPDigestAuth
 
 from onadata.apps.logger.xform_instance_parser import clean_and_parse_xml
+from onadata.libs.utils.bulk_import import (BulkSubmission,
+                                            bulk_create_instances)
 from onadata.libs.utils.common_tools import retry
-from onadata.libs.utils.logger_tools import (PublishXForm, create_instance,
+from onadata.libs.utils.logger_tools import (PublishXForm,
+                                             get_xform_from_submission,
                                              publish_form)
 
 NUM_RETRIES = 3
@@ -252,14 +255,13 @@ class BriefcaseClient(object):
 
         return publish_form(k.publish_xform)
 
-    def _upload_instance(self, xml_file, instance_dir_path, files):
+    def _get_instance_submission(self, xml_file, instance_dir_path, files):
         xml_doc = clean_and_parse_xml(xml_file.read())
         xml = StringIO()
         de_node = xml_doc.documentElement
         for node in de_node.firstChild.childNodes:
             xml.write(node.toxml())
-        new_xml_file = ContentFile(xml.getvalue().encode('utf-8'))
-        new_xml_file.content_type = 'text/xml'
+        new_xml = xml.getvalue().encode('utf-8')
         xml.close()
         attachments = []
 
@@ -273,10 +275,10 @@ class BriefcaseClient(object):
                 media_obj = django_file(file_obj, 'media_files[]', mimetype)
                 attachments.append(media_obj)
 
-        create_instance(self.user.username, new_xml_file, attachments)
+        return BulkSubmission(new_xml, attachments)
 
     def _upload_instances(self, path):
-        instances_count = 0
+        submissions = []
         dirs, not_in_use = default_storage.listdir(path)
 
         for instance_dir in dirs:
@@ -291,17 +293,31 @@ class BriefcaseClient(object):
 
             if xml_file:
                 try:
-                    self._upload_instance(xml_file, instance_dir_path, files)
+                    submissions.append(self._get_instance_submission(
+                        xml_file, instance_dir_path, files))
                 except ExpatError:
                     continue
                 except Exception as e:
                     logging.exception(_(
                         u'Ignoring exception, processing XML submission '
                         'raised exception: %s' % str(e)))
-                else:
-                    instances_count += 1
 
-        return instances_count
+        if not submissions:
+            return 0
+
+        # the submissions in an instances directory are for the same form
+        try:
+            xform = get_xform_from_submission(
+                submissions[0].data, self.user.username)
+        except Exception as e:
+            logging.exception(_(
+                u'Ignoring exception, processing XML submission '
+                'raised exception: %s' % str(e)))
+            return 0
+
+        results = bulk_create_instances(xform, submissions)
+
+        return len([instance for (error, instance) in results if instance])
 
     def push(self):
         dirs, files = default_storage.listdir(self.forms_path)
@@ -0,0 +1,294 @@
+# -*- coding: utf-8 -*-
+"""
+Bulk submission import module.
+
+Imports many submissions to one XForm in batches. The duplicates in a batch
+are found with one query, the instances, attachments and parsed instances
+of a batch are created with one insert each, and the submission counts,
+caches, notifications and webhooks are processed once per batch.
+"""
+from collections import namedtuple
+from hashlib import sha256
+from io import BytesIO
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q, prefetch_related_objects
+from django.utils import timezone
+
+from onadata.apps.logger.models import Instance, SurveyType
+from onadata.apps.logger.models.instance import (
+    InstanceHistory, get_id_string_from_xml_str, process_submissions)
+from onadata.apps.logger.xform_instance_parser import (
+    get_deprecated_uuid_from_xml, get_submission_date_from_xml,
+    get_uuid_from_xml)
+from onadata.apps.messaging.constants import XFORM, SUBMISSION_CREATED
+from onadata.apps.messaging.serializers import send_message
+from onadata.apps.viewer.models.parsed_instance import ParsedInstance
+from onadata.apps.viewer.signals import process_submission
+from onadata.libs.utils.cache_tools import reset_xform_data_version
+from onadata.libs.utils.common_tags import VERSION
+from onadata.libs.utils.logger_tools import (
+    check_submission_encryption, dict2xform,
+    get_duplicate_submission_response, safe_create_instance,
+    save_attachments)
+
+BULK_IMPORT_BATCH_SIZE = 1000
+
+# pylint: disable=invalid-name
+BulkSubmission = namedtuple(
+    'BulkSubmission', ['data', 'media_files', 'submitted_by'])
+BulkSubmission.__new__.__defaults__ = (None, None)
+
+
+def _get_submission(xform, submission):
+    if not isinstance(submission, BulkSubmission):
+        submission = BulkSubmission(submission)
+    data = submission.data
+    if isinstance(data, dict):
+        data = dict(data)
+        data = dict2xform(
+            data, xform.id_string, root=xform.survey.name,
+            gen_uuid=not (data.get('meta') or {}).get('instanceID'))
+    if not isinstance(data, bytes):
+        data = data.encode('utf-8')
+
+    return submission._replace(
+        data=data, media_files=submission.media_files or [])
+
+
+def _create_instance(xform, submission, status):
+    """
+    Saves a submission through the submission API path, returns the
+    [error, instance] pair of safe_create_instance.
+    """
+    error, instance = safe_create_instance(
+        xform.user.username, BytesIO(submission.data),
+        submission.media_files, xform.uuid, None, instance_status=status)
+    if instance and submission.submitted_by:
+        instance.user = submission.submitted_by
+        instance.save()
+
+    return [error, instance]
+
+
+def _prepare_submissions(xform, submissions):
+    """
+    Returns the submissions of a batch that can be inserted in bulk as
+    (index, submission, checksum, uuid) tuples and the indices of those that
+    have to be saved one by one, e.g. edits and invalid submissions.
+    """
+    prepared = []
+    single = []
+    for index, submission in enumerate(submissions):
+        xml = submission.data
+        try:
+            check_submission_encryption(xform, xml)
+            if get_deprecated_uuid_from_xml(xml) or \
+                    get_id_string_from_xml_str(xml) != xform.id_string:
+                single.append(index)
+                continue
+            new_uuid = get_uuid_from_xml(xml)
+        except Exception:  # pylint: disable=broad-except
+            # the submission API path returns the error
+            single.append(index)
+        else:
+            prepared.append(
+                (index, submission, sha256(xml).hexdigest(), new_uuid))
+
+    return prepared, single
+
+
+def _find_duplicates(xform, prepared):
+    """
+    Returns the indices of the submissions that have already been received,
+    with one query for submissions and one for their edits.
+    """
+    checksums = set(checksum for (_i, _s, checksum, _u) in prepared)
+    uuids = set(uuid for (_i, _s, _c, uuid) in prepared if uuid)
+    existing_checksums = set()
+    existing_uuids = set()
+    for checksum, uuid in Instance.objects.filter(
+            Q(checksum__in=checksums) | Q(uuid__in=uuids),
+            xform_id=xform.pk).values_list('checksum', 'uuid'):
+        existing_checksums.add(checksum)
+        existing_uuids.add(uuid)
+    history_uuids = set(InstanceHistory.objects.filter(
+        xform_instance__xform_id=xform.pk,
+        xform_instance__deleted_at__isnull=True,
+        uuid__in=uuids).values_list('uuid', flat=True))
+
+    duplicates = set()
+    for index, _submission, checksum, uuid in prepared:
+        if (uuid and (uuid in existing_uuids or uuid in history_uuids)) or (
+                checksum in existing_checksums and
+                (uuid or xform.has_start_time)):
+            duplicates.add(index)
+        # a submission repeated in the same batch
+        existing_checksums.add(checksum)
+        if uuid:
+            existing_uuids.add(uuid)
+
+    return duplicates
+
+
+def _build_instances(xform, prepared, ids, status):
+    survey_types = {}
+    now = timezone.now()
+    instances = []
+    for (_index, submission, checksum, _uuid), pk in zip(prepared, ids):
+        instance = Instance(
+            id=pk, xml=submission.data.decode('utf-8'),
+            user=submission.submitted_by, status=status, xform=xform,
+            checksum=checksum)
+        instance._check_is_merged_dataset()
+        instance._check_active(False)
+
+        date_created = get_submission_date_from_xml(submission.data)
+        if date_created and not timezone.is_aware(date_created):
+            date_created = timezone.make_aware(date_created, timezone.utc)
+        instance.date_created = date_created or now
+        instance.date_modified = now
+
+        root_node_name = instance.get_root_node_name()
+        if root_node_name not in survey_types:
+            survey_types[root_node_name], _created = \
+                SurveyType.objects.get_or_create(slug=root_node_name)
+        instance.survey_type = survey_types[root_node_name]
+        instance._set_geom()
+        instance._set_uuid()
+
+        if submission.media_files:
+            # the attachments are inserted before the submission they
+            # reference, the foreign key constraint is checked on commit
+            save_attachments(
+                xform, instance, submission.media_files, save=False)
+        else:
+            instance.total_media = instance.num_of_media
+            instance.media_count = 0
+            instance.media_all_received = instance.total_media == 0
+        instances.append(instance)
+
+    prefetch_related_objects(instances, 'attachments')
+    for instance in instances:
+        instance._set_json()
+        instance.version = instance.json.get(VERSION, xform.version)
+
+    return instances
+
+
+def _insert_instances(instances):
+    """
+    Inserts the instances of a batch and their parsed instances.
+
+    date_created and date_modified are set to the insert time by bulk_create,
+    they are set back to the dates in the json with one update.
+    """
+    dates = [(i.date_created, i.date_modified) for i in instances]
+    Instance.objects.bulk_create(instances)
+
+    params = []
+    for instance, (date_created, date_modified) in zip(instances, dates):
+        instance.date_created = date_created
+        instance.date_modified = date_modified
+        params.extend([instance.pk, date_created, date_modified])
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'UPDATE {table} SET date_created = v.date_created, '
+            'date_modified = v.date_modified '
+            'FROM (VALUES {values}) AS v (id, date_created, date_modified) '
+            'WHERE {table}.id = v.id'.format(
+                table=Instance._meta.db_table,
+                values=', '.join(['(%s, %s, %s)'] * len(instances))),
+            params)
+
+    parsed_instances = []
+    for instance in instances:
+        parsed_instance = ParsedInstance(instance=instance)
+        parsed_instance._set_geopoint()
+        parsed_instances.append(parsed_instance)
+    ParsedInstance.objects.bulk_create(parsed_instances)
+
+
+def _process_instances(xform, instances):
+    """
+    Updates the submission counts and caches, notifies and calls the
+    webhooks of the submissions of a batch.
+    """
+    process_submissions([(instance.pk, True) for instance in instances])
+    reset_xform_data_version(xform.pk, appended=True)
+    send_message(
+        instance_id=[instance.pk for instance in instances],
+        target_id=xform.pk, target_type=XFORM, user=xform.user,
+        message_verb=SUBMISSION_CREATED)
+    for instance in instances:
+        process_submission.send(sender=Instance, instance=instance)
+
+
+def _import_batch(xform, submissions, status):
+    results = [None] * len(submissions)
+    prepared, single = _prepare_submissions(xform, submissions)
+    if prepared:
+        duplicates = _find_duplicates(xform, prepared)
+        for index in duplicates:
+            if submissions[index].media_files:
+                # the submission API path saves the missing attachments
+                single.append(index)
+            else:
+                results[index] = [get_duplicate_submission_response(), None]
+        prepared = [p for p in prepared if p[0] not in duplicates]
+
+    instances = []
+    ids = Instance.allocate_ids(len(prepared)) if prepared else None
+    if ids is None:
+        single.extend(index for (index, _s, _c, _u) in prepared)
+    else:
+        try:
+            with transaction.atomic():
+                instances = _build_instances(xform, prepared, ids, status)
+                _insert_instances(instances)
+        except Exception:  # pylint: disable=broad-except
+            # e.g. a concurrent duplicate or an inactive form, the submission
+            # API path saves the valid submissions and returns the errors of
+            # the others
+            instances = []
+            single.extend(index for (index, _s, _c, _u) in prepared)
+        else:
+            for (index, _s, _c, _u), instance in zip(prepared, instances):
+                results[index] = [None, instance]
+
+    if instances:
+        _process_instances(xform, instances)
+
+    for index in sorted(single):
+        results[index] = _create_instance(xform, submissions[index], status)
+
+    return results
+
+
+def bulk_create_instances(xform, submissions, status=u'submitted_via_web',
+                          batch_size=None):
+    """
+    Imports submissions to an XForm in batches of batch_size, the
+    BULK_IMPORT_BATCH_SIZE setting by default.
+
+    A submission is an XML string, a dict of submission data or a
+    BulkSubmission with attachments and the user that submitted it. Edits,
+    and submissions that can not be imported in bulk, are saved one by one.
+
+    Returns an [error, instance] pair for each submission, as
+    safe_create_instance does.
+    """
+    batch_size = batch_size or getattr(
+        settings, 'BULK_IMPORT_BATCH_SIZE', BULK_IMPORT_BATCH_SIZE)
+    results = []
+    batch = []
+    for submission in submissions:
+        batch.append(_get_submission(xform, submission))
+        if len(batch) == batch_size:
+            results.extend(_import_batch(xform, batch, status))
+            batch = []
+    if batch:
+        results.extend(_import_batch(xform, batch, status))
+
+    return results
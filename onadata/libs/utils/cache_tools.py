@@ -1,6 +1,8 @@
 import hashlib
+from uuid import uuid4
 
 from django.core.cache import cache
+from django.db import transaction
 from django.utils.encoding import force_bytes
 
 # Cache names used in project serializer
@@ -25,6 +27,8 @@ ENKETO_SINGLE_SUBMIT_URL_CACHE = "xfs-get_enketosingle_submit__url"
 ENKETO_PREVIEW_URL_CACHE = "xfs-get_enketo_preview_url"
 XFORM_METADATA_CACHE = "xfs-get_xform_metadata"
 XFORM_DATA_VERSIONS = "xfs-get_xform_data_versions"
+XFORM_DATA_VERSION_TOKEN = "xfs-data_version_token-"
+XFORM_DATA_REWRITE_TOKEN = "xfs-data_rewrite_token-"
 XFORM_COUNT = "xfs-submission_count"
 DATAVIEW_COUNT = "dvs-get_data_count"
 DATAVIEW_LAST_SUBMISSION_TIME = "dvs-last_submission_time"
@@ -45,12 +49,64 @@ CHANGE_PASSWORD_ATTEMPTS = 'change_password_attempts-'
 XFORM_SUBMISSION_COUNT_FOR_DAY = "xfm-get_submission_count-"
 XFORM_SUBMISSION_COUNT_FOR_DAY_DATE = "xfm-get_submission_count_date-"
 
+# Cache names used in batch queues
+QUEUE_BATCH_SCHEDULED = "qi-batch_scheduled-"
+
+# Cache names used in MQTT messaging
+XFORM_TOPIC_METADATA = "xfm-topic_metadata-"
+
+# Cache names used in sharded exports
+EXPORT_SHARD_PROGRESS = "exs-shard_progress-"
+
+# Cache names used in chart and statistics aggregates
+XFORM_AGGREGATES = "xfs-aggregates-"
+
+# Cache names used in submission JSON indexing
+JSON_QUERY_FIELD_COUNT = "jsi-query_field_count-"
+
 
 def safe_delete(key):
     """Safely deletes a given key from the cache."""
     _ = cache.get(key) and cache.delete(key)
 
 
+def get_xform_data_version(xform_id):
+    """
+    Returns a token that changes whenever the submissions of an XForm are
+    created, edited or deleted.
+    """
+    key = f'{XFORM_DATA_VERSION_TOKEN}{xform_id}'
+    cache.add(key, uuid4().hex, None)
+
+    return cache.get(key) or uuid4().hex
+
+
+def get_xform_data_rewrite_version(xform_id):
+    """
+    Returns a token that changes whenever submissions of an XForm are edited
+    or deleted, unlike the data version it does not change when submissions
+    are only added.
+    """
+    key = f'{XFORM_DATA_REWRITE_TOKEN}{xform_id}'
+    cache.add(key, uuid4().hex, None)
+
+    return cache.get(key) or uuid4().hex
+
+
+def reset_xform_data_version(xform_id, appended=False):
+    """
+    Changes the data version token of an XForm, again once the current
+    transaction commits so that the token is not reused for uncommitted data.
+    The data rewrite token is changed too unless submissions were only
+    appended.
+    """
+    keys = [f'{XFORM_DATA_VERSION_TOKEN}{xform_id}']
+    if not appended:
+        keys.append(f'{XFORM_DATA_REWRITE_TOKEN}{xform_id}')
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
 def safe_key(key):
     """Return a hashed key."""
     return hashlib.sha256(force_bytes(key)).hexdigest()
@@ -154,6 +154,8 @@ EXPORT_MIMES = {
     'zip': 'zip',
     'csv_zip': 'zip',
     'sav_zip': 'zip',
+    'parquet_zip': 'zip',
+    'arrow_zip': 'zip',
     'sav': 'sav',
     'kml': 'vnd.google-earth.kml+xml',
     OSM: OSM
@@ -168,6 +170,7 @@ MEMBERS = 'members'
 XLS_DATE_FIELDS = ['date', 'today']
 SUBMISSION_REVIEW = 'submission_review'
 IMPORTED_VIA_CSV_BY = 'imported_via_csv_by'
+INDEXED_FIELD = 'indexed_field'
 XLS_DATETIME_FIELDS = ['start', 'end', 'dateTime', '_submission_time']
 
 METADATA_FIELDS = [
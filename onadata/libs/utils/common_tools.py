@@ -124,23 +124,15 @@ def get_response_content(response, decode=True):
 
 def json_stream(data, json_string):
     """
-    Generator function to stream JSON data
+    Generator function to stream JSON data, data can be any iterable
+    including a generator.
     """
     yield '['
     try:
-        data = data.__iter__()
-        item = next(data)
-        while item:
-            try:
-                next_item = next(data)
-                yield json_string(item)
+        for index, item in enumerate([] if data is None else data):
+            if index:
                 yield ','
-                item = next_item
-            except StopIteration:
-                yield json_string(item)
-                break
-    except AttributeError:
-        pass
+            yield json_string(item)
     finally:
         yield ']'
 
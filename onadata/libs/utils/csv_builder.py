@@ -1,5 +1,7 @@
+import pickle
 from itertools import chain
 from collections import OrderedDict
+from tempfile import TemporaryFile
 
 import unicodecsv as csv
 from django.conf import settings
@@ -15,7 +17,8 @@ from onadata.apps.logger.models.xform import XForm, question_types_to_exclude
 from onadata.apps.viewer.models.data_dictionary import DataDictionary
 from onadata.apps.viewer.models.parsed_instance import (ParsedInstance,
                                                         query_data)
-from onadata.libs.exceptions import NoRecordsFoundError
+from onadata.libs.exceptions import (IncrementalExportError,
+                                     NoRecordsFoundError)
 from onadata.libs.utils.common_tags import (
     ATTACHMENTS, BAMBOO_DATASET_ID, DATE_MODIFIED, DELETEDAT, DURATION,
     EDITED, GEOLOCATION, ID, MEDIA_ALL_RECEIVED, MEDIA_COUNT, NA_REP,
@@ -97,41 +100,63 @@ def get_column_names_only(columns, dd, group_delimiter):
     return new_columns
 
 
+def write_csv_header_rows(writer, columns, columns_with_hxl=None,
+                          remove_group_name=False, dd=None,
+                          group_delimiter=DEFAULT_GROUP_DELIMITER,
+                          include_labels=False, include_labels_only=False,
+                          include_hxl=False, language=None):
+    """
+    Writes the column names, labels and HXL rows of a CSV export.
+    """
+    # Check if to truncate the group name prefix
+    if not include_labels_only:
+        if remove_group_name and dd:
+            new_cols = get_column_names_only(columns, dd, group_delimiter)
+        else:
+            new_cols = columns
+
+        # use a different group delimiter if needed
+        if group_delimiter != DEFAULT_GROUP_DELIMITER:
+            new_cols = [
+                group_delimiter.join(col.split(DEFAULT_GROUP_DELIMITER))
+                for col in new_cols
+            ]
+
+        writer.writerow(new_cols)
+
+    if include_labels or include_labels_only:
+        labels = get_labels_from_columns(columns, dd, group_delimiter,
+                                         language=language)
+        writer.writerow(labels)
+
+    if include_hxl and columns_with_hxl:
+        hxl_row = [columns_with_hxl.get(col, '') for col in columns]
+        hxl_row and writer.writerow(hxl_row)
+
+
 def write_to_csv(path, rows, columns, columns_with_hxl=None,
                  remove_group_name=False, dd=None,
                  group_delimiter=DEFAULT_GROUP_DELIMITER, include_labels=False,
                  include_labels_only=False, include_hxl=False,
                  win_excel_utf8=False, total_records=None,
-                 index_tags=DEFAULT_INDEX_TAGS, language=None):
+                 index_tags=DEFAULT_INDEX_TAGS, language=None, append=False):
+    """
+    Writes the rows to a CSV file at path, when append is True the rows are
+    added to the end of an existing CSV file and no header rows are written.
+    """
     na_rep = getattr(settings, 'NA_REP', NA_REP)
-    encoding = 'utf-8-sig' if win_excel_utf8 else 'utf-8'
-    with open(path, 'wb') as csvfile:
+    encoding = 'utf-8-sig' if win_excel_utf8 and not append else 'utf-8'
+    with open(path, 'ab' if append else 'wb') as csvfile:
         writer = csv.writer(csvfile, encoding=encoding, lineterminator='\n')
 
-        # Check if to truncate the group name prefix
-        if not include_labels_only:
-            if remove_group_name and dd:
-                new_cols = get_column_names_only(columns, dd, group_delimiter)
-            else:
-                new_cols = columns
-
-            # use a different group delimiter if needed
-            if group_delimiter != DEFAULT_GROUP_DELIMITER:
-                new_cols = [
-                    group_delimiter.join(col.split(DEFAULT_GROUP_DELIMITER))
-                    for col in new_cols
-                ]
-
-            writer.writerow(new_cols)
-
-        if include_labels or include_labels_only:
-            labels = get_labels_from_columns(columns, dd, group_delimiter,
-                                             language=language)
-            writer.writerow(labels)
-
-        if include_hxl and columns_with_hxl:
-            hxl_row = [columns_with_hxl.get(col, '') for col in columns]
-            hxl_row and writer.writerow(hxl_row)
+        if not append:
+            write_csv_header_rows(
+                writer, columns, columns_with_hxl=columns_with_hxl,
+                remove_group_name=remove_group_name, dd=dd,
+                group_delimiter=group_delimiter,
+                include_labels=include_labels,
+                include_labels_only=include_labels_only,
+                include_hxl=include_hxl, language=language)
 
         for i, row in enumerate(rows, start=1):
             for col in AbstractDataFrameBuilder.IGNORED_COLUMNS:
@@ -220,9 +245,8 @@ class AbstractDataFrameBuilder(object):
     def _collect_select_multiples(cls, dd, language=None):
         select_multiples = []
         select_multiple_elements = [
-            e for e in dd.get_survey_elements_with_choices()
+            e for e in dd.get_survey_elements_of_type(MULTIPLE_SELECT_TYPE)
             if e.bind.get('type') == SELECT_BIND_TYPE
-            and e.type == MULTIPLE_SELECT_TYPE
         ]
         for e in select_multiple_elements:
             xpath = e.get_abbreviated_xpath()
@@ -296,8 +320,7 @@ class AbstractDataFrameBuilder(object):
 
     @classmethod
     def _collect_gps_fields(cls, dd):
-        return [e.get_abbreviated_xpath() for e in dd.get_survey_elements()
-                if e.bind.get("type") == "geopoint"]
+        return dd.geopoint_xpaths()
 
     @classmethod
     def _tag_edit_string(cls, record):
@@ -337,7 +360,7 @@ class AbstractDataFrameBuilder(object):
 
     def _query_data(self, query='{}', start=0,
                     limit=ParsedInstance.DEFAULT_LIMIT,
-                    fields='[]', count=False):
+                    fields='[]', count=False, chunk_size=None):
         # query_data takes params as json strings
         # so we dumps the fields dictionary
         count_args = {
@@ -368,7 +391,8 @@ class AbstractDataFrameBuilder(object):
                 'sort': 'id',
                 'start_index': start,
                 'limit': limit,
-                'count': False
+                'count': False,
+                'chunk_size': chunk_size
             }
             cursor = query_data(**query_args)
 
@@ -397,6 +421,7 @@ class CSVDataFrameBuilder(AbstractDataFrameBuilder):
             show_choice_labels, include_reviews, language)
 
         self.ordered_columns = OrderedDict()
+        self.columns = []
         self.image_xpaths = [] if not self.include_images \
             else self.dd.get_media_survey_xpaths()
 
@@ -535,11 +560,15 @@ class CSVDataFrameBuilder(AbstractDataFrameBuilder):
                 # generated when we reindex
                 ordered_columns[child.get_abbreviated_xpath()] = None
 
-    def _update_ordered_columns_from_data(self, cursor):
+    def _update_ordered_columns_from_data(self, cursor=None):
         """
         Populates `self.ordered_columns` object that is
         used to generate export column headers for
         forms that split select multiple and gps data.
+
+        Repeat columns are discovered from the cursor records when one is
+        passed, otherwise they are added as the records are formatted by
+        `_format_for_dataframe`.
         """
         # add ordered columns for select multiples
         if self.split_select_multiples:
@@ -557,6 +586,9 @@ class CSVDataFrameBuilder(AbstractDataFrameBuilder):
             gps_xpaths = self.dd.get_additional_geopoint_xpaths(key)
             self.ordered_columns[key] = [key] + gps_xpaths
 
+        if cursor is None:
+            return
+
         # add ordered columns for nested repeat data
         for record in cursor:
             # re index column repeats
@@ -569,6 +601,33 @@ class CSVDataFrameBuilder(AbstractDataFrameBuilder):
                     show_choice_labels=self.show_choice_labels,
                     language=self.language)
 
+    def _spool_formatted_data(self, cursor, spool):
+        """
+        Formats the cursor records in a single pass, writing them to the
+        spool file, and returns a generator of the spooled records.
+
+        The repeat columns in `self.ordered_columns` are only complete once
+        every record has been formatted, spooling the records lets us write
+        the column headers first without reading the records twice.
+        """
+        for record in self._format_for_dataframe(cursor):
+            pickle.dump(record, spool, pickle.HIGHEST_PROTOCOL)
+        spool.seek(0)
+
+        for record in self._read_spooled_data(spool):
+            yield record
+
+    @classmethod
+    def _read_spooled_data(cls, spool):
+        """
+        Returns a generator of the records in a spool file.
+        """
+        while True:
+            try:
+                yield pickle.load(spool)
+            except EOFError:
+                break
+
     def _format_for_dataframe(self, cursor):
         """
         Unpacks nested repeat data for export.
@@ -599,25 +658,22 @@ class CSVDataFrameBuilder(AbstractDataFrameBuilder):
                 flat_dict.update(reindexed)
             yield flat_dict
 
-    def export_to(self, path, dataview=None):
-        self.ordered_columns = OrderedDict()
-        self._build_ordered_columns(self.dd.survey, self.ordered_columns)
+    def export_to(self, path, dataview=None, columns=None):
+        """
+        Writes the CSV export to path.
+
+        When columns, the columns of an existing CSV export at path, are
+        given the records are appended to that export. IncrementalExportError
+        is raised if the records have columns that are not in the export.
+        """
+        append = columns is not None
+        self._reset_ordered_columns()
 
         if dataview:
             cursor = dataview.query_data(dataview, all_data=True,
                                          filter_query=self.filter_query)
             if isinstance(cursor, QuerySet):
                 cursor = cursor.iterator()
-
-            self._update_ordered_columns_from_data(cursor)
-
-            data = self._format_for_dataframe(cursor)
-
-            columns = list(chain.from_iterable(
-                [[xpath] if cols is None else cols
-                 for (xpath, cols) in iteritems(self.ordered_columns)
-                 if [c for c in dataview.columns if xpath.startswith(c)]]
-            ))
         else:
             try:
                 cursor = self._query_data(self.filter_query)
@@ -625,26 +681,66 @@ class CSVDataFrameBuilder(AbstractDataFrameBuilder):
                 # Set cursor object to an an empty queryset
                 cursor = self.xform.instances.none()
 
-            self._update_ordered_columns_from_data(cursor)
-
             if isinstance(cursor, QuerySet):
-                cursor = cursor.iterator()
+                # read the records in batches instead of caching the whole
+                # result set on the queryset
+                cursor = cursor.iterator(
+                    chunk_size=ParsedInstance.DEFAULT_BATCHSIZE)
 
+        with TemporaryFile() as spool:
             # Unpack xform columns and data
-            data = self._format_for_dataframe(cursor)
+            data = self._spool_formatted_data(cursor, spool)
+            # consume the first record to format and spool all records
+            # which completes the repeat columns
+            first_record = next(data, None)
+            if first_record is not None:
+                data = chain([first_record], data)
+
+            data_columns = self._get_data_columns(dataview)
+            if not append:
+                columns = data_columns
+            elif set(data_columns) - set(columns):
+                raise IncrementalExportError(
+                    "The records have columns that are not in the export.")
+            self.columns = columns
+
+            self._write_to_csv(path, data, columns, append=append)
+
+    def _reset_ordered_columns(self):
+        """
+        Sets `self.ordered_columns` to the columns of the form, without the
+        repeat columns found in the records.
+        """
+        self.ordered_columns = OrderedDict()
+        self._build_ordered_columns(self.dd.survey, self.ordered_columns)
+        self._update_ordered_columns_from_data()
 
-            columns = list(chain.from_iterable(
+    def _get_data_columns(self, dataview=None):
+        """
+        Returns the columns of the export from `self.ordered_columns`.
+        """
+        if dataview:
+            return list(chain.from_iterable(
                 [[xpath] if cols is None else cols
-                    for (xpath, cols) in iteritems(self.ordered_columns)]))
+                 for (xpath, cols) in iteritems(self.ordered_columns)
+                 if [c for c in dataview.columns if xpath.startswith(c)]]
+            ))
 
-            # add extra columns
-            columns += [col for col in self.extra_columns]
+        data_columns = list(chain.from_iterable(
+            [[xpath] if cols is None else cols
+                for (xpath, cols) in iteritems(self.ordered_columns)]))
 
-            for field in self.dd.get_survey_elements_of_type('osm'):
-                columns += OsmData.get_tag_keys(self.xform,
-                                                field.get_abbreviated_xpath(),
-                                                include_prefix=True)
+        # add extra columns
+        data_columns += [col for col in self.extra_columns]
 
+        for field in self.dd.get_survey_elements_of_type('osm'):
+            data_columns += OsmData.get_tag_keys(
+                self.xform, field.get_abbreviated_xpath(),
+                include_prefix=True)
+
+        return data_columns
+
+    def _write_to_csv(self, path, data, columns, append=False):
         columns_with_hxl = self.include_hxl and get_columns_with_hxl(
             self.dd.survey_elements)
 
@@ -658,4 +754,46 @@ class CSVDataFrameBuilder(AbstractDataFrameBuilder):
                      win_excel_utf8=self.win_excel_utf8,
                      total_records=self.total_records,
                      index_tags=self.index_tags,
-                     language=self.language)
+                     language=self.language, append=append)
+
+    def export_shard_to(self, path, cursor):
+        """
+        Formats the records of a shard of a sharded CSV export and writes
+        them to a spool file at path.
+
+        Returns the repeat columns found in the records, which are merged
+        with those of the other shards by `merge_shards_to`.
+        """
+        self._reset_ordered_columns()
+
+        with open(path, 'wb') as spool:
+            for record in self._format_for_dataframe(cursor):
+                pickle.dump(record, spool, pickle.HIGHEST_PROTOCOL)
+
+        return OrderedDict(
+            (xpath, cols) for (xpath, cols) in iteritems(self.ordered_columns)
+            if cols)
+
+    def merge_shards_to(self, path, shards):
+        """
+        Writes the CSV export to path from the shards of a sharded CSV
+        export, (path, ordered_columns) pairs written by `export_shard_to`.
+        """
+        self._reset_ordered_columns()
+        for (shard_path, ordered_columns) in shards:
+            for (xpath, cols) in iteritems(ordered_columns):
+                if self.ordered_columns.get(xpath) is None:
+                    continue
+                self.ordered_columns[xpath].extend(
+                    [col for col in cols
+                     if col not in self.ordered_columns[xpath]])
+
+        self.columns = self._get_data_columns()
+
+        def _get_data():
+            for (shard_path, ordered_columns) in shards:
+                with open(shard_path, 'rb') as spool:
+                    for record in self._read_spooled_data(spool):
+                        yield record
+
+        self._write_to_csv(path, _get_data(), self.columns)
@@ -22,6 +22,7 @@ from celery.result import AsyncResult
 from dateutil.parser import parse
 from django.conf import settings
 from django.contrib.auth.models import User
+from django.contrib.contenttypes.models import ContentType
 from django.core.files.storage import default_storage
 from django.utils import timezone
 from django.utils.translation import ugettext as _
@@ -29,12 +30,19 @@ from future.utils import iteritems
 from multidb.pinning import use_master
 
 from onadata.apps.logger.models import Instance, XForm
+from onadata.apps.main.models.meta_data import MetaData
 from onadata.apps.messaging.constants import XFORM, SUBMISSION_DELETED
 from onadata.apps.messaging.serializers import send_message
 from onadata.celery import app
 from onadata.libs.utils import analytics
 from onadata.libs.utils.async_status import (FAILED, async_status,
                                              celery_state_to_status)
+from onadata.libs.utils.bulk_import import (BULK_IMPORT_BATCH_SIZE,
+                                            BulkSubmission,
+                                            bulk_create_instances)
+from onadata.libs.utils.cache_tools import (XFORM_METADATA_CACHE,
+                                            reset_xform_data_version,
+                                            safe_delete)
 from onadata.libs.utils.common_tags import (MULTIPLE_SELECT_TYPE, EXCEL_TRUE,
                                             XLS_DATE_FIELDS,
                                             XLS_DATETIME_FIELDS, UUID, NA_REP,
@@ -43,13 +51,8 @@ from onadata.libs.utils.common_tags import (MULTIPLE_SELECT_TYPE, EXCEL_TRUE,
                                             IMPORTED_VIA_CSV_BY)
 from onadata.libs.utils.common_tools import report_exception
 from onadata.libs.utils.dict_tools import csv_dict_to_nested_dict
-from onadata.libs.utils.logger_tools import (OpenRosaResponse, dict2xml,
-                                             safe_create_instance)
-from onadata.libs.serializers.metadata_serializer import MetaDataSerializer
+from onadata.libs.utils.logger_tools import OpenRosaResponse, dict2xml
 
-DEFAULT_UPDATE_BATCH = 100
-PROGRESS_BATCH_UPDATE = getattr(settings, 'EXPORT_TASK_PROGRESS_UPDATE_BATCH',
-                                DEFAULT_UPDATE_BATCH)
 IGNORED_COLUMNS = ['formhub/uuid', 'meta/instanceID']
 
 
@@ -276,8 +279,8 @@ def submit_csv(username, xform, csv_file, overwrite=False):
     """Imports CSV data to an existing form
 
     Takes a csv formatted file or string containing rows of submission/instance
-    and converts those to xml submissions and finally submits them by calling
-    :py:func:`onadata.libs.utils.logger_tools.safe_create_instance`
+    and converts those to xml submissions and finally submits them in batches
+    by calling :py:func:`onadata.libs.utils.bulk_import.bulk_create_instances`
 
     :param str username: the submission user
     :param onadata.apps.logger.models.XForm xform: The submission's XForm.
@@ -309,6 +312,57 @@ def submit_csv(username, xform, csv_file, overwrite=False):
     additions = duplicates = inserts = 0
     rollback_uuids = []
     errors = {}
+    submissions = []
+    users = {}
+    batch_size = getattr(
+        settings, 'BULK_IMPORT_BATCH_SIZE', BULK_IMPORT_BATCH_SIZE)
+    imported_by = ContentType.objects.get_for_model(Instance)
+
+    def _import_submissions(submissions):
+        """
+        Imports a batch of submissions, returns the import status if the
+        import failed.
+        """
+        nonlocal additions, duplicates
+        instance_ids = []
+        results = bulk_create_instances(
+            xform, list(submissions), status='imported_via_csv',
+            batch_size=len(submissions))
+        del submissions[:]
+        for error, instance in results:
+            if error:
+                if not (isinstance(error, OpenRosaResponse)
+                        and error.status_code == 202):
+                    Instance.objects.filter(
+                        uuid__in=rollback_uuids, xform=xform).delete()
+                    return async_status(FAILED, text(error))
+                duplicates += 1
+            else:
+                additions += 1
+                instance_ids.append(instance.pk)
+
+        # Store user who imported data in metadata
+        MetaData.objects.bulk_create([
+            MetaData(content_type=imported_by, object_id=instance_id,
+                     data_type=IMPORTED_VIA_CSV_BY, data_value=username)
+            for instance_id in instance_ids], ignore_conflicts=True)
+        for instance_id in instance_ids:
+            safe_delete('{}{}'.format(XFORM_METADATA_CACHE, instance_id))
+
+        try:
+            current_task.update_state(
+                state='PROGRESS',
+                meta={
+                    'progress': additions,
+                    'total': num_rows,
+                    'info': additional_col
+                })
+        except Exception:
+            logging.exception(
+                _(u'Could not update state of '
+                    'import CSV batch process.'))
+
+        return None
 
     # Retrieve the columns we should validate values for
     # Currently validating date, datetime, integer and decimal columns
@@ -325,6 +379,7 @@ def submit_csv(username, xform, csv_file, overwrite=False):
         xform.instances.filter(deleted_at__isnull=True)\
             .update(deleted_at=timezone.now(),
                     deleted_by=User.objects.get(username=username))
+        reset_xform_data_version(xform.pk)
         # updates the form count
         xform.submission_count(True)
         # send message
@@ -405,63 +460,28 @@ def submit_csv(username, xform, csv_file, overwrite=False):
                 rollback_uuids.append(row_uuid.replace('uuid:', ''))
 
                 try:
-                    xml_file = BytesIO(
+                    if submitted_by and submitted_by not in users:
+                        users[submitted_by] = User.objects.filter(
+                            username=submitted_by).first()
+                    submissions.append(BulkSubmission(
                         dict2xmlsubmission(
-                            row, xform, row_uuid, submission_date))
-
-                    try:
-                        error, instance = safe_create_instance(
-                            username, xml_file, [], xform.uuid, None,
-                            instance_status='imported_via_csv'
-                        )
-                    except ValueError as e:
-                        error = e
-
-                    if error:
-                        if not (isinstance(error, OpenRosaResponse)
-                                and error.status_code == 202):
-                            Instance.objects.filter(
-                                uuid__in=rollback_uuids, xform=xform).delete()
-                            return async_status(FAILED, text(error))
-                        else:
-                            duplicates += 1
-                    else:
-                        additions += 1
-
-                        if additions % PROGRESS_BATCH_UPDATE == 0:
-                            try:
-                                current_task.update_state(
-                                    state='PROGRESS',
-                                    meta={
-                                        'progress': additions,
-                                        'total': num_rows,
-                                        'info': additional_col
-                                    })
-                            except Exception:
-                                logging.exception(
-                                    _(u'Could not update state of '
-                                        'import CSV batch process.'))
-                            finally:
-                                xform.submission_count(True)
-
-                        users = User.objects.filter(
-                            username=submitted_by) if submitted_by else []
-
-                        # Store user who imported data in metadata
-                        serializer = MetaDataSerializer(data={
-                            "instance": instance.id,
-                            "data_type": IMPORTED_VIA_CSV_BY,
-                            "data_value": username
-                        })
+                            row, xform, row_uuid, submission_date),
+                        submitted_by=users.get(submitted_by)))
 
-                        if serializer.is_valid():
-                            serializer.save()
-
-                        if users:
-                            instance.user = users[0]
-                            instance.save()
+                    if len(submissions) == batch_size:
+                        error = _import_submissions(submissions)
+                        if error:
+                            return error
                 except Exception as e:
                     return failed_import(rollback_uuids, xform, e, text(e))
+
+        if not errors and submissions:
+            try:
+                error = _import_submissions(submissions)
+                if error:
+                    return error
+            except Exception as e:
+                return failed_import(rollback_uuids, xform, e, text(e))
     except UnicodeDecodeError as e:
         return failed_import(rollback_uuids, xform, e,
                              'CSV file must be utf-8 encoded')
@@ -9,6 +9,8 @@ import logging
 import sys
 import uuid
 import re
+from io import TextIOWrapper
+from shutil import copyfileobj
 from builtins import str as text
 from datetime import datetime, date
 from zipfile import ZipFile, ZIP_DEFLATED
@@ -24,6 +26,13 @@ from pyxform.question import Question
 from pyxform.section import RepeatingSection, Section
 from savReaderWriter import SavWriter
 
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
 from onadata.apps.logger.models.osmdata import OsmData
 from onadata.apps.logger.models.xform import (QUESTION_TYPES_TO_EXCLUDE,
                                               _encode_for_mongo)
@@ -250,13 +259,14 @@ def is_all_numeric(items):
                      for i in items if isinstance(i, text)]))
 
 
-def track_task_progress(additions, total=None):
+def track_task_progress(additions, total=None, task_id=None):
     """
     Updates the current export task with number of submission processed.
     Updates in batches of settings EXPORT_TASK_PROGRESS_UPDATE_BATCH defaults
     to 100.
     :param additions:
     :param total:
+    :param task_id: id of the task to update, defaults to the current task
     :return:
     """
     try:
@@ -265,7 +275,8 @@ def track_task_progress(additions, total=None):
             meta = {'progress': additions}
             if total:
                 meta.update({'total': total})
-            current_task.update_state(state='PROGRESS', meta=meta)
+            current_task.update_state(
+                task_id=task_id, state='PROGRESS', meta=meta)
     except Exception as e:
         logging.exception(
             _('Track task progress threw exception: %s' % text(e)))
@@ -345,9 +356,22 @@ class ExportBuilder(object):
 
     TRUNCATE_GROUP_TITLE = False
 
+    # types of the extra fields in Parquet and Arrow exports, the other extra
+    # fields are strings
+    EXTRA_FIELD_TYPES = {
+        ID: 'int', INDEX: 'int', PARENT_INDEX: 'int',
+        SUBMISSION_TIME: 'dateTime', DURATION: 'decimal'}
+    # maximum number of rows of a section held in memory before they are
+    # written as a Parquet row group or an Arrow record batch
+    COLUMNAR_BATCH_SIZE = 10000
+
     XLS_SHEET_NAME_MAX_CHARS = 31
+    # maximum number of rows in an Excel worksheet
+    XLS_SHEET_MAX_ROWS = 1048576
     url = None
     language = None
+    # state needed to append records to the export in an incremental export
+    export_state = None
 
     def __init__(self):
         self.extra_columns = (
@@ -747,6 +771,14 @@ class ExportBuilder(object):
         return row
 
     def to_zipped_csv(self, path, data, *args, **kwargs):
+        """
+        Generates a zip file with a CSV file per section.
+
+        When the incremental keyword argument, the export_state of a zipped
+        CSV export at path, is given the records are appended to the CSV
+        files of that export. The header rows are left out when the
+        include_headers keyword argument is False.
+        """
         def write_row(row, csv_writer, fields):
             csv_writer.writerow(
                 [encode_if_str(row, field) for field in fields])
@@ -754,6 +786,8 @@ class ExportBuilder(object):
         csv_defs = {}
         dataview = kwargs.get('dataview')
         total_records = kwargs.get('total_records')
+        incremental = kwargs.get('incremental')
+        include_headers = kwargs.get('include_headers', not incremental)
 
         for section in self.sections:
             csv_file = NamedTemporaryFile(suffix='.csv', mode='w')
@@ -761,15 +795,26 @@ class ExportBuilder(object):
             csv_defs[section['name']] = {
                 'csv_file': csv_file, 'csv_writer': csv_writer}
 
+        if incremental:
+            # copy the rows of the existing export
+            with ZipFile(path) as zip_file:
+                for (section_name, csv_def) in iteritems(csv_defs):
+                    name = '_'.join(section_name.split('/')) + '.csv'
+                    with zip_file.open(name) as section_file:
+                        copyfileobj(
+                            TextIOWrapper(section_file, newline=''),
+                            csv_def['csv_file'])
+
         # write headers
-        if not self.INCLUDE_LABELS_ONLY:
+        if not self.INCLUDE_LABELS_ONLY and include_headers:
             for section in self.sections:
                 fields = self.get_fields(dataview, section, 'title')
                 csv_defs[section['name']]['csv_writer'].writerow(
                     [f for f in fields])
 
         # write labels
-        if self.INCLUDE_LABELS or self.INCLUDE_LABELS_ONLY:
+        if (self.INCLUDE_LABELS or self.INCLUDE_LABELS_ONLY) and \
+                include_headers:
             for section in self.sections:
                 fields = self.get_fields(dataview, section, 'label')
                 csv_defs[section['name']]['csv_writer'].writerow(
@@ -780,7 +825,7 @@ class ExportBuilder(object):
 
         columns_with_hxl = kwargs.get('columns_with_hxl')
         # write hxl row
-        if self.INCLUDE_HXL and columns_with_hxl:
+        if self.INCLUDE_HXL and columns_with_hxl and include_headers:
             for section in self.sections:
                 fields = self.get_fields(dataview, section, 'title')
                 hxl_row = [columns_with_hxl.get(col, '')
@@ -789,8 +834,8 @@ class ExportBuilder(object):
                     writer = csv_defs[section['name']]['csv_writer']
                     writer.writerow(hxl_row)
 
-        index = 1
-        indices = {}
+        index = incremental['index'] if incremental else 1
+        indices = dict(incremental['indices']) if incremental else {}
         survey_name = self.survey.name
         for i, d in enumerate(data, start=1):
             # decode mongo section names
@@ -826,6 +871,8 @@ class ExportBuilder(object):
             index += 1
             track_task_progress(i, total_records)
 
+        self.export_state = {'index': index, 'indices': indices}
+
         # write zipfile
         with ZipFile(path, 'w', ZIP_DEFLATED, allowZip64=True) as zip_file:
             for (section_name, csv_def) in iteritems(csv_defs):
@@ -838,6 +885,68 @@ class ExportBuilder(object):
         for (section_name, csv_def) in iteritems(csv_defs):
             csv_def['csv_file'].close()
 
+    def merge_zipped_csv_shards(self, path, shards, *args, **kwargs):
+        """
+        Generates a zip file with a CSV file per section from the shards of a
+        sharded export.
+
+        Each shard is a (path, export_state) pair of a zipped CSV written by
+        to_zipped_csv without the header rows. The _index and _parent_index
+        of each shard start at 1, they are offset by the number of rows of
+        the previous shards.
+        """
+        dataview = kwargs.get('dataview')
+        survey_name = self.survey.name
+
+        # the header rows of every section
+        headers_file = NamedTemporaryFile(suffix='.zip')
+        self.to_zipped_csv(headers_file.name, [], *args, **kwargs)
+
+        offsets = {}
+        section_shards = []
+        for (shard_path, export_state) in shards:
+            section_shards.append((shard_path, dict(offsets)))
+            offsets[survey_name] = \
+                offsets.get(survey_name, 0) + export_state['index'] - 1
+            for (name, count) in iteritems(export_state['indices']):
+                offsets[name] = offsets.get(name, 0) + count
+
+        with ZipFile(path, 'w', ZIP_DEFLATED, allowZip64=True) as zip_file, \
+                ZipFile(headers_file.name) as headers_zip:
+            for section in self.sections:
+                section_name = section['name']
+                name = '_'.join(section_name.split('/')) + '.csv'
+                fields = self.get_fields(dataview, section, 'xpath')
+                index_column = fields.index(INDEX)
+                parent_index_column = fields.index(PARENT_INDEX)
+                parent_table_column = fields.index(PARENT_TABLE_NAME)
+
+                with NamedTemporaryFile(suffix='.csv', mode='w') as csv_file:
+                    with headers_zip.open(name) as section_file:
+                        copyfileobj(TextIOWrapper(section_file, newline=''),
+                                    csv_file)
+                    csv_writer = csv.writer(csv_file)
+
+                    for (shard_path, shard_offsets) in section_shards:
+                        with ZipFile(shard_path) as shard_zip, \
+                                shard_zip.open(name) as section_file:
+                            reader = csv.reader(
+                                TextIOWrapper(section_file, newline=''))
+                            for row in reader:
+                                row[index_column] = int(row[index_column]) + \
+                                    shard_offsets.get(section_name, 0)
+                                parent_index = int(row[parent_index_column])
+                                if parent_index != -1:
+                                    row[parent_index_column] = \
+                                        parent_index + shard_offsets.get(
+                                            row[parent_table_column], 0)
+                                csv_writer.writerow(row)
+
+                    csv_file.flush()
+                    zip_file.write(csv_file.name, name)
+
+        headers_file.close()
+
     @classmethod
     def get_valid_sheet_name(cls, desired_name, existing_names):
         # a sheet name has to be <= 31 characters and not a duplicate of an
@@ -861,6 +970,13 @@ class ExportBuilder(object):
         return generated_name
 
     def to_xls_export(self, path, data, *args, **kwargs):
+        """
+        Generates an XLSX file with a worksheet per section.
+
+        Rows are written as the records are read, a section that has more
+        than XLS_EXPORT_MAX_ROWS_PER_SHEET rows is continued on a new
+        worksheet with the same header rows.
+        """
         def write_row(data, work_sheet, fields, work_sheet_titles):
             # update parent_table with the generated sheet's title
             data[PARENT_TABLE_NAME] = work_sheet_titles.get(
@@ -869,56 +985,76 @@ class ExportBuilder(object):
 
         dataview = kwargs.get('dataview')
         total_records = kwargs.get('total_records')
+        columns_with_hxl = kwargs.get('columns_with_hxl')
+        max_rows = getattr(settings, 'XLS_EXPORT_MAX_ROWS_PER_SHEET',
+                           self.XLS_SHEET_MAX_ROWS)
 
         wb = Workbook(write_only=True)
         work_sheets = {}
+        # number of worksheets and of rows in the current worksheet of a
+        # section
+        work_sheet_counts = {}
+        work_sheet_rows = {}
         # map of section_names to generated_names
         work_sheet_titles = {}
-        for section in self.sections:
+        sheet_names = []
+        section_fields = {}
+
+        def add_work_sheet(section):
             section_name = section['name']
+            desired_name = '_'.join(section_name.split('/'))
+            work_sheet_counts[section_name] = \
+                work_sheet_counts.get(section_name, 0) + 1
+            if section_name in work_sheet_titles:
+                # continue the section on a new worksheet
+                desired_name = '{}_{}'.format(
+                    work_sheet_titles[section_name],
+                    work_sheet_counts[section_name])
             work_sheet_title = ExportBuilder.get_valid_sheet_name(
-                '_'.join(section_name.split('/')), work_sheet_titles.values())
-            work_sheet_titles[section_name] = work_sheet_title
-            work_sheets[section_name] = wb.create_sheet(
-                title=work_sheet_title)
+                desired_name, sheet_names)
+            work_sheet_titles.setdefault(section_name, work_sheet_title)
+            sheet_names.append(work_sheet_title)
+            ws = wb.create_sheet(title=work_sheet_title)
+            work_sheets[section_name] = ws
+            work_sheet_rows[section_name] = 0
+            headers = self.get_fields(dataview, section, 'title')
+
+            # write the headers
+            if not self.INCLUDE_LABELS_ONLY:
+                ws.append(headers)
+                work_sheet_rows[section_name] += 1
 
-        # write the headers
-        if not self.INCLUDE_LABELS_ONLY:
-            for section in self.sections:
-                section_name = section['name']
-                headers = self.get_fields(dataview, section, 'title')
+            # write labels
+            if self.INCLUDE_LABELS or self.INCLUDE_LABELS_ONLY:
+                ws.append(self.get_fields(dataview, section, 'label'))
+                work_sheet_rows[section_name] += 1
 
-                # get the worksheet
-                ws = work_sheets[section_name]
-                ws.append(headers)
+            # write hxl header
+            if self.INCLUDE_HXL and columns_with_hxl:
+                hxl_row = [columns_with_hxl.get(col, '')
+                           for col in headers]
+                if hxl_row:
+                    ws.append(hxl_row)
+                    work_sheet_rows[section_name] += 1
 
-        # write labels
-        if self.INCLUDE_LABELS or self.INCLUDE_LABELS_ONLY:
-            for section in self.sections:
-                section_name = section['name']
-                labels = self.get_fields(dataview, section, 'label')
+        def append_row(row, section):
+            section_name = section['name']
+            if work_sheet_rows[section_name] >= max_rows:
+                add_work_sheet(section)
+            write_row(
+                self.pre_process_row(row, section),
+                work_sheets[section_name], section_fields[section_name],
+                work_sheet_titles)
+            work_sheet_rows[section_name] += 1
 
-                # get the worksheet
-                ws = work_sheets[section_name]
-                ws.append(labels)
+        for section in self.sections:
+            add_work_sheet(section)
+            section_fields[section['name']] = self.get_fields(
+                dataview, section, 'xpath')
 
         media_xpaths = [] if not self.INCLUDE_IMAGES \
             else self.dd.get_media_survey_xpaths()
 
-        # write hxl header
-        columns_with_hxl = kwargs.get('columns_with_hxl')
-        if self.INCLUDE_HXL and columns_with_hxl:
-            for section in self.sections:
-                section_name = section['name']
-                headers = self.get_fields(dataview, section, 'title')
-
-                # get the worksheet
-                ws = work_sheets[section_name]
-
-                hxl_row = [columns_with_hxl.get(col, '')
-                           for col in headers]
-                hxl_row and ws.append(hxl_row)
-
         index = 1
         indices = {}
         survey_name = self.survey.name
@@ -937,36 +1073,28 @@ class ExportBuilder(object):
             for section in self.sections:
                 # get data for this section and write to xls
                 section_name = section['name']
-                fields = self.get_fields(dataview, section, 'xpath')
 
-                ws = work_sheets[section_name]
                 # section might not exist within the output, e.g. data was
                 # not provided for said repeat - write test to check this
                 row = output.get(section_name, None)
                 if isinstance(row, dict):
-                    write_row(
-                        self.pre_process_row(row, section),
-                        ws, fields, work_sheet_titles)
+                    append_row(row, section)
                 elif isinstance(row, list):
                     for child_row in row:
-                        write_row(
-                            self.pre_process_row(child_row, section),
-                            ws, fields, work_sheet_titles)
+                        append_row(child_row, section)
             index += 1
             track_task_progress(i, total_records)
 
         wb.save(filename=path)
 
-    def to_flat_csv_export(self, path, data, username, id_string,
-                           filter_query, **kwargs):
+    def _get_csv_builder(self, username, id_string, filter_query, **kwargs):
         """
-        Generates a flattened CSV file for submitted data.
+        Returns the CSVDataFrameBuilder of a flattened CSV export.
         """
         # TODO resolve circular import
         from onadata.libs.utils.csv_builder import CSVDataFrameBuilder
         start = kwargs.get('start')
         end = kwargs.get('end')
-        dataview = kwargs.get('dataview')
         xform = kwargs.get('xform')
         options = kwargs.get('options')
         total_records = kwargs.get('total_records')
@@ -975,7 +1103,7 @@ class ExportBuilder(object):
         show_choice_labels = options.get('show_choice_labels', False)
         language = options.get('language')
 
-        csv_builder = CSVDataFrameBuilder(
+        return CSVDataFrameBuilder(
             username, id_string, filter_query, self.GROUP_DELIMITER,
             self.SPLIT_SELECT_MULTIPLES, self.BINARY_SELECT_MULTIPLES,
             start, end, self.TRUNCATE_GROUP_TITLE, xform,
@@ -987,7 +1115,42 @@ class ExportBuilder(object):
             show_choice_labels=show_choice_labels,
             include_reviews=self.INCLUDE_REVIEWS, language=language)
 
-        csv_builder.export_to(path, dataview=dataview)
+    def to_flat_csv_export(self, path, data, username, id_string,
+                           filter_query, **kwargs):
+        """
+        Generates a flattened CSV file for submitted data.
+        """
+        dataview = kwargs.get('dataview')
+        csv_builder = self._get_csv_builder(
+            username, id_string, filter_query, **kwargs)
+
+        incremental = kwargs.get('incremental')
+        csv_builder.export_to(
+            path, dataview=dataview,
+            columns=incremental['columns'] if incremental else None)
+        self.export_state = {'columns': csv_builder.columns}
+
+    def to_flat_csv_shard(self, path, data, username, id_string,
+                          filter_query, **kwargs):
+        """
+        Formats the records of a shard of a sharded flattened CSV export.
+        """
+        csv_builder = self._get_csv_builder(
+            username, id_string, filter_query, **kwargs)
+        self.export_state = {
+            'ordered_columns': csv_builder.export_shard_to(path, data)}
+
+    def merge_flat_csv_shards(self, path, shards, username, id_string,
+                              filter_query, **kwargs):
+        """
+        Generates a flattened CSV file from the shards of a sharded export,
+        (path, export_state) pairs written by to_flat_csv_shard.
+        """
+        csv_builder = self._get_csv_builder(
+            username, id_string, filter_query, **kwargs)
+        csv_builder.merge_shards_to(
+            path, [(shard_path, export_state['ordered_columns'])
+                   for (shard_path, export_state) in shards])
 
     def get_default_language(self, languages):
         language = self.dd.default_language
@@ -1266,6 +1429,174 @@ class ExportBuilder(object):
         for (section_name, sav_def) in iteritems(sav_defs):
             sav_def['sav_file'].close()
 
+    @classmethod
+    def get_arrow_type(cls, data_type):
+        """
+        Returns the Arrow type of the column of a survey element bind type,
+        strings for the types that are not converted.
+        """
+        if data_type == 'int':
+            return pyarrow.int64()
+        if data_type == 'decimal':
+            return pyarrow.float64()
+        if data_type == 'date':
+            return pyarrow.date32()
+        if data_type == 'dateTime':
+            return pyarrow.timestamp('us')
+
+        return pyarrow.string()
+
+    @classmethod
+    def to_arrow_value(cls, value, data_type):
+        """
+        Converts a value to the type of its column, values that can not be
+        converted are null.
+        """
+        if value is None or value == '':
+            return None
+        try:
+            if data_type == 'int':
+                return int(value)
+            if data_type == 'decimal':
+                return float(value)
+            if data_type == 'date':
+                if isinstance(value, datetime):
+                    return value.date()
+                value = string_to_date_with_xls_validation(value)
+
+                return value if isinstance(value, date) else None
+            if data_type == 'dateTime':
+                if not isinstance(value, datetime):
+                    value = cls.CONVERT_FUNCS['dateTime'](text(value))
+
+                return value.replace(tzinfo=None)
+        except (TypeError, ValueError):
+            return None
+
+        return text(value)
+
+    def _to_zipped_columnar(self, path, data, file_format, **kwargs):
+        """
+        Generates a zip file with a Parquet or Arrow IPC file per section.
+
+        The columns of a section are typed from the survey, integers,
+        decimals, dates and the geopoint components. Rows are written in row
+        groups, or record batches, of COLUMNAR_BATCH_SIZE rows per section.
+        """
+        if pyarrow is None:
+            raise ImportError(
+                _("pyarrow is required for %s exports.") % file_format)
+
+        dataview = kwargs.get('dataview')
+        total_records = kwargs.get('total_records')
+        extension = '.' + file_format
+
+        def open_writer(section):
+            elements = [
+                element for element in section['elements']
+                if not dataview or element['title'] in dataview.columns]
+            data_types = [element['type'] for element in elements] + [
+                self.EXTRA_FIELD_TYPES.get(column)
+                for column in self.extra_columns]
+            schema = pyarrow.schema([
+                pyarrow.field(title, self.get_arrow_type(data_type))
+                for title, data_type in zip(
+                    self.get_fields(dataview, section, 'title'),
+                    data_types)])
+            columnar_file = NamedTemporaryFile(suffix=extension)
+            if file_format == 'parquet':
+                writer = pyarrow.parquet.ParquetWriter(
+                    columnar_file.name, schema)
+            else:
+                writer = pyarrow.ipc.new_file(columnar_file.name, schema)
+
+            return {
+                'file': columnar_file, 'writer': writer, 'schema': schema,
+                'fields': self.get_fields(dataview, section, 'xpath'),
+                'types': data_types, 'columns': [[] for _t in data_types]}
+
+        def write_batch(columnar_def):
+            if not columnar_def['columns'][0]:
+                return
+            columnar_def['writer'].write_table(pyarrow.Table.from_arrays(
+                [pyarrow.array(column, type=field.type) for column, field in
+                 zip(columnar_def['columns'], columnar_def['schema'])],
+                schema=columnar_def['schema']))
+            columnar_def['columns'] = [[] for _t in columnar_def['types']]
+
+        def write_row(row, columnar_def):
+            for column, field, data_type in zip(
+                    columnar_def['columns'], columnar_def['fields'],
+                    columnar_def['types']):
+                column.append(self.to_arrow_value(row.get(field), data_type))
+            if len(columnar_def['columns'][0]) >= self.COLUMNAR_BATCH_SIZE:
+                write_batch(columnar_def)
+
+        columnar_defs = {}
+        for section in self.sections:
+            columnar_defs[section['name']] = open_writer(section)
+
+        media_xpaths = [] if not self.INCLUDE_IMAGES \
+            else self.dd.get_media_survey_xpaths()
+
+        index = 1
+        indices = {}
+        survey_name = self.survey.name
+        for i, d in enumerate(data, start=1):
+            # decode mongo section names
+            joined_export = dict_to_joined_export(d, index, indices,
+                                                  survey_name,
+                                                  self.survey, d,
+                                                  media_xpaths)
+            output = decode_mongo_encoded_section_names(joined_export)
+            # attach meta fields (index, parent_index, parent_table)
+            # output has keys for every section
+            if survey_name not in output:
+                output[survey_name] = {}
+            output[survey_name][INDEX] = index
+            output[survey_name][PARENT_INDEX] = -1
+            for section in self.sections:
+                section_name = section['name']
+                columnar_def = columnar_defs[section_name]
+                row = output.get(section_name, None)
+                if isinstance(row, dict):
+                    write_row(
+                        self.pre_process_row(row, section), columnar_def)
+                elif isinstance(row, list):
+                    for child_row in row:
+                        write_row(
+                            self.pre_process_row(child_row, section),
+                            columnar_def)
+            index += 1
+            track_task_progress(i, total_records)
+
+        for columnar_def in columnar_defs.values():
+            write_batch(columnar_def)
+            columnar_def['writer'].close()
+
+        # write zipfile
+        with ZipFile(path, 'w', ZIP_DEFLATED, allowZip64=True) as zip_file:
+            for (section_name, columnar_def) in iteritems(columnar_defs):
+                zip_file.write(
+                    columnar_def['file'].name,
+                    '_'.join(section_name.split('/')) + extension)
+
+        # close files when we are done
+        for columnar_def in columnar_defs.values():
+            columnar_def['file'].close()
+
+    def to_zipped_parquet(self, path, data, *args, **kwargs):
+        """
+        Generates a zip file with a Parquet file per section.
+        """
+        self._to_zipped_columnar(path, data, 'parquet', **kwargs)
+
+    def to_zipped_arrow(self, path, data, *args, **kwargs):
+        """
+        Generates a zip file with an Arrow IPC file per section.
+        """
+        self._to_zipped_columnar(path, data, 'arrow', **kwargs)
+
     def get_fields(self, dataview, section, key):
         """
         Return list of element value with the key in section['elements'].
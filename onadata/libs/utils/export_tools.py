@@ -8,6 +8,7 @@ import hashlib
 import json
 import os
 import re
+import shutil
 import sys
 from datetime import datetime, timedelta
 
@@ -17,10 +18,14 @@ from django.conf import settings
 from django.contrib.auth.models import User
 from django.core.files.base import File
 from django.core.files.storage import default_storage
+from django.core.cache import cache
 from django.core.files.temp import NamedTemporaryFile
+from django.db import connection
+from django.db.models import Max
 from django.db.models.query import QuerySet
 from django.shortcuts import render
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from django.utils.translation import ugettext as _
 from future.moves.urllib.parse import urlparse
 from future.utils import iteritems
@@ -34,14 +39,18 @@ from onadata.apps.main.models.meta_data import MetaData
 from onadata.apps.viewer.models.export import (Export,
                                                get_export_options_query_kwargs)
 from onadata.apps.viewer.models.parsed_instance import query_data
-from onadata.libs.exceptions import J2XException, NoRecordsFoundError
+from onadata.libs.exceptions import (IncrementalExportError, J2XException,
+                                     NoRecordsFoundError)
 from onadata.libs.utils.common_tags import (DATAVIEW_EXPORT,
                                             GROUPNAME_REMOVED_FLAG)
 from onadata.libs.utils.common_tools import (str_to_bool,
                                              cmp_to_key,
                                              report_exception,
                                              retry)
-from onadata.libs.utils.export_builder import ExportBuilder
+from onadata.libs.utils.cache_tools import EXPORT_SHARD_PROGRESS, safe_delete
+from onadata.libs.utils.export_builder import (DEFAULT_UPDATE_BATCH,
+                                               ExportBuilder,
+                                               track_task_progress)
 from onadata.libs.utils.model_tools import (get_columns_with_hxl,
                                             queryset_iterator)
 from onadata.libs.utils.osm import get_combined_osm
@@ -52,6 +61,22 @@ DEFAULT_GROUP_DELIMITER = '/'
 DEFAULT_INDEX_TAGS = ('[', ']')
 SUPPORTED_INDEX_TAGS = ('[', ']', '(', ')', '{', '}', '.', '_')
 EXPORT_QUERY_KEY = 'query'
+INCREMENTAL_EXPORT_KEY = 'incremental'
+INCREMENTAL_EXPORT_TYPES = [Export.CSV_EXPORT, Export.CSV_ZIP_EXPORT]
+SHARDED_EXPORT_TYPES = [Export.CSV_EXPORT, Export.CSV_ZIP_EXPORT]
+EXPORT_SHARD_FUNC_MAP = {
+    Export.CSV_EXPORT: 'to_flat_csv_shard',
+    Export.CSV_ZIP_EXPORT: 'to_zipped_csv',
+}
+EXPORT_MERGE_FUNC_MAP = {
+    Export.CSV_EXPORT: 'merge_flat_csv_shards',
+    Export.CSV_ZIP_EXPORT: 'merge_zipped_csv_shards',
+}
+EXPORT_SHARD_EXTENSIONS = {
+    Export.CSV_EXPORT: 'pickle',
+    Export.CSV_ZIP_EXPORT: Export.ZIP_EXPORT,
+}
+EXPORT_SHARD_PROGRESS_TIMEOUT = 86400
 MAX_RETRIES = 3
 
 
@@ -130,6 +155,8 @@ def generate_export(export_type, xform, export_id=None, options=None):
         Export.CSV_EXPORT: 'to_flat_csv_export',
         Export.CSV_ZIP_EXPORT: 'to_zipped_csv',
         Export.SAV_ZIP_EXPORT: 'to_zipped_sav',
+        Export.PARQUET_ZIP_EXPORT: 'to_zipped_parquet',
+        Export.ARROW_ZIP_EXPORT: 'to_zipped_arrow',
         Export.GOOGLE_SHEETS_EXPORT: 'to_google_sheets',
     }
 
@@ -140,21 +167,124 @@ def generate_export(export_type, xform, export_id=None, options=None):
     dataview = None
     if options.get("dataview_pk"):
         dataview = DataView.objects.get(pk=options.get("dataview_pk"))
-        records = dataview.query_data(dataview, all_data=True,
-                                      filter_query=filter_query)
-        total_records = dataview.query_data(dataview,
-                                            count=True)[0].get('count')
-    else:
-        records = query_data(xform, query=filter_query, start=start, end=end)
 
-        if filter_query:
-            total_records = query_data(xform, query=filter_query, start=start,
-                                       end=end, count=True)[0].get('count')
-        else:
-            total_records = xform.num_of_submissions
+    incremental_state = None
+    previous_export = None
+    if can_export_incrementally(xform, export_type, options):
+        incremental_state = {
+            'last_instance_id': xform.instances.aggregate(
+                last_instance_id=Max('id'))['last_instance_id'] or 0,
+            'date_modified': timezone.now().isoformat(),
+            'xform_hash': xform.get_hash(),
+            'count': 0
+        }
+        previous_export = get_incremental_export_base(
+            xform, export_type, options)
+        previous_state = previous_export.options[INCREMENTAL_EXPORT_KEY] \
+            if previous_export else {}
+        incremental_state = dict(previous_state, **incremental_state)
+        incremental_state['count'] = previous_state.get('count', 0)
+        full_filter_query = filter_query
+        filter_query = get_incremental_query(
+            filter_query, previous_state.get('last_instance_id'),
+            incremental_state['last_instance_id'])
+
+    records, total_records = _get_export_records(
+        xform, dataview, filter_query, start, end)
+
+    export_builder = get_export_builder(xform, export_type, options)
 
-    if isinstance(records, QuerySet):
-        records = records.iterator()
+    # 'win_excel_utf8' is only relevant for CSV exports
+    if 'win_excel_utf8' in options and export_type != Export.CSV_EXPORT:
+        del options['win_excel_utf8']
+    temp_file = NamedTemporaryFile(suffix=("." + extension))
+
+    if previous_export:
+        with default_storage.open(previous_export.filepath) as export_file:
+            shutil.copyfileobj(export_file, temp_file)
+        temp_file.flush()
+
+    columns_with_hxl = export_builder.INCLUDE_HXL and get_columns_with_hxl(
+        xform.survey_elements)
+
+    # get the export function by export type
+    func = getattr(export_builder, export_type_func_map[export_type])
+    try:
+        try:
+            func.__call__(
+                temp_file.name, records, username, id_string, filter_query,
+                start=start, end=end, dataview=dataview, xform=xform,
+                options=options, columns_with_hxl=columns_with_hxl,
+                total_records=total_records,
+                incremental=previous_state if previous_export else None
+            )
+        except IncrementalExportError:
+            # the new records do not fit in the previous export, generate
+            # the export in full
+            previous_export = None
+            incremental_state = {
+                key: incremental_state[key] for key in (
+                    'last_instance_id', 'date_modified', 'xform_hash')}
+            incremental_state['count'] = 0
+            filter_query = get_incremental_query(
+                full_filter_query, None,
+                incremental_state['last_instance_id'])
+            records, total_records = _get_export_records(
+                xform, dataview, filter_query, start, end)
+            temp_file.seek(0)
+            temp_file.truncate()
+            func.__call__(
+                temp_file.name, records, username, id_string, filter_query,
+                start=start, end=end, dataview=dataview, xform=xform,
+                options=options, columns_with_hxl=columns_with_hxl,
+                total_records=total_records
+            )
+    except NoRecordsFoundError:
+        pass
+    except SPSSIOError as e:
+        export = get_or_create_export(export_id, xform, export_type, options)
+        export.error_message = str(e)
+        export.internal_status = Export.FAILED
+        export.save()
+        report_exception("SAV Export Failure", e, sys.exc_info())
+        return export
+
+    export_filename = save_export_file(
+        temp_file, xform, export_type, extension, remove_group_name, dataview)
+    temp_file.close()
+
+    dir_name, basename = os.path.split(export_filename)
+
+    # get or create export object
+    export = get_or_create_export(export_id, xform, export_type, options)
+
+    export.filedir = dir_name
+    export.filename = basename
+    export.internal_status = Export.SUCCESSFUL
+    # do not persist exports that have a filter
+    # Get URL of the exported sheet.
+    if export_type == Export.GOOGLE_SHEETS_EXPORT:
+        export.export_url = export_builder.url
+
+    # keep what is needed to append the next submissions to this export
+    if incremental_state is not None and (
+            previous_export or export_builder.export_state):
+        incremental_state['count'] += total_records
+        incremental_state.update(export_builder.export_state or {})
+        export.options[INCREMENTAL_EXPORT_KEY] = incremental_state
+
+    # if we should create a new export is true, we should not save it
+    if start is None and end is None:
+        export.save()
+    return export
+
+
+def get_export_builder(xform, export_type, options):
+    """
+    Returns the ExportBuilder of an export set up with the export options.
+    """
+    remove_group_name = options.get("remove_group_name", False)
+    include_reviews = options.get('include_reviews', False)
 
     export_builder = ExportBuilder()
     export_builder.TRUNCATE_GROUP_TITLE = True \
@@ -169,7 +299,6 @@ def generate_export(export_type, xform, export_id=None, options=None):
         "binary_select_multiples", False
     )
     export_builder.INCLUDE_LABELS = options.get('include_labels', False)
-    include_reviews = options.get('include_reviews', False)
     export_builder.INCLUDE_LABELS_ONLY = options.get(
         'include_labels_only', False
     )
@@ -190,36 +319,20 @@ def generate_export(export_type, xform, export_id=None, options=None):
 
     export_builder.language = options.get('language')
 
-    # 'win_excel_utf8' is only relevant for CSV exports
-    if 'win_excel_utf8' in options and export_type != Export.CSV_EXPORT:
-        del options['win_excel_utf8']
     export_builder.INCLUDE_REVIEWS = include_reviews
     export_builder.set_survey(xform.survey, xform,
                               include_reviews=include_reviews)
 
-    temp_file = NamedTemporaryFile(suffix=("." + extension))
+    return export_builder
 
-    columns_with_hxl = export_builder.INCLUDE_HXL and get_columns_with_hxl(
-        xform.survey_elements)
 
-    # get the export function by export type
-    func = getattr(export_builder, export_type_func_map[export_type])
-    try:
-        func.__call__(
-            temp_file.name, records, username, id_string, filter_query,
-            start=start, end=end, dataview=dataview, xform=xform,
-            options=options, columns_with_hxl=columns_with_hxl,
-            total_records=total_records
-        )
-    except NoRecordsFoundError:
-        pass
-    except SPSSIOError as e:
-        export = get_or_create_export(export_id, xform, export_type, options)
-        export.error_message = str(e)
-        export.internal_status = Export.FAILED
-        export.save()
-        report_exception("SAV Export Failure", e, sys.exc_info())
-        return export
+def save_export_file(temp_file, xform, export_type, extension,
+                     remove_group_name=False, dataview=None):
+    """
+    Saves the export temp_file in storage and returns its name.
+    """
+    username = xform.user.username
+    id_string = xform.id_string
 
     # generate filename
     basename = "%s_%s" % (
@@ -246,26 +359,280 @@ def generate_export(export_type, xform, export_id=None, options=None):
 
     # seek to the beginning as required by storage classes
     temp_file.seek(0)
-    export_filename = default_storage.save(file_path,
-                                           File(temp_file, file_path))
+
+    return default_storage.save(file_path, File(temp_file, file_path))
+
+
+def _get_export_records(xform, dataview, filter_query, start, end):
+    """
+    Returns the records to export and the number of records.
+    """
+    if dataview:
+        records = dataview.query_data(dataview, all_data=True,
+                                      filter_query=filter_query)
+        total_records = dataview.query_data(dataview,
+                                            count=True)[0].get('count')
+    else:
+        records = query_data(xform, query=filter_query, start=start, end=end)
+
+        if filter_query:
+            total_records = query_data(xform, query=filter_query, start=start,
+                                       end=end, count=True)[0].get('count')
+        else:
+            total_records = xform.num_of_submissions
+
+    if isinstance(records, QuerySet):
+        records = records.iterator()
+
+    return records, total_records
+
+
+def can_export_incrementally(xform, export_type, options):
+    """
+    Returns True if the export can be generated by appending the new
+    submissions to a previous export.
+    """
+    return getattr(settings, 'ENABLE_INCREMENTAL_EXPORTS', False) and \
+        export_type in INCREMENTAL_EXPORT_TYPES and \
+        not xform.is_merged_dataset and \
+        not options.get("dataview_pk") and \
+        options.get("start") is None and options.get("end") is None and \
+        get_incremental_query(options.get(EXPORT_QUERY_KEY), 0, 0) is not None
+
+
+def get_incremental_query(filter_query, min_instance_id, max_instance_id):
+    """
+    Returns filter_query as a JSON string restricted to the submissions with
+    an id greater than min_instance_id and less than or equal to
+    max_instance_id. Returns None if the filter_query can not be restricted.
+    """
+    query = {}
+    if filter_query:
+        if isinstance(filter_query, six.string_types):
+            try:
+                query = json.loads(filter_query)
+            except ValueError:
+                return None
+        else:
+            query = dict(filter_query)
+
+        if not isinstance(query, dict) or '_id' in query:
+            return None
+
+    query['_id'] = {'$lte': max_instance_id}
+    if min_instance_id is not None:
+        query['_id']['$gt'] = min_instance_id
+
+    return json.dumps(query)
+
+
+def get_incremental_export_base(xform, export_type, options):
+    """
+    Returns the latest export with the same options whose file the
+    submissions received since it was created can be appended to. Returns
+    None if the export has to be generated in full i.e. submissions in the
+    previous export have since been edited or deleted.
+    """
+    export_options_kwargs = get_export_options_query_kwargs(options)
+    export_query = Export.objects.filter(
+        xform=xform,
+        export_type=export_type,
+        internal_status=Export.SUCCESSFUL,
+        options__has_key=INCREMENTAL_EXPORT_KEY,
+        **export_options_kwargs
+    )
+    if options.get(EXPORT_QUERY_KEY) is None:
+        export_query = export_query.exclude(options__has_key=EXPORT_QUERY_KEY)
+
+    try:
+        export = export_query.latest('created_on')
+    except Export.DoesNotExist:
+        return None
+
+    state = export.options[INCREMENTAL_EXPORT_KEY]
+    if state.get('xform_hash') != xform.get_hash() or \
+            not export.filepath or not default_storage.exists(export.filepath):
+        return None
+
+    # submissions edited since the export was generated
+    if xform.instances.filter(
+            id__lte=state['last_instance_id'],
+            date_modified__gt=parse_datetime(state['date_modified'])).exists():
+        return None
+
+    # submissions deleted, or committed late, since the export was generated
+    count = query_data(
+        xform, query=get_incremental_query(
+            options.get(EXPORT_QUERY_KEY), None, state['last_instance_id']),
+        count=True)[0].get('count')
+    if count != state['count']:
+        return None
+
+    return export
+
+
+def can_export_in_shards(xform, export_type, options):
+    """
+    Returns True if the export should be generated by formatting shards of
+    EXPORT_SHARD_SIZE submissions in parallel tasks. Exports that can be
+    generated incrementally are not sharded.
+    """
+    shard_size = getattr(settings, 'EXPORT_SHARD_SIZE', None)
+
+    return bool(shard_size) and \
+        export_type in SHARDED_EXPORT_TYPES and \
+        not xform.is_merged_dataset and \
+        not options.get("dataview_pk") and \
+        options.get("start") is None and options.get("end") is None and \
+        get_incremental_query(
+            options.get(EXPORT_QUERY_KEY), 0, 0) is not None and \
+        not can_export_incrementally(xform, export_type, options) and \
+        xform.num_of_submissions > shard_size
+
+
+def get_export_shards(xform, shard_size):
+    """
+    Returns the (min_instance_id, max_instance_id) ranges of Instance.id,
+    with shard_size submissions each, that split the submissions of xform.
+    """
+    cursor = connection.cursor()
+    cursor.execute(
+        'SELECT id FROM (SELECT id, row_number() OVER (ORDER BY id) AS row '
+        'FROM logger_instance WHERE xform_id = %s AND deleted_at IS NULL) '
+        'AS instances WHERE instances.row %% %s = 0 ORDER BY id',
+        [xform.pk, shard_size])
+    max_instance_ids = [row[0] for row in cursor.fetchall()]
+    last_instance_id = xform.instances.filter(
+        deleted_at__isnull=True).aggregate(
+            last_instance_id=Max('id'))['last_instance_id']
+    if last_instance_id and last_instance_id not in max_instance_ids[-1:]:
+        max_instance_ids.append(last_instance_id)
+
+    return list(zip([None] + max_instance_ids[:-1], max_instance_ids))
+
+
+def _track_export_shard_progress(records, export_id, task_id, total=None):
+    """
+    Yields the records of an export shard, the number of records formatted
+    by all the shards of the export is reported as the progress of the task
+    with the id task_id.
+    """
+    batchsize = getattr(settings, 'EXPORT_TASK_PROGRESS_UPDATE_BATCH',
+                        DEFAULT_UPDATE_BATCH)
+    key = '{}{}'.format(EXPORT_SHARD_PROGRESS, export_id)
+    cache.add(key, 0, EXPORT_SHARD_PROGRESS_TIMEOUT)
+
+    for i, record in enumerate(records, start=1):
+        yield record
+        if i % batchsize == 0:
+            try:
+                batches = cache.incr(key)
+            except ValueError:
+                continue
+            track_task_progress(batches * batchsize, total, task_id=task_id)
+
+
+def _get_export_shard_path(xform, export_type, export_id, shard, extension):
+    return os.path.join(
+        xform.user.username, 'exports', xform.id_string, export_type,
+        'shards', '{}_{}.{}'.format(export_id, shard, extension))
+
+
+def generate_export_shard(export_type, xform, export_id, shard,
+                          min_instance_id, max_instance_id, options):
+    """
+    Formats the submissions of a shard of a sharded export, the submissions
+    with an id greater than min_instance_id and less than or equal to
+    max_instance_id, and saves them in storage.
+
+    Returns the name of the shard file and the export state needed to merge
+    it with the other shards in merge_export_shards.
+
+    param: options: the export options, and
+        task_id: id of the task the progress of the export is reported to
+        total_records: number of records in the export
+    """
+    filter_query = get_incremental_query(
+        options.get(EXPORT_QUERY_KEY), min_instance_id, max_instance_id)
+    records = query_data(xform, query=filter_query)
+    if isinstance(records, QuerySet):
+        records = records.iterator()
+    records = _track_export_shard_progress(
+        records, export_id, options.get('task_id'),
+        options.get('total_records'))
+
+    export_builder = get_export_builder(xform, export_type, options)
+    func = getattr(export_builder, EXPORT_SHARD_FUNC_MAP[export_type])
+
+    extension = EXPORT_SHARD_EXTENSIONS[export_type]
+    temp_file = NamedTemporaryFile(suffix="." + extension)
+    func.__call__(
+        temp_file.name, records, xform.user.username, xform.id_string,
+        filter_query, xform=xform, options=options, include_headers=False)
+
+    file_path = _get_export_shard_path(
+        xform, export_type, export_id, shard, extension)
+    temp_file.seek(0)
+    shard_filename = default_storage.save(
+        file_path, File(temp_file, file_path))
     temp_file.close()
 
+    return {
+        'filename': shard_filename,
+        'export_state': export_builder.export_state
+    }
+
+
+def merge_export_shards(export_type, xform, export_id, shards, options):
+    """
+    Generates a sharded export from its shards, the return values of
+    generate_export_shard in the order of the shards, and returns the export
+    object.
+    """
+    extension = options.get("extension", export_type)
+    remove_group_name = options.get("remove_group_name", False)
+
+    export_builder = get_export_builder(xform, export_type, options)
+    func = getattr(export_builder, EXPORT_MERGE_FUNC_MAP[export_type])
+    columns_with_hxl = export_builder.INCLUDE_HXL and get_columns_with_hxl(
+        xform.survey_elements)
+
+    # copy the shard files from storage
+    shard_files = []
+    for shard in shards:
+        shard_file = NamedTemporaryFile(
+            suffix="." + EXPORT_SHARD_EXTENSIONS[export_type])
+        with default_storage.open(shard['filename']) as storage_file:
+            shutil.copyfileobj(storage_file, shard_file)
+        shard_file.flush()
+        shard_files.append(shard_file)
+
+    temp_file = NamedTemporaryFile(suffix=("." + extension))
+    func.__call__(
+        temp_file.name,
+        [(shard_file.name, shard['export_state'])
+         for (shard_file, shard) in zip(shard_files, shards)],
+        xform.user.username, xform.id_string, options.get(EXPORT_QUERY_KEY),
+        xform=xform, options=options, columns_with_hxl=columns_with_hxl,
+        total_records=options.get('total_records'))
+
+    export_filename = save_export_file(
+        temp_file, xform, export_type, extension, remove_group_name)
+    temp_file.close()
+
+    for (shard_file, shard) in zip(shard_files, shards):
+        shard_file.close()
+        default_storage.delete(shard['filename'])
+    safe_delete('{}{}'.format(EXPORT_SHARD_PROGRESS, export_id))
+
     dir_name, basename = os.path.split(export_filename)
 
-    # get or create export object
     export = get_or_create_export(export_id, xform, export_type, options)
-
     export.filedir = dir_name
     export.filename = basename
     export.internal_status = Export.SUCCESSFUL
-    # do not persist exports that have a filter
-    # Get URL of the exported sheet.
-    if export_type == Export.GOOGLE_SHEETS_EXPORT:
-        export.export_url = export_builder.url
+    export.save()
 
-    # if we should create a new export is true, we should not save it
-    if start is None and end is None:
-        export.save()
     return export
 
 
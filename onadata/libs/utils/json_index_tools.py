@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+"""
+Submission JSON index tools.
+
+Filters on submission data, the query= parameter of the data endpoint and
+DataView filters, compare json->>'field' expressions of the submissions of a
+form. The fields of a form declared as indexed fields, by the form owner or
+automatically once they have been queried often enough, get a partial
+expression index on logger_instance so that these filters are index scans
+instead of scans of all the submissions of the form.
+"""
+import json
+import logging
+from hashlib import md5
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, connection
+from six import string_types
+
+from onadata.libs.utils.cache_tools import JSON_QUERY_FIELD_COUNT
+from onadata.libs.utils.common_tags import INDEXED_FIELD
+
+JSON_INDEX_PREFIX = 'logger_instance_json_'
+# maximum number of indexed fields of a form
+JSON_INDEX_MAX_FIELDS = 10
+# seconds the queries on a field are counted for before the count restarts
+JSON_INDEX_AUTO_WINDOW = 24 * 60 * 60
+# fields are no longer indexed automatically once there are this many
+# indexed fields on all the forms
+JSON_INDEX_AUTO_MAX_INDEXES = 100
+
+# submission json keys that are filtered on model fields
+NON_JSON_QUERY_FIELDS = ['_submission_time', '_date_modified', '_id',
+                         '_version', '_last_edited']
+
+
+def get_json_index_name(xform_id, field):
+    """
+    Returns the name of the index of a field of an XForm.
+    """
+    digest = md5(field.encode('utf-8')).hexdigest()[:12]
+
+    return '{}{}_{}'.format(JSON_INDEX_PREFIX, xform_id, digest)
+
+
+def create_json_index(xform_id, field):
+    """
+    Creates the index of json->>'field' on the submissions of an XForm,
+    the index is matched by the field filters of get_where_clause and
+    DataView._get_where_clause.
+    """
+    # indexes are built without locking submissions out unless in a
+    # transaction, CREATE INDEX CONCURRENTLY can not be run in one
+    concurrently = '' if connection.in_atomic_block else 'CONCURRENTLY'
+    sql = (u"CREATE INDEX {} IF NOT EXISTS {} ON logger_instance "
+           u"((json->>%s)) WHERE xform_id = %s").format(
+               concurrently, get_json_index_name(xform_id, field))
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [field, int(xform_id)])
+    except DatabaseError:
+        logging.exception(
+            'Failed to index field %s of XForm %s', field, xform_id)
+        if not connection.in_atomic_block:
+            # a failed concurrent build leaves an invalid index behind
+            drop_json_index(xform_id, field)
+
+        return False
+
+    return True
+
+
+def drop_json_index(xform_id, field):
+    """
+    Drops the index of a field of an XForm.
+    """
+    concurrently = '' if connection.in_atomic_block else 'CONCURRENTLY'
+    sql = u"DROP INDEX {} IF EXISTS {}".format(
+        concurrently, get_json_index_name(xform_id, field))
+    with connection.cursor() as cursor:
+        cursor.execute(sql)
+
+
+def get_indexed_fields(xform):
+    """
+    Returns the indexed fields of an XForm.
+    """
+    from onadata.apps.main.models.meta_data import type_for_form
+
+    return list(type_for_form(xform, INDEXED_FIELD).filter(
+        deleted_at__isnull=True).values_list('data_value', flat=True))
+
+
+def get_query_fields(query):
+    """
+    Returns the submission json keys filtered on by a query= filter.
+    """
+    if isinstance(query, string_types):
+        try:
+            query = json.loads(query)
+        except ValueError:
+            # a text search of all the fields
+            return []
+    if isinstance(query, list):
+        fields = []
+        for qry in query:
+            fields.extend(
+                f for f in get_query_fields(qry) if f not in fields)
+
+        return fields
+    if not isinstance(query, dict):
+        return []
+
+    fields = []
+    for key, value in query.items():
+        if key == '$or' and isinstance(value, list):
+            keys = [k for or_query in value if isinstance(or_query, dict)
+                    for k in or_query]
+        else:
+            keys = [key]
+        fields.extend(
+            k for k in keys if isinstance(k, string_types) and
+            k not in NON_JSON_QUERY_FIELDS and k not in fields)
+
+    return fields
+
+
+def get_indexed_field_count():
+    """
+    Returns the number of indexed fields of all the forms.
+    """
+    from onadata.apps.main.models.meta_data import MetaData
+
+    return MetaData.objects.filter(
+        data_type=INDEXED_FIELD, deleted_at__isnull=True).count()
+
+
+def record_query_fields(xform, query):
+    """
+    Counts the queries on each field of an XForm and indexes the fields that
+    are queried JSON_INDEX_AUTO_THRESHOLD times in JSON_INDEX_AUTO_WINDOW
+    seconds, until there are JSON_INDEX_AUTO_MAX_INDEXES indexed fields.
+    Fields are not indexed automatically when the threshold is not set.
+    """
+    threshold = getattr(settings, 'JSON_INDEX_AUTO_THRESHOLD', None)
+    if not threshold or xform is None or xform.is_merged_dataset:
+        return
+
+    window = getattr(
+        settings, 'JSON_INDEX_AUTO_WINDOW', JSON_INDEX_AUTO_WINDOW)
+    max_indexes = getattr(
+        settings, 'JSON_INDEX_AUTO_MAX_INDEXES', JSON_INDEX_AUTO_MAX_INDEXES)
+    for field in get_query_fields(query):
+        key = '{}{}-{}'.format(
+            JSON_QUERY_FIELD_COUNT, xform.pk,
+            md5(field.encode('utf-8')).hexdigest())
+        cache.add(key, 0, window)
+        try:
+            count = cache.incr(key)
+        except ValueError:
+            continue
+        if count == threshold and xform.get_element(field) is not None \
+                and get_indexed_field_count() < max_indexes:
+            add_indexed_field(xform, field)
+
+
+def add_indexed_field(xform, field):
+    """
+    Declares a field of an XForm as indexed, the index is created once the
+    MetaData is saved. Returns the MetaData or None when the form already
+    has JSON_INDEX_MAX_FIELDS indexed fields.
+    """
+    from onadata.apps.main.models.meta_data import MetaData
+
+    max_fields = getattr(
+        settings, 'JSON_INDEX_MAX_FIELDS', JSON_INDEX_MAX_FIELDS)
+    indexed_fields = get_indexed_fields(xform)
+    if field not in indexed_fields and len(indexed_fields) >= max_fields:
+        return None
+
+    return MetaData.indexed_field(xform, field)
@@ -91,8 +91,14 @@ def create_xform_version(xform: XForm, user: User) -> XFormVersion:
 
 def _get_instance(xml, new_uuid, submitted_by, status, xform, checksum,
                   request=None):
+    """
+    Returns the Instance of a submission, the verb of the message sent once
+    it is saved and whether it edits a previous submission. A new or edited
+    Instance is returned unsaved.
+    """
     history = None
     instance = None
+    edited = False
     message_verb = SUBMISSION_EDITED
     # check if its an edit submission
     old_uuid = get_deprecated_uuid_from_xml(xml)
@@ -120,26 +126,17 @@ def _get_instance(xml, new_uuid, submitted_by, status, xform, checksum,
             instance.last_edited = last_edited
             instance.uuid = new_uuid
             instance.checksum = checksum
-            instance.save()
-
-            # call webhooks
-            process_submission.send(sender=instance.__class__,
-                                    instance=instance)
+            edited = True
         elif history:
             instance = history.xform_instance
     if old_uuid is None or (instance is None and history is None):
         # new submission
         message_verb = SUBMISSION_CREATED
-        instance = Instance.objects.create(
+        instance = Instance(
             xml=xml, user=submitted_by, status=status, xform=xform,
             checksum=checksum)
 
-    # send notification on submission creation
-    send_message(
-        instance_id=instance.id, target_id=instance.xform.id,
-        target_type=XFORM, user=instance.user or instance.xform.user,
-        message_verb=message_verb)
-    return instance
+    return instance, message_verb, edited
 
 
 def dict2xform(jsform, form_id, root=None, username=None, gen_uuid=False):
@@ -332,22 +329,29 @@ def check_submission_encryption(xform: XForm, xml: bytes) -> NoReturn:
             "Unencrypted submissions are not allowed for encrypted forms."))
 
 
-def update_attachment_tracking(instance):
+def update_attachment_tracking(instance, save=True):
     """
     Takes an Instance object and updates attachment tracking fields
     """
     instance.total_media = instance.num_of_media
     instance.media_count = instance.attachments_count
     instance.media_all_received = instance.media_count == instance.total_media
-    instance.save(update_fields=['total_media', 'media_count',
-                                 'media_all_received', 'json'])
+    if save:
+        instance.save(update_fields=['total_media', 'media_count',
+                                     'media_all_received', 'json'])
 
 
-def save_attachments(xform, instance, media_files, remove_deleted_media=False):
+def save_attachments(xform, instance, media_files, remove_deleted_media=False,
+                     save=True):
     """
     Saves attachments for the given instance/submission.
+
+    The attachments of a new submission, whose id has been allocated, are
+    created with a single insert. When save is False the attachment tracking
+    fields are set but the instance is not saved.
     """
     # upload_path = os.path.join(instance.xform.user.username, 'attachments')
+    new_attachments = []
 
     for f in media_files:
         filename, extension = os.path.splitext(f.name)
@@ -367,30 +371,44 @@ def save_attachments(xform, instance, media_files, remove_deleted_media=False):
              isinstance(instance.xml, bytes) else
              instance.xml.find(filename) != -1])
         if media_in_submission:
-            Attachment.objects.get_or_create(
-                instance=instance,
-                media_file=f,
-                mimetype=content_type,
-                name=filename,
-                extension=extension)
+            if instance._state.adding:
+                attachment = Attachment(
+                    instance=instance,
+                    media_file=f,
+                    mimetype=content_type,
+                    name=filename,
+                    extension=extension)
+                attachment.set_file_details()
+                new_attachments.append(attachment)
+            else:
+                Attachment.objects.get_or_create(
+                    instance=instance,
+                    media_file=f,
+                    mimetype=content_type,
+                    name=filename,
+                    extension=extension)
+    if new_attachments:
+        Attachment.objects.bulk_create(new_attachments)
     if remove_deleted_media:
         instance.soft_delete_attachments()
 
-    update_attachment_tracking(instance)
+    update_attachment_tracking(instance, save=save)
 
 
 def save_submission(xform, xml, media_files, new_uuid, submitted_by, status,
                     date_created_override, checksum, request=None):
+    """
+    Saves a submission and its attachments, must be called in a transaction.
+
+    The id of a new submission is allocated first, its attachments are
+    created with a single insert and the submission, with its full json and
+    attachment tracking fields, with another.
+    """
     if not date_created_override:
         date_created_override = get_submission_date_from_xml(xml)
 
-    instance = _get_instance(xml, new_uuid, submitted_by, status, xform,
-                             checksum, request)
-    save_attachments(
-        xform,
-        instance,
-        media_files,
-        remove_deleted_media=True)
+    instance, message_verb, edited = _get_instance(
+        xml, new_uuid, submitted_by, status, xform, checksum, request)
 
     # override date created if required
     if date_created_override:
@@ -399,14 +417,41 @@ def save_submission(xform, xml, media_files, new_uuid, submitted_by, status,
             date_created_override = timezone.make_aware(
                 date_created_override, timezone.utc)
         instance.date_created = date_created_override
-        instance.save()
 
-    if instance.xform is not None:
+    created = instance.pk is None
+    if created and instance.allocate_id():
+        # the attachments are inserted before the submission they reference,
+        # the foreign key constraint is checked when the transaction commits
+        save_attachments(
+            xform, instance, media_files, remove_deleted_media=True,
+            save=False)
+        instance.save(force_insert=True)
+    else:
+        if created:
+            instance.save()
+        save_attachments(
+            xform, instance, media_files, remove_deleted_media=True,
+            save=False)
         instance.save()
+
+    if created:
+        ParsedInstance.objects.create(instance=instance)
+    else:
         pi, created = ParsedInstance.objects.get_or_create(instance=instance)
         if not created:
             pi.save()  # noqa
 
+    if edited:
+        # call webhooks
+        process_submission.send(sender=instance.__class__,
+                                instance=instance)
+
+    # send notification on submission creation
+    send_message(
+        instance_id=instance.id, target_id=instance.xform.id,
+        target_type=XFORM, user=instance.user or instance.xform.user,
+        message_verb=message_verb)
+
     return instance
 
 
@@ -549,11 +594,7 @@ def safe_create_instance(
         response.status_code = 400
         error = response
     except DuplicateInstance:
-        response = OpenRosaResponse(_(u"Duplicate submission"))
-        response.status_code = 202
-        if request:
-            response['Location'] = request.build_absolute_uri(request.path)
-        error = response
+        error = get_duplicate_submission_response(request)
     except PermissionDenied as e:
         error = OpenRosaResponseForbidden(e)
     except UnreadablePostError as e:
@@ -573,15 +614,23 @@ def safe_create_instance(
     except DataError as e:
         error = OpenRosaResponseBadRequest((str(e)))
     if isinstance(instance, DuplicateInstance):
-        response = OpenRosaResponse(_(u"Duplicate submission"))
-        response.status_code = 202
-        if request:
-            response['Location'] = request.build_absolute_uri(request.path)
-        error = response
+        error = get_duplicate_submission_response(request)
         instance = None
     return [error, instance]
 
 
+def get_duplicate_submission_response(request=None):
+    """
+    Returns the response to a submission that has already been received.
+    """
+    response = OpenRosaResponse(_(u"Duplicate submission"))
+    response.status_code = 202
+    if request:
+        response['Location'] = request.build_absolute_uri(request.path)
+
+    return response
+
+
 def response_with_mimetype_and_name(mimetype,
                                     name,
                                     extension=None,
@@ -28,6 +28,28 @@ def queryset_iterator(queryset, chunksize=100):
     return queryset.iterator(chunk_size=chunksize)
 
 
+def queryset_keyset_iterator(queryset, chunksize=100):
+    '''
+    Iterate over a Django Queryset in primary key order.
+
+    Each chunk of chunksize rows is read with its own query for primary keys
+    greater than the last one of the previous chunk, so rows are streamed
+    without holding a server side cursor open for the whole iteration.
+    '''
+    queryset = queryset.order_by('pk')
+    last_pk = None
+    while True:
+        chunk_queryset = queryset if last_pk is None else \
+            queryset.filter(pk__gt=last_pk)
+        chunk = list(chunk_queryset[:chunksize])
+        for obj in chunk:
+            yield obj
+
+        if len(chunk) < chunksize:
+            break
+        last_pk = chunk[-1].pk
+
+
 def get_columns_with_hxl(survey_elements):
     '''
     Returns a dictionary whose keys are xform field names and values are
@@ -0,0 +1,152 @@
+"""
+Process-wide cache of compiled XForm surveys.
+
+Building the pyxform Survey of an XForm from XForm.json, and the lookups
+derived from it, was repeated by every request and task that loaded the
+XForm. Compiled surveys are kept in a least recently used cache shared by
+the threads of a worker process, keyed by the XForm primary key and hash so
+that a replaced form is compiled again.
+"""
+import threading
+from builtins import bytes as b
+from collections import OrderedDict
+
+from django.conf import settings
+from pyxform import SurveyElementBuilder, constants
+from pyxform.xform2json import create_survey_element_from_xml
+
+from onadata.libs.utils.common_tags import KNOWN_MEDIA_TYPES
+
+SURVEY_CACHE_SIZE = 128
+
+
+def build_survey(xform):
+    """
+    Returns the pyxform Survey of an XForm, built from XForm.json or from
+    XForm.xml when the json is not valid.
+    """
+    try:
+        builder = SurveyElementBuilder()
+        return builder.create_survey_element_from_json(xform.json)
+    except ValueError:
+        xml = b(bytearray(xform.xml, encoding='utf-8'))
+        return create_survey_element_from_xml(xml)
+
+
+class CompiledSurvey(object):
+    """
+    A pyxform Survey together with the lookups on its survey elements.
+    """
+
+    def __init__(self, survey):
+        self.survey = survey
+        self.elements = list(survey.iter_descendants())
+        self.xpath_elements = {}
+        self.xpath_types = {}
+        self.type_elements = {}
+        for element in self.elements:
+            xpath = element.get_abbreviated_xpath()
+            self.xpath_elements[xpath] = element
+            self.xpath_types[xpath] = element.type
+            self.type_elements.setdefault(element.type, []).append(element)
+
+        self.elements_with_choices = [
+            e for e in self.elements
+            if e.type in [constants.SELECT_ONE,
+                          constants.SELECT_ALL_THAT_APPLY]]
+        self.repeat_xpaths = self._get_xpaths_of_type([u'repeat'])
+        self.select_one_xpaths = self._get_xpaths_of_type(
+            [constants.SELECT_ONE])
+        self.select_multiple_xpaths = self._get_xpaths_of_type(
+            [constants.SELECT_ALL_THAT_APPLY])
+        self.media_xpaths = self._get_xpaths_of_type(KNOWN_MEDIA_TYPES)
+        self.geopoint_xpaths = [
+            e.get_abbreviated_xpath() for e in self.elements
+            if e.bind.get(u'type') == u'geopoint']
+
+    def get_elements_of_type(self, element_type):
+        """
+        Returns the survey elements of a type in the order of the survey.
+        """
+        return self.type_elements.get(element_type, [])
+
+    def _get_xpaths_of_type(self, element_types):
+        return [
+            e.get_abbreviated_xpath()
+            for element_type in element_types
+            for e in self.get_elements_of_type(element_type)]
+
+
+class SurveyCache(object):
+    """
+    A thread safe least recently used cache of CompiledSurvey objects, the
+    size is set by the SURVEY_CACHE_SIZE setting.
+    """
+
+    def __init__(self):
+        self._surveys = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def maxsize(self):
+        return getattr(settings, 'SURVEY_CACHE_SIZE', SURVEY_CACHE_SIZE)
+
+    def get(self, xform):
+        """
+        Returns the CompiledSurvey of an XForm, compiling it on a miss.
+        XForms that have not been saved are compiled but not cached.
+        """
+        if xform.pk is None or not self.maxsize:
+            return CompiledSurvey(build_survey(xform))
+
+        key = (xform.pk, xform.hash or xform.get_hash())
+        with self._lock:
+            compiled_survey = self._surveys.get(key)
+            if compiled_survey is not None:
+                self._surveys.move_to_end(key)
+                self.hits += 1
+
+                return compiled_survey
+            self.misses += 1
+
+        compiled_survey = CompiledSurvey(build_survey(xform))
+        with self._lock:
+            self._surveys[key] = compiled_survey
+            while len(self._surveys) > self.maxsize:
+                self._surveys.popitem(last=False)
+
+        return compiled_survey
+
+    def invalidate(self, xform_id):
+        """
+        Removes the compiled surveys of an XForm from the cache.
+        """
+        with self._lock:
+            for key in [k for k in self._surveys if k[0] == xform_id]:
+                del self._surveys[key]
+
+    def clear(self):
+        """
+        Removes all compiled surveys from the cache and resets the counters.
+        """
+        with self._lock:
+            self._surveys.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        """
+        Returns the hit and miss counters and the size of the cache.
+        """
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self._surveys),
+                'maxsize': self.maxsize,
+            }
+
+
+survey_cache = SurveyCache()
@@ -12,6 +12,8 @@ from guardian.shortcuts import assign_perm, get_perms_for_model
 
 from onadata.apps.api.models import OrganizationProfile, Team, TempToken
 from onadata.apps.logger.models import MergedXForm, Note, Project, XForm
+from onadata.apps.logger.models.submission_count import \
+    get_pending_submission_count
 from onadata.apps.main.models import UserProfile
 from onadata.libs.utils.viewer_tools import get_form
 
@@ -49,7 +51,8 @@ def set_profile_data(data, content_user):
         location += profile.country
     forms = content_user.xforms.filter(shared__exact=1)
     num_forms = forms.count()
-    user_instances = profile.num_of_submissions
+    user_instances = profile.num_of_submissions + \
+        get_pending_submission_count(user_id=content_user.pk)
     home_page = profile.home_page
     if home_page and re.match("http", home_page) is None:
         home_page = "http://%s" % home_page
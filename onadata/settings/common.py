@@ -463,7 +463,28 @@ CELERY_TASK_ALWAYS_EAGER = False
 CELERY_TASK_IGNORE_RESULT = False
 CELERY_TASK_TRACK_STARTED = True
 CELERY_IMPORTS = ('onadata.libs.utils.csv_import',)
+CELERY_BEAT_SCHEDULE = {
+    'flush-submission-count-deltas': {
+        'task': 'onadata.apps.logger.models.submission_count.'
+                'flush_submission_count_deltas',
+        'schedule': 60.0,
+    },
+    'schedule-stale-queues': {
+        'task': 'onadata.apps.logger.models.queued_item.'
+                'schedule_stale_queues',
+        'schedule': 300.0,
+    },
+}
+
+# with ASYNC_POST_SUBMISSION_PROCESSING_ENABLED, queue submissions and process
+# the submissions received within POST_SUBMISSION_BATCH_WINDOW seconds together
+POST_SUBMISSION_BATCH_PROCESSING_ENABLED = False
+POST_SUBMISSION_BATCH_WINDOW = 5
+POST_SUBMISSION_BATCH_SIZE = 1000
 
+# record submission count changes as rows added to the form and user
+# submission counts by the flush-submission-count-deltas task
+SUBMISSION_COUNT_DELTAS_ENABLED = False
 
 CSV_FILESIZE_IMPORT_ASYNC_THRESHOLD = 100000  # Bytes
 GOOGLE_SHEET_UPLOAD_BATCH = 1000
@@ -541,6 +562,8 @@ SEND_EMAIL_ACTIVATION_API = False
 METADATA_SEPARATOR = "|"
 
 PARSED_INSTANCE_DEFAULT_LIMIT = 1000000
+# number of rows fetched at a time when streaming submissions with a
+# server-side cursor
 PARSED_INSTANCE_DEFAULT_BATCHSIZE = 1000
 
 PROFILE_SERIALIZER = \
@@ -552,6 +575,45 @@ BASE_VIEWSET = "onadata.libs.baseviewset.DefaultBaseViewset"
 path = os.path.join(PROJECT_ROOT, "..", "extras", "reserved_accounts.txt")
 
 EXPORT_WITH_IMAGE_DEFAULT = True
+# append new submissions to the previous CSV export instead of regenerating it
+ENABLE_INCREMENTAL_EXPORTS = False
+# number of submissions formatted by each task of a CSV export generated
+# in parallel, None generates every export in a single task
+EXPORT_SHARD_SIZE = None
+# number of compiled XForm surveys kept in memory by each worker process
+SURVEY_CACHE_SIZE = 128
+# number of submissions inserted together by CSV and Briefcase imports
+BULK_IMPORT_BATCH_SIZE = 1000
+# number of queries on a form field after which the field is indexed, None
+# only indexes the fields declared as indexed fields of a form
+JSON_INDEX_AUTO_THRESHOLD = None
+JSON_INDEX_MAX_FIELDS = 10
+# seconds the queries on a field are counted for, and the number of indexed
+# fields of all the forms after which fields are no longer indexed
+# automatically
+JSON_INDEX_AUTO_WINDOW = 24 * 60 * 60
+JSON_INDEX_AUTO_MAX_INDEXES = 100
+# seconds chart and statistics aggregates are cached for, 0 disables caching
+AGGREGATE_CACHE_TIMEOUT = 24 * 60 * 60
+# (connect, read) timeout in seconds of the calls to REST services
+REST_SERVICE_TIMEOUT = (5, 30)
+# connections kept open to each REST service host by each worker process
+REST_SERVICE_POOL_SIZE = 10
+# REST services called at the same time for a submission
+REST_SERVICE_MAX_WORKERS = 5
+# failed REST service calls are retried REST_SERVICE_MAX_RETRIES times, the
+# first retry after REST_SERVICE_RETRY_BACKOFF seconds doubled on each retry
+REST_SERVICE_MAX_RETRIES = 5
+REST_SERVICE_RETRY_BACKOFF = 30
+# with MESSAGING_ASYNC_NOTIFICATION, actions are sent to the notification
+# backends in batches of the actions of NOTIFICATION_BATCH_WINDOW seconds,
+# MQTT messages combine the ids of up to NOTIFICATION_GROUP_ID_LIMIT actions
+NOTIFICATION_BATCH_WINDOW = 2
+NOTIFICATION_BATCH_SIZE = 1000
+NOTIFICATION_GROUP_ID_LIMIT = 1000
+# QoS 0 messages kept by each worker process while an MQTT broker is not
+# connected, paho keeps up to as many messages with a higher QoS
+MQTT_MAX_QUEUED_MESSAGES = 1000
 try:
     with open(path, 'r') as f:
         RESERVED_USERNAMES = [line.rstrip() for line in f]
@@ -129,6 +129,10 @@ setup(
     extras_require={
         ':python_version=="2.7"': [
             'functools32>=3.2.3-2'
+        ],
+        # Parquet and Arrow exports
+        'parquet': [
+            'pyarrow'
         ]
     }
 )